@@ -0,0 +1,96 @@
+"""This module contains in-process cache of analytics query results"""
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Hashable
+from functools import cache
+from threading import Lock
+from typing import Any
+
+from common.config import get_cache_config
+
+
+class ResultCache:
+    """A thread-safe LRU cache with time to live. Each result is stored with the
+    watermark of the data it was computed from, and is only served while the watermark
+    is unchanged, so results are invalidated as soon as donations are inserted or replaced.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of cached results. The least recently used one is evicted first
+    ttl : float
+        How many seconds a result is served for, regardless of the watermark
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.results: OrderedDict[Hashable, tuple[Any, Hashable, float]] = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, watermark: Hashable, compute: Callable[[], Any]) -> Any:
+        """Returns cached result or computes and caches a new one if the cached result
+        is missing, expired or was computed at another watermark.
+
+        Parameters
+        ----------
+        key : Hashable
+            Cache key, for example report name and its arguments
+        watermark : Hashable
+            Current watermark of the queried data
+        compute : Callable[[], Any]
+            Function that computes the result
+
+        Returns
+        -------
+        Any
+            The result
+        """
+        with self.lock:
+            cached = self.results.get(key)
+            if cached is not None:
+                result, cached_watermark, expires_at = cached
+                if cached_watermark == watermark and time.monotonic() < expires_at:
+                    self.results.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self.results[key]
+            self.misses += 1
+
+        result = compute()
+        with self.lock:
+            self.results[key] = (result, watermark, time.monotonic() + self.ttl)
+            self.results.move_to_end(key)
+            while len(self.results) > self.maxsize:
+                self.results.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        """Removes all cached results"""
+        with self.lock:
+            self.results.clear()
+
+    def get_metrics(self) -> dict[str, int]:
+        """
+        Returns
+        -------
+        dict[str, int]
+            Number of cached results, hits and misses
+        """
+        with self.lock:
+            return {"size": len(self.results), "hits": self.hits, "misses": self.misses}
+
+
+@cache
+def get_result_cache() -> ResultCache:
+    """
+    Returns
+    -------
+    ResultCache
+        Process-wide analytics result cache configured in the config file
+    """
+    cache_config = get_cache_config()
+    return ResultCache(cache_config["analytics_size"], cache_config["analytics_ttl_seconds"])
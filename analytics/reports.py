@@ -0,0 +1,405 @@
+"""This module contains common reports over the donations collection.
+Pipelines start with a match on donationSource and datetime, so they use
+donationSource_datetime index, and project only the fields they need.
+Results are served from the in-process cache until donations are inserted or replaced.
+"""
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from bson import ObjectId
+from pymongo import DESCENDING
+from pymongo.collection import Collection
+
+from analytics.cache import get_result_cache
+from common.config import get_sources_names_list
+from common.mongo import get_collection
+from common.rollups import ROLLUP_DATE_EXPRESSIONS
+
+
+@dataclass(frozen=True, slots=True)
+class SourceTotal:
+    """Donations total of a donation source.
+
+    Parameters
+    ----------
+    donation_source : str
+        The donation source name
+    donations : int
+        Number of donations
+    amount_usd : float
+        Total amount in USD
+    """
+
+    donation_source: str
+    donations: int
+    amount_usd: float
+
+
+@dataclass(frozen=True, slots=True)
+class DonorTotal:
+    """Donations total of a sender.
+
+    Parameters
+    ----------
+    sender_name : str
+        Sender name
+    donations : int
+        Number of donations
+    amount_usd : float
+        Total amount in USD
+    first_datetime : datetime
+        The first donation datetime
+    last_datetime : datetime
+        The last donation datetime
+    """
+
+    sender_name: str
+    donations: int
+    amount_usd: float
+    first_datetime: datetime
+    last_datetime: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class MonthlyTotal:
+    """Donations total of a month.
+
+    Parameters
+    ----------
+    month : datetime
+        The start of the month in UTC
+    donations : int
+        Number of donations
+    amount_usd : float
+        Total amount in USD
+    """
+
+    month: datetime
+    donations: int
+    amount_usd: float
+
+
+def get_write_watermark(collection: Collection) -> tuple[int, None | ObjectId, None | datetime]:
+    """Returns a cheap fingerprint of the collection, which changes when donations
+    are inserted or replaced. All parts are read without scanning documents: the count
+    from the collection metadata, the latest id from _id index and the latest
+    write datetime from updatedAt index.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+
+    Returns
+    -------
+    tuple[int, None | ObjectId, None | datetime]
+        Number of documents, the latest document id and the latest updatedAt
+    """
+    last_document = collection.find_one({}, {"_id": True}, sort=[("_id", DESCENDING)])
+    last_updated_document = collection.find_one(
+        {"updatedAt": {"$exists": True}}, {"updatedAt": True}, sort=[("updatedAt", DESCENDING)]
+    )
+    return (
+        collection.estimated_document_count(),
+        last_document["_id"] if last_document else None,
+        last_updated_document["updatedAt"] if last_updated_document else None,
+    )
+
+
+def get_match_stage(
+    start_datetime: None | datetime, end_datetime: None | datetime, donation_sources: list[str]
+) -> dict:
+    """
+    Parameters
+    ----------
+    start_datetime : None | datetime
+        Include donations from this datetime. If None there is no lower bound
+    end_datetime : None | datetime
+        Include donations before this datetime. If None there is no upper bound
+    donation_sources : list[str]
+        Donation source names
+
+    Returns
+    -------
+    dict
+        $match stage of the pipeline
+    """
+    match = {"donationSource": {"$in": donation_sources}}
+    datetime_range = {}
+    if start_datetime is not None:
+        datetime_range["$gte"] = start_datetime
+    if end_datetime is not None:
+        datetime_range["$lt"] = end_datetime
+    if datetime_range:
+        match["datetime"] = datetime_range
+    return {"$match": match}
+
+
+def run_cached(
+    collection: None | Collection, report: str, args: tuple, compute: Callable[[Collection], Any]
+) -> Any:
+    """Runs the report or returns its cached result computed at the current watermark.
+
+    Parameters
+    ----------
+    collection : None | Collection
+        Donations collection. If None the collection from config file would be used
+    report : str
+        Report name
+    args : tuple
+        Report arguments, which are a part of the cache key
+    compute : Callable[[Collection], Any]
+        Function that computes the report for the collection
+
+    Returns
+    -------
+    Any
+        The report
+    """
+    collection = collection if collection is not None else get_collection()
+    return get_result_cache().get(
+        (collection.full_name, report, args),
+        get_write_watermark(collection),
+        lambda: compute(collection),
+    )
+
+
+def get_source_totals(
+    start_datetime: None | datetime = None,
+    end_datetime: None | datetime = None,
+    donation_sources: None | list[str] = None,
+    collection: None | Collection = None,
+) -> tuple[SourceTotal, ...]:
+    """Totals of each donation source, for example for the current month.
+
+    Parameters
+    ----------
+    start_datetime : None | datetime, optional
+        Include donations from this datetime, by default None
+    end_datetime : None | datetime, optional
+        Include donations before this datetime, by default None
+    donation_sources : None | list[str], optional
+        Donation source names. If None all sources from config file are included
+    collection : None | Collection, optional
+        Donations collection. If None the collection from config file would be used
+
+    Returns
+    -------
+    tuple[SourceTotal, ...]
+        Totals ordered by amount in USD, the largest first
+    """
+    donation_sources = (
+        donation_sources if donation_sources is not None else get_sources_names_list()
+    )
+    pipeline = [
+        get_match_stage(start_datetime, end_datetime, donation_sources),
+        {"$project": {"_id": False, "donationSource": True, "amountUSD": True}},
+        {
+            "$group": {
+                "_id": "$donationSource",
+                "donations": {"$sum": 1},
+                "amountUSD": {"$sum": "$amountUSD"},
+            }
+        },
+        {"$sort": {"amountUSD": DESCENDING, "_id": DESCENDING}},
+    ]
+
+    def compute(collection: Collection) -> tuple[SourceTotal, ...]:
+        return tuple(
+            SourceTotal(document["_id"], document["donations"], round(document["amountUSD"], 2))
+            for document in collection.aggregate(pipeline)
+        )
+
+    args = (start_datetime, end_datetime, tuple(donation_sources))
+    return run_cached(collection, "source_totals", args, compute)
+
+
+def get_donor_totals(
+    start_datetime: None | datetime = None,
+    end_datetime: None | datetime = None,
+    donation_sources: None | list[str] = None,
+    min_donations: int = 1,
+    limit: int = 10,
+    collection: None | Collection = None,
+) -> tuple[DonorTotal, ...]:
+    """Totals of senders, for example top donors or repeat donors.
+    Anonymous donations are not included.
+
+    Parameters
+    ----------
+    start_datetime : None | datetime, optional
+        Include donations from this datetime, by default None
+    end_datetime : None | datetime, optional
+        Include donations before this datetime, by default None
+    donation_sources : None | list[str], optional
+        Donation source names. If None all sources from config file are included
+    min_donations : int, optional
+        Include senders with at least this many donations, by default 1
+    limit : int, optional
+        Maximum number of senders, by default 10
+    collection : None | Collection, optional
+        Donations collection. If None the collection from config file would be used
+
+    Returns
+    -------
+    tuple[DonorTotal, ...]
+        Totals ordered by amount in USD, the largest first
+    """
+    donation_sources = (
+        donation_sources if donation_sources is not None else get_sources_names_list()
+    )
+    match_stage = get_match_stage(start_datetime, end_datetime, donation_sources)
+    match_stage["$match"]["senderName"] = {"$nin": [None, ""]}
+    pipeline = [
+        match_stage,
+        {"$project": {"_id": False, "senderName": True, "amountUSD": True, "datetime": True}},
+        {
+            "$group": {
+                "_id": "$senderName",
+                "donations": {"$sum": 1},
+                "amountUSD": {"$sum": "$amountUSD"},
+                "firstDatetime": {"$min": "$datetime"},
+                "lastDatetime": {"$max": "$datetime"},
+            }
+        },
+        {"$match": {"donations": {"$gte": min_donations}}},
+        {"$sort": {"amountUSD": DESCENDING, "_id": DESCENDING}},
+        {"$limit": limit},
+    ]
+
+    def compute(collection: Collection) -> tuple[DonorTotal, ...]:
+        return tuple(
+            DonorTotal(
+                document["_id"],
+                document["donations"],
+                round(document["amountUSD"], 2),
+                document["firstDatetime"],
+                document["lastDatetime"],
+            )
+            for document in collection.aggregate(pipeline, allowDiskUse=True)
+        )
+
+    args = (start_datetime, end_datetime, tuple(donation_sources), min_donations, limit)
+    return run_cached(collection, "donor_totals", args, compute)
+
+
+def get_top_donors(
+    start_datetime: None | datetime = None,
+    end_datetime: None | datetime = None,
+    donation_sources: None | list[str] = None,
+    limit: int = 10,
+    collection: None | Collection = None,
+) -> tuple[DonorTotal, ...]:
+    """
+    Parameters
+    ----------
+    start_datetime : None | datetime, optional
+        Include donations from this datetime, by default None
+    end_datetime : None | datetime, optional
+        Include donations before this datetime, by default None
+    donation_sources : None | list[str], optional
+        Donation source names. If None all sources from config file are included
+    limit : int, optional
+        Maximum number of senders, by default 10
+    collection : None | Collection, optional
+        Donations collection. If None the collection from config file would be used
+
+    Returns
+    -------
+    tuple[DonorTotal, ...]
+        Senders who donated the most in USD
+    """
+    return get_donor_totals(
+        start_datetime, end_datetime, donation_sources, limit=limit, collection=collection
+    )
+
+
+def get_repeat_donors(
+    start_datetime: None | datetime = None,
+    end_datetime: None | datetime = None,
+    donation_sources: None | list[str] = None,
+    min_donations: int = 2,
+    limit: int = 10,
+    collection: None | Collection = None,
+) -> tuple[DonorTotal, ...]:
+    """
+    Parameters
+    ----------
+    start_datetime : None | datetime, optional
+        Include donations from this datetime, by default None
+    end_datetime : None | datetime, optional
+        Include donations before this datetime, by default None
+    donation_sources : None | list[str], optional
+        Donation source names. If None all sources from config file are included
+    min_donations : int, optional
+        Minimum number of donations of a repeat donor, by default 2
+    limit : int, optional
+        Maximum number of senders, by default 10
+    collection : None | Collection, optional
+        Donations collection. If None the collection from config file would be used
+
+    Returns
+    -------
+    tuple[DonorTotal, ...]
+        Senders who donated at least min_donations times, the largest total first
+    """
+    return get_donor_totals(
+        start_datetime,
+        end_datetime,
+        donation_sources,
+        min_donations=min_donations,
+        limit=limit,
+        collection=collection,
+    )
+
+
+def get_monthly_totals(
+    start_datetime: None | datetime = None,
+    end_datetime: None | datetime = None,
+    donation_sources: None | list[str] = None,
+    collection: None | Collection = None,
+) -> tuple[MonthlyTotal, ...]:
+    """Totals of each month in UTC.
+
+    Parameters
+    ----------
+    start_datetime : None | datetime, optional
+        Include donations from this datetime, by default None
+    end_datetime : None | datetime, optional
+        Include donations before this datetime, by default None
+    donation_sources : None | list[str], optional
+        Donation source names. If None all sources from config file are included
+    collection : None | Collection, optional
+        Donations collection. If None the collection from config file would be used
+
+    Returns
+    -------
+    tuple[MonthlyTotal, ...]
+        Totals in chronological order
+    """
+    donation_sources = (
+        donation_sources if donation_sources is not None else get_sources_names_list()
+    )
+    pipeline = [
+        get_match_stage(start_datetime, end_datetime, donation_sources),
+        {"$project": {"_id": False, "datetime": True, "amountUSD": True}},
+        {
+            "$group": {
+                "_id": ROLLUP_DATE_EXPRESSIONS["monthly"],
+                "donations": {"$sum": 1},
+                "amountUSD": {"$sum": "$amountUSD"},
+            }
+        },
+        {"$sort": {"_id": 1}},
+    ]
+
+    def compute(collection: Collection) -> tuple[MonthlyTotal, ...]:
+        return tuple(
+            MonthlyTotal(document["_id"], document["donations"], round(document["amountUSD"], 2))
+            for document in collection.aggregate(pipeline)
+        )
+
+    args = (start_datetime, end_datetime, tuple(donation_sources))
+    return run_cached(collection, "monthly_totals", args, compute)
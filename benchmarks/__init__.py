@@ -0,0 +1 @@
+"""This module contains performance benchmarks"""
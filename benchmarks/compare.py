@@ -0,0 +1,81 @@
+"""This module contains comparison of benchmark results with a baseline.
+Exits with code 1 if any benchmark is slower than the threshold, for example:
+python -m benchmarks.compare benchmarks/baselines/baseline.json results.json -t 0.2
+"""
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 0.2
+
+
+def load_results(filepath: str) -> dict[str, dict[str, float]]:
+    """
+    Parameters
+    ----------
+    filepath : str
+        JSON file saved by benchmarks.run
+
+    Returns
+    -------
+    dict[str, dict[str, float]]
+        Benchmark results keyed by benchmark name and size
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare_results(
+    baseline: dict[str, dict[str, float]],
+    current: dict[str, dict[str, float]],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[str]:
+    """Compares benchmark times and prints a table of changes.
+    Benchmarks which are missing in either results are skipped.
+
+    Parameters
+    ----------
+    baseline : dict[str, dict[str, float]]
+        Baseline results
+    current : dict[str, dict[str, float]]
+        Current results
+    threshold : float, optional
+        Allowed relative slowdown. For example, 0.2 allows 20% slower runs,
+        by default DEFAULT_THRESHOLD
+
+    Returns
+    -------
+    list[str]
+        Names of regressed benchmarks
+    """
+    regressions = []
+    for name in sorted(baseline.keys() & current.keys()):
+        baseline_seconds = baseline[name]["seconds"]
+        current_seconds = current[name]["seconds"]
+        change = current_seconds / baseline_seconds - 1
+        status = "OK"
+        if change > threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        print(f"{name} | {baseline_seconds}s -> {current_seconds}s | {change:+.1%} | {status}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline", type=str, help="Baseline results JSON file")
+    parser.add_argument("current", type=str, help="Current results JSON file")
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed relative slowdown, 0.2 allows 20%% slower runs",
+    )
+    args = parser.parse_args()
+    regressed = compare_results(
+        load_results(args.baseline), load_results(args.current), args.threshold
+    )
+    if regressed:
+        print(f"Regressed benchmarks: {', '.join(regressed)}")
+        sys.exit(1)
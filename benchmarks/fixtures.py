@@ -0,0 +1,183 @@
+"""This module contains synthetic API responses for benchmarks"""
+import random
+from datetime import datetime
+from datetime import timedelta
+
+import pandas as pd
+
+START_DATETIME = datetime(2022, 3, 1)
+FIRST_NAMES = ["Olena", "Taras", "John", "Anna", "Dmytro", "Maria", "Peter", "Iryna"]
+LAST_NAMES = ["Shevchenko", "Smith", "Kovalenko", "Muller", "Bondar", "Novak", "Brown"]
+NOTES = ["", "Slava Ukraini!", "For the drones", "From: donor@mail.com", "Thank you"]
+
+
+def get_name(rng: random.Random) -> str:
+    """
+    Parameters
+    ----------
+    rng : random.Random
+        Random generator
+
+    Returns
+    -------
+    str
+        Random sender name. Names repeat a lot, as they do in real data
+    """
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def get_datetime(rng: random.Random, size: int, i: int) -> datetime:
+    """
+    Parameters
+    ----------
+    rng : random.Random
+        Random generator
+    size : int
+        Number of transactions
+    i : int
+        Transaction index
+
+    Returns
+    -------
+    datetime
+        Transaction datetime. Transactions are spread over a year in chronological order
+    """
+    return START_DATETIME + timedelta(seconds=i * 365 * 24 * 3600 // size + rng.randrange(60))
+
+
+def make_paypal_transactions(size: int, seed: int = 0) -> list[dict]:
+    """Generates PayPal transaction_details of transactions search API.
+
+    Parameters
+    ----------
+    size : int
+        Number of transactions
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    list[dict]
+        Raw PayPal transactions
+    """
+    rng = random.Random(seed)
+    transactions = []
+    for i in range(size):
+        name = get_name(rng)
+        transactions.append(
+            {
+                "transaction_info": {
+                    "transaction_id": f"PP{i:010}",
+                    "transaction_event_code": rng.choice(["T0000", "T0000", "T0011", "T0400"]),
+                    "transaction_amount": {
+                        "currency_code": rng.choice(["USD", "USD", "EUR", "GBP"]),
+                        "value": f"{rng.uniform(1, 500):.2f}",
+                    },
+                    "transaction_updated_date": get_datetime(rng, size, i).strftime(
+                        "%Y-%m-%dT%H:%M:%S+0000"
+                    ),
+                    "transaction_note": rng.choice(NOTES),
+                },
+                "payer_info": {
+                    "email_address": f"{name.replace(' ', '.').lower()}@mail.com",
+                    "payer_name": {"alternate_full_name": name},
+                    "country_code": rng.choice(["US", "DE", "GB", "PL"]),
+                },
+            }
+        )
+    return transactions
+
+
+def make_monobank_statements(size: int, seed: int = 0) -> list[dict]:
+    """Generates Monobank jar statements, the latest transaction first.
+
+    Parameters
+    ----------
+    size : int
+        Number of transactions
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    list[dict]
+        Raw Monobank transactions
+    """
+    rng = random.Random(seed)
+    statements = []
+    for i in range(size):
+        statements.append(
+            {
+                "id": f"MB{i:010}",
+                "time": int(get_datetime(rng, size, i).timestamp()),
+                "description": rng.choice([f"Від: {get_name(rng)}", "Поповнення"]),
+                "amount": rng.choice([1, 1, 1, -1]) * rng.randrange(100, 1000000),
+                "comment": rng.choice(NOTES),
+            }
+        )
+    return statements[::-1]
+
+
+def make_privatbank_transactions(size: int, seed: int = 0) -> list[dict]:
+    """Generates Privatbank statements transactions.
+
+    Parameters
+    ----------
+    size : int
+        Number of transactions
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    list[dict]
+        Raw Privatbank transactions
+    """
+    rng = random.Random(seed)
+    transactions = []
+    for i in range(size):
+        currency = rng.choice(["UAH", "UAH", "USD", "EUR"])
+        name = get_name(rng)
+        transactions.append(
+            {
+                "ID": f"PB{i:010}",
+                "OSND": rng.choice(NOTES) if currency == "UAH" else f"From {name} 1/Donation",
+                "TRANTYPE": rng.choice(["C", "C", "C", "D"]),
+                "DATE_TIME_DAT_OD_TIM_P": get_datetime(rng, size, i).strftime("%d.%m.%Y %H:%M:%S"),
+                "CCY": currency,
+                "AUT_CNTR_NAM": name,
+                "SUM": f"{rng.uniform(1, 50000):.2f}",
+            }
+        )
+    return transactions
+
+
+def make_manual_df(size: int, seed: int = 0) -> pd.DataFrame:
+    """Generates manual donations in the same form as they are read from a CSV file.
+
+    Parameters
+    ----------
+    size : int
+        Number of transactions
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    pd.DataFrame
+        Manual donations
+    """
+    rng = random.Random(seed)
+    names = [get_name(rng) for _ in range(size)]
+    return pd.DataFrame(
+        {
+            "senderName": names,
+            "currency": [rng.choice(["USD", "UAH", "EUR"]) for _ in range(size)],
+            "senderNote": [rng.choice(NOTES) for _ in range(size)],
+            "datetime": pd.to_datetime([get_datetime(rng, size, i) for i in range(size)]),
+            "senderEmail": [f"{name.replace(' ', '.').lower()}@mail.com" for name in names],
+            "amountOriginal": [round(rng.uniform(1, 1000), 2) for _ in range(size)],
+            "countryCode": [None] * size,
+            "transactionKey": [f"M{i:010}" for i in range(size)],
+        }
+    )
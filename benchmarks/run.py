@@ -0,0 +1,271 @@
+"""This module contains benchmarks for source parsers and the write path.
+Run it from the repository root, for example:
+python -m benchmarks.run -s 1000 100000 -o benchmarks/baselines/baseline.json
+"""
+import argparse
+import json
+import platform
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from datetime import datetime
+from unittest.mock import patch
+
+import bson
+import numpy as np
+from bson import ObjectId
+from currency_converter import CURRENCY_FILE
+from currency_converter import CurrencyConverter
+from pymongo import MongoClient
+from pymongo import UpdateOne
+from pymongo.results import BulkWriteResult
+
+from benchmarks.fixtures import make_manual_df
+from benchmarks.fixtures import make_monobank_statements
+from benchmarks.fixtures import make_paypal_transactions
+from benchmarks.fixtures import make_privatbank_transactions
+from common.mongo import ensure_indexes
+from common.mongo import upsert_documents
+from common.uah_rates import UahRateIndex
+from sources.base import SourceBase
+from sources.manual import Manual
+from sources.monobank import Monobank
+from sources.paypal import PayPal
+from sources.privatbank import Privatbank
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+SOURCE_CONFIG = {"creation_date": datetime(2022, 1, 1), "currency": "UAH"}
+
+
+class InMemoryCollection:
+    """In-memory stand-in for the donations collection, used when there is no local mongod.
+    Operations are BSON encoded, as the driver does, and upserted into a dict.
+    """
+
+    def __init__(self):
+        self.documents = {}
+
+    def bulk_write(self, requests: list[UpdateOne], ordered: bool = True) -> BulkWriteResult:
+        """Applies $setOnInsert upserts.
+
+        Parameters
+        ----------
+        requests : list[UpdateOne]
+            Upsert operations
+        ordered : bool, optional
+            Not used, by default True
+
+        Returns
+        -------
+        BulkWriteResult
+            Result with the number of upserted and matched documents
+        """
+        # pylint: disable=protected-access
+        _ = ordered
+        upserted, matched = 0, 0
+        for request in requests:
+            bson.encode(request._filter)
+            bson.encode(request._doc)
+            key = (request._filter["donationSource"], request._filter["transactionKey"])
+            if key in self.documents:
+                matched += 1
+            else:
+                self.documents[key] = request._doc["$setOnInsert"]
+                upserted += 1
+        return BulkWriteResult(
+            {"nUpserted": upserted, "nMatched": matched, "upserted": []}, acknowledged=True
+        )
+
+
+def measure(func: Callable, setup: None | Callable = None, repeat: int = 3) -> float:
+    """Measures the best wall time of the function.
+
+    Parameters
+    ----------
+    func : Callable
+        Function to measure. Takes the setup result if setup is given
+    setup : None | Callable, optional
+        Prepares a fresh input for each run, it is not measured, by default None
+    repeat : int, optional
+        Number of runs, by default 3
+
+    Returns
+    -------
+    float
+        The best time in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        args = (setup(),) if setup is not None else ()
+        started_at = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started_at)
+    return best
+
+
+def get_result(seconds: float, size: int) -> dict[str, float]:
+    """
+    Parameters
+    ----------
+    seconds : float
+        Measured time
+    size : int
+        Number of rows
+
+    Returns
+    -------
+    dict[str, float]
+        Benchmark result
+    """
+    return {"seconds": round(seconds, 6), "rows_per_second": round(size / seconds, 1)}
+
+
+def measure_inserts(documents: list[dict], client: None | MongoClient, repeat: int = 3) -> float:
+    """Measures upserts of the documents into an empty collection.
+
+    Parameters
+    ----------
+    documents : list[dict]
+        Documents to write
+    client : None | MongoClient
+        Client of a local mongod. If None the in-memory stand-in is used
+    repeat : int, optional
+        Number of runs, by default 3
+
+    Returns
+    -------
+    float
+        The best time in seconds
+    """
+    collections = []
+
+    def setup() -> tuple:
+        if client is None:
+            collection = InMemoryCollection()
+        else:
+            collection = client["benchmarks"][f"donations_{ObjectId()}"]
+            ensure_indexes(collection)
+        collections.append(collection)
+        # The driver adds _id to documents, so each run gets fresh copies
+        return collection, [dict(document) for document in documents]
+
+    seconds = measure(lambda args: upsert_documents(*args), setup=setup, repeat=repeat)
+    if client is not None:
+        for collection in collections:
+            collection.drop()
+    return seconds
+
+
+def run_benchmarks(
+    sizes: list[int], repeat: int = 3, mongo_uri: None | str = None
+) -> dict[str, dict[str, float]]:
+    """Runs parsing, transform and insert benchmarks for each size.
+    Sources are created without config, API and database access.
+
+    Parameters
+    ----------
+    sizes : list[int]
+        Numbers of rows
+    repeat : int, optional
+        Number of runs of each benchmark, the best one is taken, by default 3
+    mongo_uri : None | str, optional
+        URI of a local mongod for insert benchmarks. If None the in-memory stand-in is used
+
+    Returns
+    -------
+    dict[str, dict[str, float]]
+        Benchmark results keyed by benchmark name and size
+    """
+    uah_rate_index = UahRateIndex(
+        np.arange("2022-01-01", "2024-01-01", dtype="datetime64[D]"), np.full(730, 36.9)
+    )
+    currency_converter = CurrencyConverter(
+        CURRENCY_FILE, fallback_on_missing_rate=True, fallback_on_wrong_date=True
+    )
+    client = MongoClient(mongo_uri) if mongo_uri is not None else None
+    results = {}
+    with ExitStack() as stack:
+        stack.enter_context(patch("sources.base.get_source", return_value=SOURCE_CONFIG))
+        stack.enter_context(patch("sources.base.get_collection"))
+        stack.enter_context(patch("sources.base.get_uah_rate_index", return_value=uah_rate_index))
+        stack.enter_context(patch("sources.paypal.get_sources", return_value=[]))
+        stack.enter_context(
+            patch("common.ecb_rates.get_currency_converter", return_value=currency_converter)
+        )
+        sources: dict[str, SourceBase] = {
+            name: source_class(name, last_document_datetimes={}, checkpoints={})
+            for name, source_class in [
+                ("paypal", PayPal),
+                ("monobank", Monobank),
+                ("privatbank", Privatbank),
+            ]
+        }
+        sources["privatbank"].end_datetime = datetime(2030, 1, 1)
+        manual = Manual("manual", "")
+        # Load ECB rates before measurements
+        _ = SourceBase.currency_converter
+
+        for size in sizes:
+            raw_data = {
+                "paypal": make_paypal_transactions(size),
+                "monobank": make_monobank_statements(size),
+                "privatbank": make_privatbank_transactions(size),
+            }
+            for name, source in sources.items():
+                seconds = measure(
+                    lambda source=source, name=name: source.parse_transactions(raw_data[name]),
+                    repeat=repeat,
+                )
+                results[f"parse/{name}/{size}"] = get_result(seconds, size)
+
+            donations = sources["privatbank"].parse_transactions(raw_data["privatbank"])
+            seconds = measure(lambda: sources["privatbank"].get_documents(donations), repeat=repeat)
+            results[f"transform/records/{size}"] = get_result(seconds, len(donations))
+
+            df = make_manual_df(size)
+            seconds = measure(manual.get_documents, setup=df.copy, repeat=repeat)
+            results[f"transform/dataframe/{size}"] = get_result(seconds, size)
+
+            documents = manual.get_documents(df.copy())
+            seconds = measure_inserts(documents, client, repeat)
+            backend = "mongod" if client is not None else "memory"
+            results[f"insert/{backend}/{size}"] = get_result(seconds, size)
+            print(f"Finished benchmarks for {size} rows")
+    return results
+
+
+def save_results(results: dict[str, dict[str, float]], filepath: str) -> None:
+    """Saves benchmark results with the environment metadata to JSON file.
+
+    Parameters
+    ----------
+    results : dict[str, dict[str, float]]
+        Benchmark results
+    filepath : str
+        JSON file path
+    """
+    data = {
+        "metadata": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("-m", "--mongo_uri", type=str, default=None, help="Local mongod URI")
+    parser.add_argument("-o", "--output", type=str, required=True, help="Results JSON file")
+    args = parser.parse_args()
+    benchmark_results = run_benchmarks(args.sizes, args.repeat, args.mongo_uri)
+    for benchmark_name, result in benchmark_results.items():
+        print(f"{benchmark_name} | {result['seconds']}s | {result['rows_per_second']} rows/s")
+    save_results(benchmark_results, args.output)
@@ -0,0 +1,164 @@
+"""This module contains archive of raw API responses of donation sources.
+Responses are stored in a GridFS bucket of the database as gzip compressed JSON lines
+files keyed by donation source and sync window, so documents can be rebuilt later
+without requests to the APIs.
+"""
+import gzip
+import json
+import posixpath
+from collections.abc import Iterator
+from datetime import datetime
+from urllib.parse import quote
+from urllib.parse import unquote
+
+from gridfs import GridFSBucket
+from pymongo import ASCENDING
+
+from common.config import get_archive_config
+from common.mongo import get_database
+
+ARCHIVE_DATETIME_FORMAT = "%Y%m%dT%H%M%S"
+
+
+def get_archive_bucket(bucket_name: None | str = None) -> GridFSBucket:
+    """The archive is stored in MongoDB, because the local disk of GCP Cloud Function
+    is in memory and lives only as long as the function instance.
+
+    Parameters
+    ----------
+    bucket_name : None | str, optional
+        GridFS bucket name. If None the bucket from config file would be used
+
+    Returns
+    -------
+    GridFSBucket
+        Archive bucket
+    """
+    bucket_name = bucket_name if bucket_name is not None else get_archive_config()["bucket"]
+    return GridFSBucket(get_database(), bucket_name=bucket_name)
+
+
+def get_archive_filename(
+    donation_source: str, start_datetime: datetime, end_datetime: datetime
+) -> str:
+    """
+    Parameters
+    ----------
+    donation_source : str
+        The donation source name
+    start_datetime : datetime
+        The window start datetime
+    end_datetime : datetime
+        The window end datetime
+
+    Returns
+    -------
+    str
+        Archive file name of the window. The source name is URI encoded
+    """
+    return posixpath.join(
+        quote(donation_source, safe=""),
+        f"{start_datetime:%Y-%m}",
+        f"{start_datetime:{ARCHIVE_DATETIME_FORMAT}}_{end_datetime:{ARCHIVE_DATETIME_FORMAT}}"
+        ".jsonl.gz",
+    )
+
+
+def archive_response(
+    bucket: GridFSBucket,
+    donation_source: str,
+    window: dict[str, datetime],
+    transactions: list[dict],
+) -> str:
+    """Adds raw transactions to the archive of the window. Each call stores a separate
+    file revision with the window file name, so files are never rewritten.
+
+    Parameters
+    ----------
+    bucket : GridFSBucket
+        Archive bucket
+    donation_source : str
+        The donation source name
+    window : dict[str, datetime]
+        startDatetime, endDatetime and syncDatetime of the window
+    transactions : list[dict]
+        Raw transactions data
+
+    Returns
+    -------
+    str
+        Archive file name
+    """
+    filename = get_archive_filename(donation_source, window["startDatetime"], window["endDatetime"])
+    record = {
+        "donationSource": donation_source,
+        "archivedAt": datetime.utcnow().isoformat(),
+        **{key: value.isoformat() for key, value in window.items()},
+        "transactions": transactions,
+    }
+    bucket.upload_from_stream(
+        filename,
+        gzip.compress((json.dumps(record, ensure_ascii=False) + "\n").encode()),
+        metadata={"donationSource": donation_source, **window},
+    )
+    return filename
+
+
+def get_archive_filenames(bucket: GridFSBucket, donation_source: None | str = None) -> list[str]:
+    """
+    Parameters
+    ----------
+    bucket : GridFSBucket
+        Archive bucket
+    donation_source : None | str, optional
+        The donation source name. If None files of all sources are returned
+
+    Returns
+    -------
+    list[str]
+        Archive file names in chronological order of windows
+    """
+    query = {"metadata.donationSource": donation_source} if donation_source is not None else {}
+    filenames = {grid_out.filename for grid_out in bucket.find(query)}
+    return sorted(filenames, key=lambda filename: (posixpath.basename(filename), filename))
+
+
+def get_archive_donation_source(filename: str) -> str:
+    """
+    Parameters
+    ----------
+    filename : str
+        Archive file name
+
+    Returns
+    -------
+    str
+        The donation source name of the archive file
+    """
+    return unquote(filename.split("/", 1)[0])
+
+
+def iter_archive(bucket: GridFSBucket, filename: str) -> Iterator[dict]:
+    """Reads archived responses of the window in the order they were archived.
+
+    Parameters
+    ----------
+    bucket : GridFSBucket
+        Archive bucket
+    filename : str
+        Archive file name
+
+    Yields
+    ------
+    Iterator[dict]
+        Archived records with window datetimes and raw transactions data
+    """
+    revisions = bucket.find(
+        {"filename": filename}, sort=[("uploadDate", ASCENDING), ("_id", ASCENDING)]
+    )
+    for grid_out in revisions:
+        for line in gzip.decompress(grid_out.read()).decode("utf-8").splitlines():
+            record = json.loads(line)
+            for key in ["startDatetime", "endDatetime", "syncDatetime"]:
+                record[key] = datetime.fromisoformat(record[key])
+            yield record
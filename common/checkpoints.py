@@ -0,0 +1,66 @@
+"""This module contains durable sync checkpoints of donation sources"""
+from datetime import datetime
+
+from pymongo.collection import Collection
+
+from common.config import get_checkpoints_collection_name
+from common.mongo import get_collection
+
+
+def get_checkpoints_collection() -> Collection:
+    """
+    Returns
+    -------
+    Collection
+        Connection to the sync checkpoints collection
+    """
+    return get_collection(get_checkpoints_collection_name())
+
+
+def get_checkpoints(donation_sources: list[str]) -> dict[str, dict]:
+    """Reads sync checkpoints of donation sources in a single query.
+
+    Parameters
+    ----------
+    donation_sources : list[str]
+        Donation source names
+
+    Returns
+    -------
+    dict[str, dict]
+        Checkpoints keyed by donation source name. Sources without a checkpoint
+        are not included
+    """
+    documents = get_checkpoints_collection().find({"_id": {"$in": donation_sources}})
+    return {document["_id"]: document for document in documents}
+
+
+def save_checkpoint(
+    donation_source: str,
+    synced_until: datetime,
+    last_transaction_key: None | str = None,
+    cursor: None | dict = None,
+) -> None:
+    """Atomically updates the sync checkpoint of the donation source.
+    The synced until datetime never moves back, even if runs overlap.
+
+    Parameters
+    ----------
+    donation_source : str
+        The donation source name
+    synced_until : datetime
+        All transactions before this datetime are stored
+    last_transaction_key : None | str, optional
+        Key of the latest stored transaction. If None the previous key is kept
+    cursor : None | dict, optional
+        Provider pagination cursor to resume a partially synced window from.
+        None when the window is fully synced
+    """
+    update = {"cursor": cursor, "updatedAt": datetime.utcnow()}
+    if last_transaction_key is not None:
+        update["lastTransactionKey"] = last_transaction_key
+    get_checkpoints_collection().update_one(
+        {"_id": donation_source},
+        {"$max": {"syncedUntil": synced_until}, "$set": update},
+        upsert=True,
+    )
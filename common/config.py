@@ -60,6 +60,16 @@ def get_mongo_uri() -> str:
     return get_config()["mongo"]["mongo_uri"]
 
 
+def get_mongo_client_options() -> dict[str, int]:
+    """
+    Returns
+    -------
+    dict[str, int]
+        Keyword arguments for MongoClient, for example connection pool size and timeouts
+    """
+    return get_config()["mongo"].get("client", {})
+
+
 def get_collection_name() -> str:
     """
     Returns
@@ -70,6 +80,26 @@ def get_collection_name() -> str:
     return get_config()["mongo"]["collection"]
 
 
+def get_uah_rates_collection_name() -> str:
+    """
+    Returns
+    -------
+    str
+        Collection that is used to store historical USD / UAH rates
+    """
+    return get_config()["mongo"]["uah_rates_collection"]
+
+
+def get_checkpoints_collection_name() -> str:
+    """
+    Returns
+    -------
+    str
+        Collection that is used to store donation sources sync checkpoints
+    """
+    return get_config()["mongo"]["checkpoints_collection"]
+
+
 def get_sources(source_type=None) -> list[dict[str, str | datetime]]:
     """
     Returns
@@ -117,3 +147,63 @@ def get_sources_names_list() -> list[str]:
        List of available source names in the config file.
     """
     return [source["name"] for source in get_sources()]
+
+
+def get_sync_config() -> dict[str, int | bool]:
+    """
+    Returns
+    -------
+    dict[str, int | bool]
+        Settings of the sync run, for example the number of sources fetched concurrently
+    """
+    return get_config()["sync"]
+
+
+def get_http_config() -> dict[str, int | float]:
+    """
+    Returns
+    -------
+    dict[str, int | float]
+        Settings of the HTTP transport, for example timeouts and retry budgets
+    """
+    return get_config()["http"]
+
+
+def get_rate_limits_config() -> dict[str, dict[str, float]]:
+    """
+    Returns
+    -------
+    dict[str, dict[str, float]]
+        Rate limits keyed by API host, for example requests per minute and burst size
+    """
+    return get_config().get("rate_limits", {})
+
+
+def get_cache_config() -> dict[str, str | bool]:
+    """
+    Returns
+    -------
+    dict[str, str | bool]
+        Settings of the local cache, for example the directory where cached files are stored
+    """
+    return get_config()["cache"]
+
+
+def get_metrics_config() -> dict[str, None | str]:
+    """
+    Returns
+    -------
+    dict[str, None | str]
+        Settings of the metrics export, for example Prometheus Pushgateway URL
+    """
+    return get_config().get("metrics", {})
+
+
+def get_archive_config() -> dict[str, str | bool]:
+    """
+    Returns
+    -------
+    dict[str, str | bool]
+        Settings of the raw API responses archive, for example whether it is enabled
+    """
+    return get_config().get("archive", {"enabled": False})
@@ -1,4 +1,5 @@
 """This module contains constants for common use"""
+from datetime import date
 from datetime import timedelta
 
 DELTA_TIME_PERIOD = timedelta(days=25)
@@ -6,11 +7,14 @@ DELTA_TIME_PERIOD = timedelta(days=25)
 MONOBANK_ENDPOINT_URL = "https://api.monobank.ua"
 PAYPAL_ENDPOINT_URL = "https://api-m.paypal.com/v1"
 PRIVATBANK_ENDPOINT_URL = "https://acp.privatbank.ua/api"
+NBU_ENDPOINT_URL = "https://bank.gov.ua"
 
 ALLOWED_PAYPAL_TRANSACTIONS_TYPES = ["T0000", "T0011"]
 MAX_PAYPAL_TRANSACTIONS = 500
+MAX_PAYPAL_CONCURRENT_PAGES = 4
 MAX_PRIVATBANK_TRANSACTIONS = 500
 
 UAH_CODE = 980
 USD_CODE = 840
 DEFAULT_USD_UAH_CONVERTION_RATE = 40.0
+UAH_RATES_START_DATE = date(2022, 1, 1)
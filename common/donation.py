@@ -0,0 +1,56 @@
+"""This module contains compact donation record"""
+from dataclasses import dataclass
+from datetime import datetime
+
+
+@dataclass(slots=True)
+class Donation:
+    """A donation parsed from the source API. Records are much lighter than
+    pd.DataFrame rows, which matters for runs with only a handful of new donations.
+
+    Parameters
+    ----------
+    sender_name : None | str
+        Sender name
+    amount_original : float
+        Donation amount in the original currency
+    currency : str
+        Currency 3-letter code. For example, EUR
+    datetime : datetime
+        The transaction datetime
+    sender_note : str
+        Sender note
+    country_code : None | str
+        Sender country code
+    transaction_key : str
+        Transaction key, which is unique within the donation source
+    sender_email : None | str, optional
+        Sender email, by default None
+    """
+
+    sender_name: None | str
+    amount_original: float
+    currency: str
+    datetime: datetime
+    sender_note: str
+    country_code: None | str
+    transaction_key: str
+    sender_email: None | str = None
+
+    def to_document(self) -> dict:
+        """
+        Returns
+        -------
+        dict
+            Document fields stored for the donation
+        """
+        return {
+            "senderName": self.sender_name,
+            "senderEmail": self.sender_email,
+            "amountOriginal": self.amount_original,
+            "currency": self.currency,
+            "datetime": self.datetime,
+            "senderNote": self.sender_note,
+            "countryCode": self.country_code,
+            "transactionKey": self.transaction_key,
+        }
@@ -0,0 +1,87 @@
+"""This module contains a local cache of ECB reference rates"""
+import os
+import pickle
+import time
+from threading import Thread
+
+from currency_converter import CURRENCY_FILE
+from currency_converter import ECB_URL
+from currency_converter import CurrencyConverter
+
+from common.config import get_cache_config
+
+ECB_CACHE_FILENAME = "ecb_rates.pickle"
+CURRENCY_CONVERTER_KWARGS = {"fallback_on_missing_rate": True, "fallback_on_wrong_date": True}
+
+
+def get_ecb_cache_filepath() -> str:
+    """
+    Returns
+    -------
+    str
+        Path to the cached ECB rates
+    """
+    return os.path.join(get_cache_config()["dir"], ECB_CACHE_FILENAME)
+
+
+def download_currency_converter() -> CurrencyConverter:
+    """Downloads and parses the latest ECB rates history.
+
+    Returns
+    -------
+    CurrencyConverter
+        CurrencyConverter object with loaded rates
+    """
+    return CurrencyConverter(ECB_URL, **CURRENCY_CONVERTER_KWARGS)
+
+
+def refresh_ecb_cache(filepath: str) -> CurrencyConverter:
+    """Downloads ECB rates and atomically replaces the cached ones. If ECB is not reachable,
+    the rates bundled with currency_converter package are used. They are not cached,
+    so the download is retried on the next use.
+
+    Parameters
+    ----------
+    filepath : str
+        Path to the cached ECB rates
+
+    Returns
+    -------
+    CurrencyConverter
+        CurrencyConverter object with loaded rates
+    """
+    try:
+        currency_converter = download_currency_converter()
+    except OSError as error:
+        print(f"Failed to download ECB rates, using bundled rates instead: {error!r}")
+        return CurrencyConverter(CURRENCY_FILE, **CURRENCY_CONVERTER_KWARGS)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    tmp_filepath = f"{filepath}.{os.getpid()}.tmp"
+    with open(tmp_filepath, "wb") as f:
+        pickle.dump(currency_converter, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_filepath, filepath)
+    return currency_converter
+
+
+def get_currency_converter() -> CurrencyConverter:
+    """Loads ECB rates from the local cache. If there is no cache, the rates are downloaded
+    and cached. If the cache is older than TTL from the config file, cached rates are
+    returned right away and refreshed in the background for the next use.
+
+    Returns
+    -------
+    CurrencyConverter
+        CurrencyConverter object with loaded rates
+    """
+    filepath = get_ecb_cache_filepath()
+    try:
+        with open(filepath, "rb") as f:
+            currency_converter = pickle.load(f)
+        cache_age = time.time() - os.path.getmtime(filepath)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        # The cache may be corrupted or pickled by another currency_converter version
+        return refresh_ecb_cache(filepath)
+
+    if cache_age > get_cache_config()["ecb_ttl_hours"] * 3600:
+        Thread(target=refresh_ecb_cache, args=(filepath,), daemon=True).start()
+    return currency_converter
@@ -0,0 +1,187 @@
+"""This module contains shared HTTP transport for donation source APIs"""
+import json
+import random
+import time
+from datetime import datetime
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from threading import Lock
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from common.config import get_http_config
+from common.metrics import inc_counter
+from common.metrics import record_span
+from common.metrics import span
+from common.rate_limiter import get_rate_limiter
+
+# Sessions live on the module level, so keep-alive connections are reused
+# by all donation sources and between warm GCP Cloud Function invocations.
+_sessions: dict[str, requests.Session] = {}
+_sessions_lock = Lock()
+
+
+def get_session(url: str) -> requests.Session:
+    """Get a shared session with a pool of keep-alive connections for the URL host.
+
+    Parameters
+    ----------
+    url : str
+        URL to request
+
+    Returns
+    -------
+    requests.Session
+        Shared session for the URL host
+    """
+    host = urlparse(url).netloc
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                pool_size = get_http_config()["pool_size"]
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+                _sessions[host] = session
+    return session
+
+
+def get_retry_delay(response: None | requests.Response, attempt: int) -> float:
+    """Calculates delay before the next retry. Retry-After header is respected if present,
+    otherwise exponential backoff with jitter is used.
+
+    Parameters
+    ----------
+    response : None | requests.Response
+        Failed response. None if the request failed with connection error
+    attempt : int
+        Retry attempt, starting from 0
+
+    Returns
+    -------
+    float
+        Delay in seconds
+    """
+    http_config = get_http_config()
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return max(float(retry_after), 0)
+        except ValueError:
+            try:
+                retry_datetime = parsedate_to_datetime(retry_after)
+                return max((retry_datetime - datetime.now(timezone.utc)).total_seconds(), 0)
+            except (TypeError, ValueError):
+                pass
+
+    backoff = min(http_config["backoff_max"], http_config["backoff_base"] * 2**attempt)
+    return random.uniform(backoff / 2, backoff)
+
+
+def request(
+    method: str, url: str, rate_limit_key: None | str = None, **kwargs
+) -> requests.Response:
+    """Sends HTTP request using a shared session. Requests to rate limited hosts
+    wait for the rate limiter first. Responses with 429 status code,
+    5xx status codes and connection errors are retried with backoff
+    within retry budgets from the config file.
+
+    Parameters
+    ----------
+    method : str
+        HTTP method, for example GET
+    url : str
+        URL to request
+    rate_limit_key : None | str, optional
+        Rate limiting key within the host, for example API token, by default None
+    **kwargs
+        Keyword arguments for requests.Session.request
+
+    Returns
+    -------
+    requests.Response
+        Successful response
+    """
+    http_config = get_http_config()
+    kwargs.setdefault("timeout", http_config["timeout"])
+    session = get_session(url)
+    host = urlparse(url).netloc
+    rate_limiter = get_rate_limiter(host, rate_limit_key)
+    retries_429, retries_5xx = 0, 0
+    # The delay after 429 response already spaces out the retry,
+    # so the retry doesn't wait for the rate limiter once more
+    after_429 = False
+
+    while True:
+        if rate_limiter is not None and not after_429:
+            wait = rate_limiter.acquire()
+            if wait > 0:
+                record_span("rate_limit_wait", wait, host=host)
+        try:
+            after_429 = False
+            with span("http_request", host=host, method=method) as attributes:
+                response = session.request(method, url, **kwargs)
+                attributes["status_code"] = response.status_code
+        except (requests.ConnectionError, requests.Timeout):
+            if retries_5xx >= http_config["retries_5xx"]:
+                raise
+            inc_counter("http_retries", host=host, reason="connection")
+            time.sleep(get_retry_delay(None, retries_5xx))
+            retries_5xx += 1
+            continue
+
+        if response.status_code == requests.codes["too_many"]:
+            if retries_429 < http_config["retries_429"]:
+                inc_counter("http_retries", host=host, reason="429")
+                time.sleep(get_retry_delay(response, retries_429))
+                retries_429 += 1
+                after_429 = True
+                continue
+        elif response.status_code >= 500:
+            if retries_5xx < http_config["retries_5xx"]:
+                inc_counter("http_retries", host=host, reason="5xx")
+                time.sleep(get_retry_delay(response, retries_5xx))
+                retries_5xx += 1
+                continue
+
+        assert response.status_code == requests.codes["ok"], response.text
+        return response
+
+
+def get_json(url: str, **kwargs) -> dict | list:
+    """Sends GET request and parses JSON response.
+
+    Parameters
+    ----------
+    url : str
+        URL to request
+    **kwargs
+        Keyword arguments for request
+
+    Returns
+    -------
+    dict | list
+        Raw API response
+    """
+    return json.loads(request("GET", url, **kwargs).text)
+
+
+def post_json(url: str, **kwargs) -> dict | list:
+    """Sends POST request and parses JSON response.
+
+    Parameters
+    ----------
+    url : str
+        URL to request
+    **kwargs
+        Keyword arguments for request
+
+    Returns
+    -------
+    dict | list
+        Raw API response
+    """
+    return json.loads(request("POST", url, **kwargs).text)
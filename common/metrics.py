@@ -0,0 +1,249 @@
+"""This module contains timing spans and counters of sync runs.
+Each finished span is emitted as a JSON log line, and all metrics are aggregated
+in the process, so they can be exported in Prometheus text format.
+"""
+import json
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from threading import Lock
+
+METRICS_PREFIX = "dzyga"
+
+LabelsKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+def get_labels_key(name: str, labels: dict[str, str]) -> LabelsKey:
+    """
+    Parameters
+    ----------
+    name : str
+        Metric name
+    labels : dict[str, str]
+        Metric labels
+
+    Returns
+    -------
+    LabelsKey
+        Hashable key of the metric with its labels
+    """
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class MetricsRegistry:
+    """A thread-safe registry of span durations and counters.
+    Spans are aggregated into count, sum and max of durations per name and labels.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.spans: dict[LabelsKey, dict[str, float]] = {}
+        self.counters: dict[LabelsKey, float] = {}
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Records a span duration.
+
+        Parameters
+        ----------
+        name : str
+            Span name, for example write
+        seconds : float
+            Span duration
+        **labels
+            Span labels, for example source
+        """
+        key = get_labels_key(name, labels)
+        with self.lock:
+            span = self.spans.setdefault(key, {"count": 0, "sum": 0.0, "max": 0.0})
+            span["count"] += 1
+            span["sum"] += seconds
+            span["max"] = max(span["max"], seconds)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increments a counter.
+
+        Parameters
+        ----------
+        name : str
+            Counter name, for example rows_in
+        value : float, optional
+            Increment, by default 1
+        **labels
+            Counter labels, for example source
+        """
+        key = get_labels_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def reset(self) -> None:
+        """Removes all recorded metrics"""
+        with self.lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def to_prometheus(self) -> str:
+        """Renders metrics in Prometheus text exposition format. Spans are rendered
+        as summaries without quantiles, counters get _total suffix.
+
+        Returns
+        -------
+        str
+            Metrics text
+        """
+        with self.lock:
+            spans = {key: dict(span) for key, span in self.spans.items()}
+            counters = dict(self.counters)
+
+        lines = []
+        if spans:
+            metric_name = f"{METRICS_PREFIX}_span_duration_seconds"
+            lines.append(f"# TYPE {metric_name} summary")
+            for (name, labels), span in sorted(spans.items()):
+                labels_str = format_labels((("span", name),) + labels)
+                lines.append(f"{metric_name}_sum{labels_str} {span['sum']:.6f}")
+                lines.append(f"{metric_name}_count{labels_str} {span['count']}")
+        for name in sorted({name for name, _ in counters}):
+            metric_name = f"{METRICS_PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric_name} counter")
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(f"{metric_name}{format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    """Formats labels for Prometheus text format, escaping label values.
+
+    Parameters
+    ----------
+    labels : tuple[tuple[str, str], ...]
+        Label names and values
+
+    Returns
+    -------
+    str
+        Labels string, for example {source="Jar"}. Empty string if there are no labels
+    """
+    if not labels:
+        return ""
+    escaped = [
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    ]
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """
+    Returns
+    -------
+    MetricsRegistry
+        Metrics registry shared by the process
+    """
+    return _registry
+
+
+def log_event(event: str, **fields) -> None:
+    """Prints a structured JSON log line.
+
+    Parameters
+    ----------
+    event : str
+        Event name, for example span
+    **fields
+        Event fields
+    """
+    record = {"ts": datetime.utcnow().isoformat(timespec="milliseconds"), "event": event}
+    record.update(fields)
+    print(json.dumps(record, default=str, ensure_ascii=False))
+
+
+def record_span(name: str, seconds: float, status: str = "ok", **fields) -> None:
+    """Records a finished span in the shared registry and logs it as JSON.
+
+    Parameters
+    ----------
+    name : str
+        Span name, for example write
+    seconds : float
+        Span duration
+    status : str, optional
+        Span status, ok or error, by default "ok"
+    **fields
+        Span labels, for example source
+    """
+    _registry.observe(name, seconds, **fields)
+    log_event("span", span=name, seconds=round(seconds, 6), status=status, **fields)
+
+
+@contextmanager
+def span(name: str, **labels) -> Iterator[dict]:
+    """Measures a stage of the sync run. The duration is recorded in the registry
+    and the span is logged as JSON when it finishes, also if it failed.
+
+    Parameters
+    ----------
+    name : str
+        Span name, for example write
+    **labels
+        Span labels, for example source
+
+    Yields
+    ------
+    Iterator[dict]
+        Span attributes, which are added to the log line, for example rows
+    """
+    attributes = {}
+    status = "ok"
+    started_at = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - started_at
+        _registry.observe(name, seconds, **labels)
+        log_event(
+            "span", span=name, seconds=round(seconds, 6), status=status, **labels | attributes
+        )
+
+
+def inc_counter(name: str, value: float = 1, **labels) -> None:
+    """Increments a counter in the shared registry.
+
+    Parameters
+    ----------
+    name : str
+        Counter name, for example rows_in
+    value : float, optional
+        Increment, by default 1
+    **labels
+        Counter labels, for example source
+    """
+    _registry.inc(name, value, **labels)
+
+
+def push_metrics(pushgateway_url: str, job: str) -> None:
+    """Pushes metrics of the shared registry to Prometheus Pushgateway.
+    Metrics of the previous push of the same job are replaced.
+
+    Parameters
+    ----------
+    pushgateway_url : str
+        Pushgateway URL, for example http://localhost:9091
+    job : str
+        Job name
+    """
+    from common.http import request  # pylint: disable=import-outside-toplevel
+
+    request(
+        "PUT",
+        f"{pushgateway_url.rstrip('/')}/metrics/job/{job}",
+        data=_registry.to_prometheus().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4"},
+    )
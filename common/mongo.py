@@ -1,13 +1,62 @@
 """This module contains utilities for working with MongoDB"""
+import atexit
+from datetime import datetime
+from threading import Lock
 
+from pymongo import ASCENDING
+from pymongo import DESCENDING
 from pymongo import MongoClient
+from pymongo import ReplaceOne
+from pymongo import UpdateOne
 from pymongo.collection import Collection
 from pymongo.database import Database
+from pymongo.results import BulkWriteResult
 
 from common.config import get_collection_name
 from common.config import get_db_name
+from common.config import get_mongo_client_options
 from common.config import get_mongo_uri
 
+# Clients live on the module level, so they are reused by all donation sources
+# in the process and survive between warm GCP Cloud Function invocations.
+_clients: dict[str, MongoClient] = {}
+_clients_lock = Lock()
+
+
+def get_client(mongo_uri: None | str = None) -> MongoClient:
+    """Get a shared pooled MongoClient. The client is created lazily on the first call
+    and reused afterwards. Pool size and timeouts are taken from the config file.
+
+    Parameters
+    ----------
+    mongo_uri : None | str, optional
+        MongoDB URI. If None the URI from config file would be used
+
+    Returns
+    -------
+    MongoClient
+        Shared MongoDB client
+    """
+    mongo_uri = mongo_uri if mongo_uri is not None else get_mongo_uri()
+    client = _clients.get(mongo_uri)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(mongo_uri)
+            if client is None:
+                client = MongoClient(mongo_uri, **get_mongo_client_options())
+                _clients[mongo_uri] = client
+    return client
+
+
+@atexit.register
+def close_clients() -> None:
+    """Closes all shared MongoDB clients. New clients will be created on the next use.
+    Registered to run at interpreter exit, so pools of scripts and workers are closed cleanly."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
 
 def get_database() -> Database:
     """
@@ -18,7 +67,7 @@ def get_database() -> Database:
     Database
         Connection to MongoDB Database
     """
-    return MongoClient(get_mongo_uri())[get_db_name()]
+    return get_client()[get_db_name()]
 
 
 def get_collection(collection_name: None | str = None) -> Collection:
@@ -37,3 +86,126 @@ def get_collection(collection_name: None | str = None) -> Collection:
     """
     collection_name = collection_name if collection_name is not None else get_collection_name()
     return get_database().get_collection(collection_name)
+
+
+def ensure_indexes(collection: Collection) -> None:
+    """Creates indexes required by the donations collection if they don't exist.
+    The latest document datetime of each donation source is looked up by index.
+    Transaction key is unique within the donation source. Documents inserted before
+    transaction keys were introduced don't have the key, so they are not indexed.
+    Exports and analytics find changed documents by updatedAt.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    """
+    collection.create_index(
+        [("donationSource", ASCENDING), ("datetime", DESCENDING)],
+        name="donationSource_datetime",
+    )
+    collection.create_index(
+        [("donationSource", ASCENDING), ("transactionKey", ASCENDING)],
+        name="donationSource_transactionKey",
+        unique=True,
+        partialFilterExpression={"transactionKey": {"$exists": True}},
+    )
+    collection.create_index([("updatedAt", DESCENDING)], name="updatedAt")
+
+
+def get_last_document_datetimes(
+    donation_sources: list[str], collection: None | Collection = None
+) -> dict[str, datetime]:
+    """Looks up the latest document datetime of every donation source in a single query.
+    The sort matches donationSource_datetime index, so each group reads one index entry.
+
+    Parameters
+    ----------
+    donation_sources : list[str]
+        Donation source names
+    collection : None | Collection, optional
+        Donations collection. If None the collection from config file would be used
+
+    Returns
+    -------
+    dict[str, datetime]
+        The latest document datetime keyed by donation source name.
+        Sources without documents are not included
+    """
+    collection = collection if collection is not None else get_collection()
+    pipeline = [
+        {"$match": {"donationSource": {"$in": donation_sources}}},
+        {"$sort": {"donationSource": ASCENDING, "datetime": DESCENDING}},
+        {"$group": {"_id": "$donationSource", "datetime": {"$first": "$datetime"}}},
+    ]
+    return {document["_id"]: document["datetime"] for document in collection.aggregate(pipeline)}
+
+
+def upsert_documents(collection: Collection, documents: list[dict]) -> BulkWriteResult:
+    """Inserts donations which are not stored yet in a single unordered bulk write.
+    Donations are matched by donation source and transaction key,
+    so already stored donations are left untouched. Inserted donations are flagged
+    with rolledUp: false until they are added to rollups, and get updatedAt.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    documents : list[dict]
+        Donation documents
+
+    Returns
+    -------
+    BulkWriteResult
+        Result of the bulk write
+    """
+    updated_at = datetime.utcnow()
+    return collection.bulk_write(
+        [
+            UpdateOne(
+                {
+                    "donationSource": document["donationSource"],
+                    "transactionKey": document["transactionKey"],
+                },
+                {"$setOnInsert": {**document, "rolledUp": False, "updatedAt": updated_at}},
+                upsert=True,
+            )
+            for document in documents
+        ],
+        ordered=False,
+    )
+
+
+def replace_documents(collection: Collection, documents: list[dict]) -> BulkWriteResult:
+    """Inserts or replaces donations in a single unordered bulk write.
+    Donations are matched by donation source and transaction key,
+    so already stored donations are overwritten, for example after a parsing fix.
+    updatedAt is set, so exports and cached reports pick up the changes.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    documents : list[dict]
+        Donation documents
+
+    Returns
+    -------
+    BulkWriteResult
+        Result of the bulk write
+    """
+    updated_at = datetime.utcnow()
+    return collection.bulk_write(
+        [
+            ReplaceOne(
+                {
+                    "donationSource": document["donationSource"],
+                    "transactionKey": document["transactionKey"],
+                },
+                {**document, "updatedAt": updated_at},
+                upsert=True,
+            )
+            for document in documents
+        ],
+        ordered=False,
+    )
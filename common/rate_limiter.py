@@ -0,0 +1,161 @@
+"""This module contains per-provider rate limiting for donation source APIs"""
+import hashlib
+import time
+from threading import Lock
+
+from common.config import get_rate_limits_config
+
+
+class TokenBucket:
+    """A thread-safe token bucket rate limiter. Each request reserves a token
+    and waits until the token is available, so requests are scheduled
+    proactively instead of hitting the API rate limit.
+
+    Parameters
+    ----------
+    rate : float
+        How many tokens are added per second
+    capacity : float
+        Maximum number of tokens, i.e. how many requests can be sent in a burst
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = Lock()
+        self.requests = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def reserve(self) -> float:
+        """Reserves a token.
+
+        Returns
+        -------
+        float
+            How many seconds to wait until the reserved token is available
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            wait = max(-self.tokens / self.rate, 0.0)
+            self.requests += 1
+            if wait > 0:
+                self.waits += 1
+                self.wait_seconds += wait
+            return wait
+
+    def acquire(self) -> float:
+        """Waits until a token is available.
+
+        Returns
+        -------
+        float
+            How many seconds were spent waiting
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def get_metrics(self) -> dict[str, int | float]:
+        """
+        Returns
+        -------
+        dict[str, int | float]
+            Number of requests, number of requests that waited and total time spent waiting
+        """
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+    def reset_metrics(self) -> None:
+        """Resets request and wait counters. Available tokens are kept,
+        so the rate limit still holds across the reset."""
+        with self.lock:
+            self.requests = 0
+            self.waits = 0
+            self.wait_seconds = 0.0
+
+
+_rate_limiters: dict[str, TokenBucket] = {}
+_rate_limiters_lock = Lock()
+
+
+def get_rate_limiter_name(host: str, key: None | str = None) -> str:
+    """Builds rate limiter name. The key is hashed, because it is usually an API token.
+
+    Parameters
+    ----------
+    host : str
+        API host
+    key : None | str, optional
+        Rate limiting key within the host, for example API token, by default None
+
+    Returns
+    -------
+    str
+        Rate limiter name
+    """
+    if key is None:
+        return host
+    return f"{host}/{hashlib.sha256(key.encode()).hexdigest()[:8]}"
+
+
+def get_rate_limiter(host: str, key: None | str = None) -> None | TokenBucket:
+    """Get a shared rate limiter for API host and key. Limits are specified per host
+    in the config file, each key gets its own bucket.
+
+    Parameters
+    ----------
+    host : str
+        API host
+    key : None | str, optional
+        Rate limiting key within the host, for example API token, by default None
+
+    Returns
+    -------
+    None | TokenBucket
+        Rate limiter. None if the host is not rate limited
+    """
+    limit = get_rate_limits_config().get(host)
+    if limit is None:
+        return None
+
+    name = get_rate_limiter_name(host, key)
+    rate_limiter = _rate_limiters.get(name)
+    if rate_limiter is None:
+        with _rate_limiters_lock:
+            rate_limiter = _rate_limiters.get(name)
+            if rate_limiter is None:
+                rate_limiter = TokenBucket(limit["requests_per_minute"] / 60, limit["burst"])
+                _rate_limiters[name] = rate_limiter
+    return rate_limiter
+
+
+def get_rate_limiters_metrics() -> dict[str, dict[str, int | float]]:
+    """
+    Returns
+    -------
+    dict[str, dict[str, int | float]]
+        Metrics of all rate limiters used in the process keyed by rate limiter name
+    """
+    with _rate_limiters_lock:
+        rate_limiters = dict(_rate_limiters)
+    return {name: rate_limiter.get_metrics() for name, rate_limiter in rate_limiters.items()}
+
+
+def reset_rate_limiters_metrics() -> None:
+    """Resets metrics of all rate limiters used in the process. Rate limiters are shared
+    between warm GCP Cloud Function invocations, so metrics are reset at the start of each run."""
+    with _rate_limiters_lock:
+        rate_limiters = list(_rate_limiters.values())
+    for rate_limiter in rate_limiters:
+        rate_limiter.reset_metrics()
@@ -0,0 +1,326 @@
+"""This module contains pre-aggregated daily and monthly rollups of donations.
+Rollups are stored next to the donations collection, for example donations_daily,
+and keep count, amountUSD and amountOriginal totals per donation source, currency and country.
+Donations are inserted with rolledUp: false, and the flag is removed once they are added
+to rollups, so donations of a failed rollup update are added on the next write.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from datetime import timezone
+
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo import DESCENDING
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+
+ROLLUP_PERIODS = ["daily", "monthly"]
+ROLLUP_BATCH_SIZE = 10000
+ROLLUP_FIELDS = [
+    "datetime",
+    "donationSource",
+    "currency",
+    "countryCode",
+    "amountUSD",
+    "amountOriginal",
+]
+ROLLUP_KEY_FIELDS = ["date", "donationSource", "currency", "countryCode"]
+# Aggregation expressions of the period start in UTC, the same as get_period_start
+ROLLUP_DATE_EXPRESSIONS = {
+    "daily": {
+        "$dateFromParts": {
+            "year": {"$year": "$datetime"},
+            "month": {"$month": "$datetime"},
+            "day": {"$dayOfMonth": "$datetime"},
+        }
+    },
+    "monthly": {
+        "$dateFromParts": {"year": {"$year": "$datetime"}, "month": {"$month": "$datetime"}}
+    },
+}
+
+
+def get_rollup_collection(collection: Collection, period: str) -> Collection:
+    """
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    period : str
+        Rollup period, daily or monthly
+
+    Returns
+    -------
+    Collection
+        Rollup collection of the donations collection
+    """
+    return collection.database.get_collection(f"{collection.name}_{period}")
+
+
+def create_rollup_key_index(rollup_collection: Collection) -> None:
+    """Creates unique index of rollup keys, so concurrent upserts
+    of the same key never create two rollup documents.
+
+    Parameters
+    ----------
+    rollup_collection : Collection
+        Rollup collection
+    """
+    rollup_collection.create_index(
+        [(field, ASCENDING) for field in ROLLUP_KEY_FIELDS], name="rollup_key", unique=True
+    )
+
+
+def ensure_rollup_indexes(collection: Collection) -> None:
+    """Creates indexes of all rollup collections and the index of donations
+    which are not added to rollups yet, if they don't exist.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    """
+    collection.create_index(
+        [("donationSource", ASCENDING), ("rolledUp", ASCENDING)],
+        name="donationSource_rolledUp",
+        partialFilterExpression={"rolledUp": False},
+    )
+    for period in ROLLUP_PERIODS:
+        create_rollup_key_index(get_rollup_collection(collection, period))
+
+
+def get_period_start(value: datetime, period: str) -> datetime:
+    """
+    Parameters
+    ----------
+    value : datetime
+        Donation datetime. Naive datetimes are in UTC, as they are stored in MongoDB
+    period : str
+        Rollup period, daily or monthly
+
+    Returns
+    -------
+    datetime
+        Naive UTC start of the day or the month
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    day_start = datetime(value.year, value.month, value.day)
+    return day_start if period == "daily" else day_start.replace(day=1)
+
+
+def get_rollup_increments(documents: list[dict], period: str) -> dict[tuple, dict[str, float]]:
+    """Sums donations by rollup key, so each key is updated once per write.
+
+    Parameters
+    ----------
+    documents : list[dict]
+        Inserted donation documents
+    period : str
+        Rollup period, daily or monthly
+
+    Returns
+    -------
+    dict[tuple, dict[str, float]]
+        count, amountUSD and amountOriginal increments keyed by
+        date, donation source, currency and country code
+    """
+    increments = {}
+    for document in documents:
+        key = (
+            get_period_start(document["datetime"], period),
+            document["donationSource"],
+            document["currency"],
+            document["countryCode"],
+        )
+        increment = increments.setdefault(
+            key, {"count": 0, "amountUSD": 0.0, "amountOriginal": 0.0}
+        )
+        increment["count"] += 1
+        increment["amountUSD"] += document["amountUSD"]
+        increment["amountOriginal"] += document["amountOriginal"]
+    return increments
+
+
+def update_rollups(collection: Collection, documents: list[dict]) -> None:
+    """Adds donations to daily and monthly rollups with $inc upserts.
+    Each donation should be passed only once, otherwise it is counted twice.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    documents : list[dict]
+        Inserted donation documents
+    """
+    if not documents:
+        return
+    for period in ROLLUP_PERIODS:
+        get_rollup_collection(collection, period).bulk_write(
+            [
+                UpdateOne(dict(zip(ROLLUP_KEY_FIELDS, key)), {"$inc": increment}, upsert=True)
+                for key, increment in get_rollup_increments(documents, period).items()
+            ],
+            ordered=False,
+        )
+
+
+def update_pending_rollups(
+    collection: Collection,
+    donation_source: None | str = None,
+    batch_size: int = ROLLUP_BATCH_SIZE,
+) -> int:
+    """Adds donations which are not added to rollups yet, and removes their rolledUp flag.
+    Called after each write, so donations of a previously failed update are added as well.
+    If the flag removal fails after the rollups are updated, donations are counted twice,
+    which is fixed by rebuild_rollups.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    donation_source : None | str, optional
+        Update only donations of this source. If None donations of all sources are updated
+    batch_size : int, optional
+        How many donations to add at once, by default ROLLUP_BATCH_SIZE
+
+    Returns
+    -------
+    int
+        How many donations were added to rollups
+    """
+    query = {"rolledUp": False}
+    if donation_source is not None:
+        query["donationSource"] = donation_source
+    projection = {field: True for field in ROLLUP_FIELDS}
+    count = 0
+    while documents := list(collection.find(query, projection).limit(batch_size)):
+        update_rollups(collection, documents)
+        collection.update_many(
+            {"_id": {"$in": [document["_id"] for document in documents]}},
+            {"$unset": {"rolledUp": ""}},
+        )
+        count += len(documents)
+    return count
+
+
+def aggregate_rollups(
+    collection: Collection, donation_source: str, period: str, last_id: ObjectId
+) -> list[dict]:
+    """Aggregates rollups of a single donation source from the donations collection.
+    The match on donationSource uses donationSource_datetime index. Donations which
+    are not added to rollups yet are skipped, they are added by update_pending_rollups.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    donation_source : str
+        The donation source name
+    period : str
+        Rollup period, daily or monthly
+    last_id : ObjectId
+        Only donations up to this _id are aggregated
+
+    Returns
+    -------
+    list[dict]
+        Rollup documents
+    """
+    pipeline = [
+        {
+            "$match": {
+                "donationSource": donation_source,
+                "_id": {"$lte": last_id},
+                "rolledUp": {"$ne": False},
+            }
+        },
+        {
+            "$group": {
+                "_id": {
+                    "date": ROLLUP_DATE_EXPRESSIONS[period],
+                    "donationSource": "$donationSource",
+                    "currency": "$currency",
+                    "countryCode": {"$ifNull": ["$countryCode", None]},
+                },
+                "count": {"$sum": 1},
+                "amountUSD": {"$sum": "$amountUSD"},
+                "amountOriginal": {"$sum": "$amountOriginal"},
+            }
+        },
+    ]
+    documents = []
+    for document in collection.aggregate(pipeline, allowDiskUse=True):
+        key = document.pop("_id")
+        documents.append({**key, **document})
+    return documents
+
+
+def rebuild_rollups(collection: Collection, max_workers: None | int = None) -> dict[str, int]:
+    """Regenerates rollups from scratch. Each donation source and period is aggregated
+    in parallel into a temporary collection, which then atomically replaces the rollup.
+    Rolled up flags of the donations stored before the rebuild are removed, because they are
+    included in the rebuilt rollups. Donations inserted during the rebuild keep the flag
+    and are added by update_pending_rollups after the next write, so they are never counted
+    twice. Pending donations added to the old rollups while the rebuild is running are lost
+    on replace, so it should be run between sync runs.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    max_workers : None | int, optional
+        Number of concurrent aggregations. If None the ThreadPoolExecutor default is used
+
+    Returns
+    -------
+    dict[str, int]
+        Number of rollup documents keyed by period
+    """
+    last_document = collection.find_one({}, {"_id": True}, sort=[("_id", DESCENDING)])
+    last_id = last_document["_id"] if last_document is not None else ObjectId()
+    collection.update_many(
+        {"_id": {"$lte": last_id}, "rolledUp": False}, {"$unset": {"rolledUp": ""}}
+    )
+    donation_sources = collection.distinct("donationSource")
+    tasks = [
+        (donation_source, period)
+        for period in ROLLUP_PERIODS
+        for donation_source in donation_sources
+    ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            lambda task: aggregate_rollups(collection, *task, last_id=last_id), tasks
+        )
+        rollups = {period: [] for period in ROLLUP_PERIODS}
+        for (_, period), documents in zip(tasks, results):
+            rollups[period].extend(documents)
+
+    counts = {}
+    for period, documents in rollups.items():
+        rollup_collection = get_rollup_collection(collection, period)
+        tmp_collection = collection.database.get_collection(f"{rollup_collection.name}_rebuild")
+        tmp_collection.drop()
+        create_rollup_key_index(tmp_collection)
+        if documents:
+            tmp_collection.insert_many(documents, ordered=False)
+        tmp_collection.rename(rollup_collection.name, dropTarget=True)
+        counts[period] = len(documents)
+    return counts
+
+
+def build_missing_rollups(collection: Collection) -> None:
+    """Builds rollups from scratch if there are none yet, for example on the first
+    deployment, when donations were stored before rollups were introduced.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    """
+    if not any(
+        get_rollup_collection(collection, period).find_one({}, {"_id": True})
+        for period in ROLLUP_PERIODS
+    ) and collection.find_one({}, {"_id": True}):
+        for period, count in rebuild_rollups(collection).items():
+            print(f"Built {count} {period} rollups")
@@ -0,0 +1,113 @@
+"""This module contains a cache for OAuth access tokens"""
+import json
+import os
+import time
+from collections.abc import Callable
+from functools import cache
+from threading import Lock
+
+from common.config import get_cache_config
+
+# Tokens are refreshed a bit earlier than they expire,
+# so they don't expire in the middle of a paginated fetch.
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+
+class AccessTokenCache:
+    """A thread-safe cache of OAuth access tokens keyed by client id.
+    Tokens are kept until shortly before expiry and can be optionally persisted
+    to a local file, so warm restarts can reuse them.
+
+    Parameters
+    ----------
+    filepath : None | str, optional
+        JSON file to persist tokens to. If None tokens are kept in memory only
+    """
+
+    def __init__(self, filepath: None | str = None):
+        self.filepath = filepath
+        self.tokens: dict[str, dict[str, str | float]] = self.load()
+        self.lock = Lock()
+        self.key_locks: dict[str, Lock] = {}
+
+    def load(self) -> dict[str, dict[str, str | float]]:
+        """Loads persisted tokens. Missing or corrupted file is ignored.
+
+        Returns
+        -------
+        dict[str, dict[str, str | float]]
+            Tokens with expiry timestamps keyed by client id
+        """
+        if self.filepath is None:
+            return {}
+        try:
+            with open(self.filepath, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def dump(self) -> None:
+        """Atomically persists tokens to the file, readable by the owner only"""
+        if self.filepath is None:
+            return
+        os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+        tmp_filepath = f"{self.filepath}.tmp"
+        with open(
+            os.open(tmp_filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600),
+            "w",
+            encoding="utf-8",
+        ) as f:
+            json.dump(self.tokens, f)
+        os.replace(tmp_filepath, self.filepath)
+
+    def get(self, key: str, fetch_token: Callable[[], dict]) -> str:
+        """Returns cached access token or fetches a new one if the cached token
+        is missing or about to expire. Only one thread fetches a token for the same key,
+        others wait and reuse the fetched token.
+
+        Parameters
+        ----------
+        key : str
+            Cache key, for example client id
+        fetch_token : Callable[[], dict]
+            Function that returns OAuth response with access_token and expires_in fields
+
+        Returns
+        -------
+        str
+            Access token
+        """
+        with self.lock:
+            key_lock = self.key_locks.setdefault(key, Lock())
+
+        with key_lock:
+            token = self.tokens.get(key)
+            if (
+                token is not None
+                and token["expires_at"] - time.time() > TOKEN_REFRESH_MARGIN_SECONDS
+            ):
+                return token["access_token"]
+
+            response = fetch_token()
+            with self.lock:
+                self.tokens[key] = {
+                    "access_token": response["access_token"],
+                    "expires_at": time.time() + response["expires_in"],
+                }
+                self.dump()
+            return response["access_token"]
+
+
+@cache
+def get_access_token_cache() -> AccessTokenCache:
+    """
+    Returns
+    -------
+    AccessTokenCache
+        Process-wide access token cache configured in the config file
+    """
+    cache_config = get_cache_config()
+    filepath = None
+    if cache_config["persist_tokens"]:
+        filepath = os.path.join(cache_config["dir"], "tokens.json")
+    return AccessTokenCache(filepath)
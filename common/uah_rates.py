@@ -0,0 +1,272 @@
+"""This module contains historical USD / UAH rates index"""
+import os
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from threading import Lock
+
+import numpy as np
+from pymongo import ASCENDING
+from pymongo import UpdateOne
+
+from common.config import get_cache_config
+from common.config import get_uah_rates_collection_name
+from common.constants import NBU_ENDPOINT_URL
+from common.constants import UAH_RATES_START_DATE
+from common.http import get_json
+from common.mongo import get_collection
+
+UAH_RATES_CACHE_FILENAME = "uah_rates.npz"
+
+
+class UahRateIndex:
+    """Date indexed USD / UAH rates. Rates are stored in arrays sorted by date,
+    so lookups are a binary search. For dates without a rate,
+    the closest previous rate is used (the first rate for dates before the index).
+
+    Parameters
+    ----------
+    dates : np.ndarray
+        Sorted array of dates with datetime64[D] dtype
+    rates : np.ndarray
+        USD / UAH rates for each date
+    """
+
+    def __init__(self, dates: np.ndarray, rates: np.ndarray):
+        self.dates = dates.astype("datetime64[D]")
+        self.rates = rates.astype(float)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def last_date(self) -> None | date:
+        """
+        Returns
+        -------
+        None | date
+            The latest date in the index. None if the index is empty
+        """
+        return self.dates[-1].astype(date) if len(self) else None
+
+    def get_rates(self, dates: np.ndarray) -> np.ndarray:
+        """Looks up USD / UAH rates for the dates.
+
+        Parameters
+        ----------
+        dates : np.ndarray
+            Array of dates with datetime64[D] dtype. The latest rate is used for NaT
+
+        Returns
+        -------
+        np.ndarray
+            USD / UAH rates
+        """
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        indices = np.searchsorted(self.dates, dates, side="right") - 1
+        indices = np.clip(indices, 0, len(self) - 1)
+        indices[np.isnat(dates)] = len(self) - 1
+        return self.rates[indices]
+
+    def get_rate(self, rate_date: None | date | datetime) -> float:
+        """Looks up USD / UAH rate for the date.
+
+        Parameters
+        ----------
+        rate_date : None | date | datetime
+            The transaction date. The latest rate is used for None
+
+        Returns
+        -------
+        float
+            USD / UAH rate
+        """
+        if isinstance(rate_date, datetime):
+            rate_date = rate_date.date()
+        return float(self.get_rates(np.array([rate_date], dtype="datetime64[D]"))[0])
+
+    def merge(self, dates: np.ndarray, rates: np.ndarray) -> "UahRateIndex":
+        """Merges new rates into the index. New rates take priority for the same dates.
+
+        Parameters
+        ----------
+        dates : np.ndarray
+            Array of dates with datetime64[D] dtype
+        rates : np.ndarray
+            USD / UAH rates for each date
+
+        Returns
+        -------
+        UahRateIndex
+            New merged index
+        """
+        all_dates = np.concatenate([np.asarray(dates, dtype="datetime64[D]"), self.dates])
+        all_rates = np.concatenate([np.asarray(rates, dtype=float), self.rates])
+        all_dates, indices = np.unique(all_dates, return_index=True)
+        return UahRateIndex(all_dates, all_rates[indices])
+
+    def save(self, filepath: str) -> None:
+        """Atomically saves the index to the local file.
+
+        Parameters
+        ----------
+        filepath : str
+            Path to the index file
+        """
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        tmp_filepath = f"{filepath}.{os.getpid()}.tmp"
+        with open(tmp_filepath, "wb") as f:
+            np.savez(f, dates=self.dates.astype(np.int64), rates=self.rates)
+        os.replace(tmp_filepath, filepath)
+
+    @classmethod
+    def load(cls, filepath: str) -> "UahRateIndex":
+        """Loads the index from the local file.
+
+        Parameters
+        ----------
+        filepath : str
+            Path to the index file
+
+        Returns
+        -------
+        UahRateIndex
+            Loaded index
+        """
+        with np.load(filepath) as data:
+            return cls(data["dates"].astype("datetime64[D]"), data["rates"])
+
+    @classmethod
+    def load_from_mongo(cls) -> "UahRateIndex":
+        """
+        Returns
+        -------
+        UahRateIndex
+            Index loaded from MongoDB collection
+        """
+        documents = list(
+            get_collection(get_uah_rates_collection_name()).find({}, sort=[("_id", ASCENDING)])
+        )
+        dates = np.array([document["_id"] for document in documents], dtype="datetime64[D]")
+        rates = np.array([document["rate"] for document in documents], dtype=float)
+        return cls(dates, rates)
+
+
+_uah_rate_index: None | UahRateIndex = None
+_uah_rate_index_lock = Lock()
+
+
+def get_uah_rates_cache_filepath() -> str:
+    """
+    Returns
+    -------
+    str
+        Path to the local USD / UAH rates index file
+    """
+    return os.path.join(get_cache_config()["dir"], UAH_RATES_CACHE_FILENAME)
+
+
+def load_uah_rate_index() -> UahRateIndex:
+    """Loads the index from the local file or, if there is no file, from MongoDB.
+
+    Returns
+    -------
+    UahRateIndex
+        Loaded index
+    """
+    try:
+        return UahRateIndex.load(get_uah_rates_cache_filepath())
+    except (OSError, ValueError, KeyError):
+        return UahRateIndex.load_from_mongo()
+
+
+def get_uah_rate_index() -> UahRateIndex:
+    """Get process-wide USD / UAH rates index. The index is loaded lazily without
+    requests to rates APIs, use update_uah_rate_index to fetch new rates.
+
+    Returns
+    -------
+    UahRateIndex
+        USD / UAH rates index
+    """
+    global _uah_rate_index  # pylint: disable=global-statement
+    if _uah_rate_index is None:
+        with _uah_rate_index_lock:
+            if _uah_rate_index is None:
+                _uah_rate_index = load_uah_rate_index()
+    return _uah_rate_index
+
+
+def fetch_uah_rates(start_date: date, end_date: date) -> tuple[np.ndarray, np.ndarray]:
+    """Fetches official USD / UAH rates from National Bank of Ukraine API.
+
+    Parameters
+    ----------
+    start_date : date
+        The first date to fetch
+    end_date : date
+        The last date to fetch
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        Dates with datetime64[D] dtype and USD / UAH rates
+    """
+    response = get_json(
+        f"{NBU_ENDPOINT_URL}/NBU_Exchange/exchange_site",
+        params={
+            "start": start_date.strftime("%Y%m%d"),
+            "end": end_date.strftime("%Y%m%d"),
+            "valcode": "usd",
+            "sort": "exchangedate",
+            "order": "asc",
+            "json": "",
+        },
+    )
+    dates = np.array(
+        [datetime.strptime(rate_info["exchangedate"], "%d.%m.%Y") for rate_info in response],
+        dtype="datetime64[D]",
+    )
+    rates = np.array([rate_info["rate_per_unit"] for rate_info in response], dtype=float)
+    return dates, rates
+
+
+def update_uah_rate_index() -> UahRateIndex:
+    """Fetches rates which are missing in the index up to the current date,
+    and stores them in MongoDB and the local file.
+
+    Returns
+    -------
+    UahRateIndex
+        Updated USD / UAH rates index
+    """
+    global _uah_rate_index  # pylint: disable=global-statement
+    with _uah_rate_index_lock:
+        uah_rate_index = _uah_rate_index if _uah_rate_index is not None else load_uah_rate_index()
+        start_date = (
+            uah_rate_index.last_date + timedelta(days=1)
+            if uah_rate_index.last_date is not None
+            else UAH_RATES_START_DATE
+        )
+        end_date = datetime.utcnow().date()
+        filepath = get_uah_rates_cache_filepath()
+        if start_date <= end_date:
+            dates, rates = fetch_uah_rates(start_date, end_date)
+            if len(dates):
+                get_collection(get_uah_rates_collection_name()).bulk_write(
+                    [
+                        UpdateOne(
+                            {"_id": datetime.combine(rate_date.astype(date), datetime.min.time())},
+                            {"$set": {"rate": float(rate)}},
+                            upsert=True,
+                        )
+                        for rate_date, rate in zip(dates, rates)
+                    ],
+                    ordered=False,
+                )
+                uah_rate_index = uah_rate_index.merge(dates, rates)
+                uah_rate_index.save(filepath)
+        if len(uah_rate_index) and not os.path.exists(filepath):
+            uah_rate_index.save(filepath)
+        _uah_rate_index = uah_rate_index
+    return uah_rate_index
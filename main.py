@@ -1,21 +1,153 @@
-"""This module contains entry point for GCP Cloud Function"""
+"""This module contains entry point for GCP Cloud Function.
+Donation sources, MongoDB and HTTP clients are imported lazily on the first invocation,
+and only for the configured source types, so the function cold start stays fast.
+"""
+# pylint: disable=import-outside-toplevel
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+from common.config import get_metrics_config
 from common.config import get_sources
-from sources.monobank import Monobank
-from sources.paypal import PayPal
-from sources.privatbank import Privatbank
+from common.config import get_sync_config
+
+if TYPE_CHECKING:
+    from sources.base import SourceBase
+
+AUTO_SOURCE_TYPES = ["PayPal", "Monobank", "Privatbank"]
+
+
+def get_source_class(source_type: str) -> type["SourceBase"]:
+    """Maps source type from the config file to the donation source class.
+
+    Parameters
+    ----------
+    source_type : str
+        Source type, for example PayPal
+
+    Returns
+    -------
+    type[SourceBase]
+        Donation source class
+    """
+    match source_type:
+        case "PayPal":
+            from sources.paypal import PayPal
+
+            return PayPal
+        case "Monobank":
+            from sources.monobank import Monobank
+
+            return Monobank
+        case "Privatbank":
+            from sources.privatbank import Privatbank
+
+            return Privatbank
+    raise ValueError(f"Source type {source_type} is not supported")
+
+
+def sync_source(
+    source_dict: dict, last_document_datetimes: dict[str, datetime], checkpoints: dict[str, dict]
+) -> None:
+    """Fetches and writes new data for a single donation source.
+
+    Parameters
+    ----------
+    source_dict : dict
+        Donation source config
+    last_document_datetimes : dict[str, datetime]
+        The latest document datetimes of donation sources without checkpoints
+    checkpoints : dict[str, dict]
+        Sync checkpoints of donation sources
+    """
+    source = get_source_class(source_dict["type"])(
+        source_dict["name"],
+        last_document_datetimes=last_document_datetimes,
+        checkpoints=checkpoints,
+    )
+    source.write_new_data(backfill=get_sync_config()["backfill"])
 
 
 def update_dashboard(*args, **kwargs) -> None:
     # pylint: disable=unused-argument
-    """Entry point for GCP Cloud Function that updates dashboard"""
-    for source_dict in get_sources("PayPal"):
-        PayPal(source_dict["name"]).write_new_data()
+    """Entry point for GCP Cloud Function that updates dashboard.
+    Donation sources are synced concurrently, so one slow or failing source
+    does not block the others. Failures are reported after all sources finish.
+
+    Raises
+    ------
+    RuntimeError
+        If at least one of the donation sources failed to sync.
+    """
+    from common.checkpoints import get_checkpoints
+    from common.metrics import get_registry
+    from common.metrics import inc_counter
+    from common.metrics import push_metrics
+    from common.mongo import get_collection
+    from common.mongo import get_last_document_datetimes
+    from common.rate_limiter import get_rate_limiters_metrics
+    from common.rate_limiter import reset_rate_limiters_metrics
+    from common.uah_rates import update_uah_rate_index
+
+    # Warm invocations share the process, so metrics are reset to describe only this run
+    get_registry().reset()
+    reset_rate_limiters_metrics()
+    try:
+        update_uah_rate_index()
+    except Exception as exception:  # pylint: disable=broad-except
+        # Previously stored rates are still good enough to convert new donations
+        print(f"Failed to update USD / UAH rates | {exception!r}")
+
+    source_dicts = [
+        source_dict for source_type in AUTO_SOURCE_TYPES for source_dict in get_sources(source_type)
+    ]
+    # Indexes are created by mongo/enforce_schema.py on deployment, not on each run
+    collection = get_collection()
+    names = [source_dict["name"] for source_dict in source_dicts]
+    checkpoints = get_checkpoints(names)
+    # Sources synced before checkpoints were introduced resume from the stored data
+    names_without_checkpoints = [name for name in names if name not in checkpoints]
+    last_document_datetimes = (
+        get_last_document_datetimes(names_without_checkpoints, collection)
+        if names_without_checkpoints
+        else {}
+    )
+
+    with ThreadPoolExecutor(max_workers=get_sync_config()["max_workers"]) as executor:
+        futures = {
+            source_dict["name"]: executor.submit(
+                sync_source, source_dict, last_document_datetimes, checkpoints
+            )
+            for source_dict in source_dicts
+        }
+
+    failed = []
+    for name, future in futures.items():
+        exception = future.exception()
+        inc_counter("sync_runs", source=name, status="ok" if exception is None else "failed")
+        if exception is None:
+            print(f"{name} | OK")
+        else:
+            failed.append(name)
+            traceback.print_exception(exception)
+            print(f"{name} | FAILED | {exception!r}")
+
+    for name, metrics in get_rate_limiters_metrics().items():
+        print(
+            f"{name} | Rate limiter waited {metrics['wait_seconds']}s "
+            f"for {metrics['waits']} of {metrics['requests']} requests"
+        )
 
-    for source_dict in get_sources("Monobank"):
-        Monobank(source_dict["name"]).write_new_data()
+    metrics_config = get_metrics_config()
+    if metrics_config.get("pushgateway_url"):
+        try:
+            push_metrics(metrics_config["pushgateway_url"], metrics_config["job"])
+        except Exception as exception:  # pylint: disable=broad-except
+            print(f"Failed to push metrics | {exception!r}")
 
-    for source_dict in get_sources("Privatbank"):
-        Privatbank(source_dict["name"]).write_new_data()
+    if failed:
+        raise RuntimeError(f"Failed to sync donation sources: {', '.join(failed)}")
 
 
 if __name__ == "__main__":
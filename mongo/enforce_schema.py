@@ -1,22 +1,25 @@
 """This module contains logic to enforce schema validation on MongoDB collection"""
 from common.config import get_collection_name
 from common.config import get_sources_names_list
+from common.mongo import ensure_indexes
 from common.mongo import get_database
+from common.rollups import build_missing_rollups
+from common.rollups import ensure_rollup_indexes
 
 
-def enforce_schema(
-    collection: str = get_collection_name(), sources: list[str] = get_sources_names_list()
-) -> None:
+def enforce_schema(collection: None | str = None, sources: None | list[str] = None) -> None:
     """Enforces schema validation on MongoDB collection. See more:
     https://www.mongodb.com/docs/manual/core/schema-validation/specify-json-schema/
 
     Parameters
     ----------
-    collection : str, optional
-        Collection name, by default get_collection_name()
-    sources : list[str], optional
-        List of allowed donation sources, by default get_sources_names_list()
+    collection : None | str, optional
+        Collection name. If None the name from config file would be used
+    sources : None | list[str], optional
+        List of allowed donation sources. If None all sources from config file are allowed
     """
+    collection = collection if collection is not None else get_collection_name()
+    sources = sources if sources is not None else get_sources_names_list()
     db = get_database()
     validator = {
         "$jsonSchema": {
@@ -77,11 +80,26 @@ def enforce_schema(
                     "bsonType": ["string", "null"],
                     "description": "must be a string or null and is required",
                 },
+                "transactionKey": {
+                    "bsonType": ["string"],
+                    "description": "must be a string unique within the donation source",
+                },
+                "updatedAt": {
+                    "bsonType": ["date"],
+                    "description": "must be a date of the last write",
+                },
+                "rolledUp": {
+                    "bsonType": ["bool"],
+                    "description": "is false until the donation is added to rollups",
+                },
             },
         }
     }
 
     db.command("collMod", collection, validator=validator, validationLevel="strict")
+    ensure_indexes(db.get_collection(collection))
+    ensure_rollup_indexes(db.get_collection(collection))
+    build_missing_rollups(db.get_collection(collection))
 
 
 if __name__ == "__main__":
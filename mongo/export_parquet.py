@@ -0,0 +1,275 @@
+"""This module contains entry point to export donations to Parquet files partitioned
+by donation source and month, for example:
+python mongo/export_parquet.py -o exports/donations
+Partitions use hive layout, so they can be read with pyarrow.dataset or pandas.read_parquet.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from datetime import timedelta
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+
+from common.mongo import get_collection
+from common.rollups import ROLLUP_DATE_EXPRESSIONS
+
+DEFAULT_BATCH_SIZE = 50000
+STATE_FILENAME = "_export_state.json"
+# updatedAt and ObjectIds are generated by different clients and servers, so partitions
+# are re-checked a bit before the previous export, in case their clocks are slightly off.
+WATERMARK_MARGIN = timedelta(minutes=5)
+# donationSource is the partition column, so it is not stored in the files
+SCHEMA = pa.schema(
+    [
+        ("_id", pa.string()),
+        ("datetime", pa.timestamp("ms")),
+        ("senderName", pa.string()),
+        ("senderNameCensored", pa.string()),
+        ("senderEmail", pa.string()),
+        ("senderNote", pa.string()),
+        ("countryCode", pa.string()),
+        ("currency", pa.string()),
+        ("amountOriginal", pa.float64()),
+        ("amountUSD", pa.float64()),
+        ("insertionMode", pa.string()),
+        ("transactionKey", pa.string()),
+    ]
+)
+
+
+def get_partition_dir(output_dir: str, donation_source: str, month: datetime) -> str:
+    """
+    Parameters
+    ----------
+    output_dir : str
+        Export directory
+    donation_source : str
+        The donation source name
+    month : datetime
+        The start of the month
+
+    Returns
+    -------
+    str
+        Hive partition directory. The source name is URI encoded
+    """
+    return os.path.join(
+        output_dir,
+        f"donationSource={quote(donation_source, safe='')}",
+        f"month={month:%Y-%m}",
+    )
+
+
+def get_changed_partitions(
+    collection: Collection, since: None | datetime = None
+) -> list[tuple[str, datetime]]:
+    """Finds partitions with documents inserted or replaced since the datetime.
+    Documents written before updatedAt was introduced are found by ObjectId insertion time.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    since : None | datetime, optional
+        Find partitions with documents written from this datetime. If None all partitions
+
+    Returns
+    -------
+    list[tuple[str, datetime]]
+        Donation source and month start of changed partitions
+    """
+    pipeline = [
+        {"$project": {"_id": True, "donationSource": True, "datetime": True}},
+        {
+            "$group": {
+                "_id": {"source": "$donationSource", "month": ROLLUP_DATE_EXPRESSIONS["monthly"]}
+            }
+        },
+    ]
+    if since is not None:
+        pipeline.insert(
+            0,
+            {
+                "$match": {
+                    "$or": [
+                        {"updatedAt": {"$gte": since}},
+                        {"_id": {"$gte": ObjectId.from_datetime(since)}},
+                    ]
+                }
+            },
+        )
+    return sorted(
+        (document["_id"]["source"], document["_id"]["month"])
+        for document in collection.aggregate(pipeline, allowDiskUse=True)
+    )
+
+
+def export_partition(
+    collection: Collection,
+    donation_source: str,
+    month: datetime,
+    output_dir: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Streams documents of the partition through a projected cursor and writes them
+    batch by batch into a single Parquet file, so memory usage doesn't depend on the
+    partition size. The file is written next to the previous one and atomically replaces it.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    donation_source : str
+        The donation source name
+    month : datetime
+        The start of the month
+    output_dir : str
+        Export directory
+    batch_size : int, optional
+        How many documents to read and convert at once, by default DEFAULT_BATCH_SIZE
+
+    Returns
+    -------
+    int
+        How many documents were written
+    """
+    next_month = (month + timedelta(days=32)).replace(day=1)
+    cursor = collection.find(
+        {"donationSource": donation_source, "datetime": {"$gte": month, "$lt": next_month}},
+        {field: True for field in SCHEMA.names},
+        batch_size=batch_size,
+    ).sort([("donationSource", ASCENDING), ("datetime", ASCENDING)])
+
+    partition_dir = get_partition_dir(output_dir, donation_source, month)
+    os.makedirs(partition_dir, exist_ok=True)
+    filepath = os.path.join(partition_dir, "part-0.parquet")
+    tmp_filepath = f"{filepath}.tmp"
+    rows = 0
+    with pq.ParquetWriter(tmp_filepath, SCHEMA, compression="zstd") as writer:
+        batch = []
+        for document in cursor:
+            document["_id"] = str(document["_id"])
+            batch.append(document)
+            if len(batch) >= batch_size:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=SCHEMA))
+                rows += len(batch)
+                batch = []
+        if batch or not rows:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=SCHEMA))
+            rows += len(batch)
+    os.replace(tmp_filepath, filepath)
+    return rows
+
+
+def load_state(output_dir: str) -> dict:
+    """
+    Parameters
+    ----------
+    output_dir : str
+        Export directory
+
+    Returns
+    -------
+    dict
+        State of the previous export. Empty if there was no export
+    """
+    try:
+        with open(os.path.join(output_dir, STATE_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(output_dir: str, state: dict) -> None:
+    """
+    Parameters
+    ----------
+    output_dir : str
+        Export directory
+    state : dict
+        State of the export
+    """
+    filepath = os.path.join(output_dir, STATE_FILENAME)
+    with open(f"{filepath}.tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{filepath}.tmp", filepath)
+
+
+def export_parquet(
+    collection: Collection,
+    output_dir: str,
+    full: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> dict[str, int]:
+    """Exports donations to Parquet files partitioned by donation source and month.
+    By default, only partitions with documents inserted or replaced since the previous export
+    are rewritten. The export watermark is saved only after all partitions are written,
+    so an interrupted export is repeated on the next run.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    output_dir : str
+        Export directory
+    full : bool, optional
+        Rewrite all partitions, by default False
+    batch_size : int, optional
+        How many documents to read and convert at once, by default DEFAULT_BATCH_SIZE
+
+    Returns
+    -------
+    dict[str, int]
+        Number of written partitions and rows
+    """
+    started_at = datetime.utcnow()
+    state = load_state(output_dir) if not full else {}
+    since = None
+    if state.get("exportedFrom"):
+        since = datetime.fromisoformat(state["exportedFrom"]) - WATERMARK_MARGIN
+
+    partitions = get_changed_partitions(collection, since)
+    rows = 0
+    for donation_source, month in partitions:
+        partition_rows = export_partition(
+            collection, donation_source, month, output_dir, batch_size
+        )
+        rows += partition_rows
+        print(f"{donation_source} | {month:%Y-%m} | Exported {partition_rows} rows")
+
+    os.makedirs(output_dir, exist_ok=True)
+    save_state(output_dir, {"exportedFrom": started_at.isoformat()})
+    return {"partitions": len(partitions), "rows": rows}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-o", "--output_dir", type=str, required=True, help="Export directory")
+    parser.add_argument("-c", "--collection", type=str, default=None, help="Donations collection")
+    parser.add_argument(
+        "--full", action="store_true", help="Rewrite all partitions instead of the changed ones"
+    )
+    parser.add_argument(
+        "-b",
+        "--batch_size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="How many documents to read and convert at once",
+    )
+    args = parser.parse_args()
+
+    export_started_at = time.perf_counter()
+    result = export_parquet(
+        get_collection(args.collection), args.output_dir, args.full, args.batch_size
+    )
+    print(
+        f"Exported {result['rows']} rows to {result['partitions']} partitions "
+        f"in {time.perf_counter() - export_started_at:.1f}s"
+    )
@@ -0,0 +1,20 @@
+"""This module contains entry point to regenerate daily and monthly rollups of donations"""
+import argparse
+import time
+
+from common.mongo import get_collection
+from common.rollups import rebuild_rollups
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--collection", type=str, default=None, help="Donations collection")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="Number of concurrent aggregations"
+    )
+    args = parser.parse_args()
+
+    started_at = time.perf_counter()
+    counts = rebuild_rollups(get_collection(args.collection), args.workers)
+    for period, count in counts.items():
+        print(f"Rebuilt {count} {period} rollups")
+    print(f"Finished in {time.perf_counter() - started_at:.1f}s")
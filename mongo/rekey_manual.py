@@ -0,0 +1,62 @@
+"""This module contains entry point to recompute transaction keys of manual donations.
+Keys of CSV rows are built from normalized fields, so keys stored by earlier versions
+are updated once to match the keys of the same rows imported again:
+python mongo/rekey_manual.py
+"""
+import argparse
+from datetime import datetime
+
+import pandas as pd
+from pymongo import ASCENDING
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+
+from common.mongo import get_collection
+from sources.manual import FINGERPRINT_FIELDS
+from sources.manual import Manual
+
+
+def rekey_manual_documents(collection: Collection) -> int:
+    """Recomputes transaction keys of manual donations from their stored fields.
+    Identical donations of a source are numbered in the insertion order,
+    the same way as identical rows of the imported files.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+
+    Returns
+    -------
+    int
+        How many documents were updated
+    """
+    updated = 0
+    updated_at = datetime.utcnow()
+    for donation_source in collection.distinct("donationSource", {"insertionMode": "Manual"}):
+        documents = list(
+            collection.find(
+                {"donationSource": donation_source, "insertionMode": "Manual"},
+                {field: True for field in ["_id", "transactionKey", *FINGERPRINT_FIELDS]},
+            ).sort("_id", ASCENDING)
+        )
+        keys = Manual.get_transaction_keys(pd.DataFrame.from_dict(documents))
+        requests = [
+            UpdateOne(
+                {"_id": document["_id"]}, {"$set": {"transactionKey": key, "updatedAt": updated_at}}
+            )
+            for document, key in zip(documents, keys)
+            if document.get("transactionKey") != key
+        ]
+        if requests:
+            updated += collection.bulk_write(requests, ordered=False).modified_count
+        print(f"{donation_source} | Updated {len(requests)} of {len(documents)} keys")
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", "--collection", type=str, default=None, help="Donations collection")
+    args = parser.parse_args()
+
+    print(f"Updated {rekey_manual_documents(get_collection(args.collection))} keys")
@@ -0,0 +1,159 @@
+"""This module contains entry point to rebuild donations from the archive of raw API responses.
+Archived responses are parsed again without any requests to donation source APIs, for example:
+python mongo/reprocess_archive.py -d "Dzyga's Paw Charity Accounts" --replace
+"""
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from common.archive import get_archive_bucket
+from common.archive import get_archive_donation_source
+from common.archive import get_archive_filenames
+from common.archive import iter_archive
+from common.config import get_source
+from common.mongo import get_collection
+from common.mongo import replace_documents
+from common.mongo import upsert_documents
+from common.rollups import rebuild_rollups
+from common.rollups import update_pending_rollups
+from main import get_source_class
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+def reprocess_file(filename: str, bucket_name: None | str = None) -> list[dict]:
+    """Parses archived responses of a window into documents, the same way
+    as they are parsed when fetched from the API.
+
+    Parameters
+    ----------
+    filename : str
+        Archive file name
+    bucket_name : None | str, optional
+        Archive bucket name. If None the bucket from config file would be used
+
+    Returns
+    -------
+    list[dict]
+        Documents to write
+    """
+    donation_source = get_archive_donation_source(filename)
+    source_class = get_source_class(get_source(donation_source)["type"])
+    source = source_class(donation_source, last_document_datetimes={}, checkpoints={})
+    documents = []
+    for record in iter_archive(get_archive_bucket(bucket_name), filename):
+        source.set_window(record)
+        documents.extend(source.get_documents(source.parse_transactions(record["transactions"])))
+    return documents
+
+
+def reprocess_archive(
+    filenames: list[str],
+    replace: bool = False,
+    dry_run: bool = False,
+    max_workers: None | int = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    bucket_name: None | str = None,
+) -> dict[str, int]:
+    """Parses archive files in a pool of processes and writes documents to the collection
+    in unordered bulk writes, while other files are still parsed.
+
+    Parameters
+    ----------
+    filenames : list[str]
+        Archive file names
+    replace : bool, optional
+        Overwrite stored donations and rebuild rollups. Otherwise, only missing donations
+        are inserted, by default False
+    dry_run : bool, optional
+        Parse files without writing, by default False
+    max_workers : None | int, optional
+        Number of processes. If None the number of CPUs is used
+    batch_size : int, optional
+        How many documents to write at once, by default DEFAULT_BATCH_SIZE
+    bucket_name : None | str, optional
+        Archive bucket name. If None the bucket from config file would be used
+
+    Returns
+    -------
+    dict[str, int]
+        Number of parsed and written documents
+    """
+    collection = get_collection()
+    counts = {"parsed": 0, "written": 0}
+    batch = []
+
+    def write_batch(documents: list[dict]) -> None:
+        if replace:
+            result = replace_documents(collection, documents)
+            counts["written"] += result.upserted_count + result.modified_count
+        else:
+            result = upsert_documents(collection, documents)
+            update_pending_rollups(collection)
+            counts["written"] += result.upserted_count
+
+    # Spawned workers do not inherit MongoDB client and its threads from the parent process
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+        results = executor.map(partial(reprocess_file, bucket_name=bucket_name), filenames)
+        for filename, documents in zip(filenames, results):
+            print(f"{filename} | Parsed {len(documents)} rows")
+            counts["parsed"] += len(documents)
+            if dry_run:
+                continue
+            batch.extend(documents)
+            while len(batch) >= batch_size:
+                write_batch(batch[:batch_size])
+                batch = batch[batch_size:]
+    if batch:
+        write_batch(batch)
+    if replace and not dry_run:
+        # Replaced donations may have changed amounts, so rollups are regenerated
+        rebuild_rollups(collection)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-d", "--donation_source", type=str, default=None, help="Reprocess only this source"
+    )
+    parser.add_argument(
+        "-a",
+        "--archive_bucket",
+        type=str,
+        default=None,
+        help="Archive GridFS bucket. If not set, the one from config file is used",
+    )
+    parser.add_argument(
+        "--replace", action="store_true", help="Overwrite stored donations and rebuild rollups"
+    )
+    parser.add_argument("-n", "--dry_run", action="store_true", help="Parse without writing")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of processes")
+    parser.add_argument(
+        "-b",
+        "--batch_size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="How many documents to write at once",
+    )
+    args = parser.parse_args()
+
+    archive_filenames = get_archive_filenames(
+        get_archive_bucket(args.archive_bucket), args.donation_source
+    )
+    started_at = time.perf_counter()
+    result = reprocess_archive(
+        archive_filenames,
+        args.replace,
+        args.dry_run,
+        args.workers,
+        args.batch_size,
+        args.archive_bucket,
+    )
+    print(
+        f"Parsed {result['parsed']} rows from {len(archive_filenames)} files, "
+        f"wrote {result['written']} in {time.perf_counter() - started_at:.1f}s"
+    )
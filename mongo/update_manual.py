@@ -1,13 +1,258 @@
-"""This module contains entry point to manually update donation source from CSV"""
+"""This module contains entry point to manually update donation sources from CSV files"""
 import argparse
+import glob
+import multiprocessing
+import os
 import pathlib
+import time
+from collections import Counter
+from collections import defaultdict
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
 
+import pandas as pd
+import yaml
+
+from common.uah_rates import update_uah_rate_index
 from sources.manual import Manual
+from sources.manual import convert_chunk
+from sources.manual import get_stored_occurrences
+
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_CHUNKSIZE = 50000
+
+
+def resolve_filepaths(patterns: list[str]) -> list[str]:
+    """Expands directories and glob patterns into CSV file paths.
+
+    Parameters
+    ----------
+    patterns : list[str]
+        File paths, directories with CSV files or glob patterns
+
+    Returns
+    -------
+    list[str]
+        Sorted unique CSV file paths
+    """
+    filepaths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            filepaths.update(glob.glob(os.path.join(pattern, "*.csv")))
+        elif glob.has_magic(pattern):
+            filepaths.update(glob.glob(pattern, recursive=True))
+        else:
+            filepaths.add(pattern)
+    return sorted(filepaths)
+
+
+def load_mapping(filepath: str) -> dict[str, list[str]]:
+    """Loads yaml mapping file of donation sources to their files, for example:
+    {"Cash": ["exports/cash/*.csv"], "Other": ["other.csv"]}
+
+    Parameters
+    ----------
+    filepath : str
+        Mapping file path
+
+    Returns
+    -------
+    dict[str, list[str]]
+        File paths, directories or glob patterns of each donation source
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        mapping = yaml.safe_load(f)
+    return {
+        donation_source: [patterns] if isinstance(patterns, str) else patterns
+        for donation_source, patterns in mapping.items()
+    }
+
+
+def iter_chunks(
+    files: list[tuple[str, str]], chunksize: None | int = None
+) -> Iterator[tuple[str, str, pd.DataFrame]]:
+    """Reads CSV files in order without conversions.
+
+    Parameters
+    ----------
+    files : list[tuple[str, str]]
+        Donation source name and CSV file path pairs
+    chunksize : None | int, optional
+        How many rows to read at once. If None each file is a single chunk
+
+    Yields
+    ------
+    Iterator[tuple[str, str, pd.DataFrame]]
+        Donation source name, CSV file path and the chunk
+    """
+    for donation_source, filepath in files:
+        for df in Manual(donation_source, filepath, chunksize=chunksize).iter_csv_data():
+            yield donation_source, filepath, df
+
+
+def import_files(
+    files: list[tuple[str, str]],
+    max_workers: None | int = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    chunksize: None | int = DEFAULT_CHUNKSIZE,
+    append: bool = False,
+) -> int:
+    """Reads CSV files in chunks and converts the chunks in a pool of processes.
+    Transaction keys are assigned in file order as the converted chunks come back,
+    so identical rows in different files of a donation source get their own keys.
+    Documents of each donation source are written in unordered bulk batches of batch_size.
+    Up to two chunks per process are in flight, so memory usage doesn't depend on file sizes.
+    Identical rows are numbered within the import only, so a row identical to a stored
+    donation gets its key and is skipped, unless append is set.
+
+    Parameters
+    ----------
+    files : list[tuple[str, str]]
+        Donation source name and CSV file path pairs
+    max_workers : None | int, optional
+        Number of processes. If None the number of CPUs is used
+    batch_size : int, optional
+        How many documents to write at once, by default DEFAULT_BATCH_SIZE
+    chunksize : None | int, optional
+        How many rows to convert in a process at once. If None each file is a single chunk,
+        by default DEFAULT_CHUNKSIZE
+    append : bool, optional
+        Continue numbering of identical rows from the donations already stored
+        for the donation source, so rows identical to stored donations are inserted
+        as new ones, by default False
+
+    Returns
+    -------
+    int
+        How many documents were inserted
+    """
+    started_at = time.perf_counter()
+    max_workers = max_workers if max_workers is not None else os.cpu_count()
+    chunks = iter_chunks(files, chunksize)
+    in_flight: deque[tuple[str, Future]] = deque()
+    occurrences: defaultdict[str, Counter] = defaultdict(Counter)
+    batches: defaultdict[str, list[dict]] = defaultdict(list)
+    writers: dict[str, Manual] = {}
+    total_rows, inserted_rows = 0, 0
+
+    def get_writer(donation_source: str) -> Manual:
+        if donation_source not in writers:
+            writers[donation_source] = Manual(donation_source, "")
+            if append:
+                occurrences[donation_source] = get_stored_occurrences(
+                    writers[donation_source].collection, donation_source
+                )
+        return writers[donation_source]
+
+    def write_batch(donation_source: str, documents: list[dict]) -> None:
+        nonlocal total_rows, inserted_rows
+        inserted_rows += get_writer(donation_source).write_documents(documents)
+        total_rows += len(documents)
+        elapsed = time.perf_counter() - started_at
+        print(
+            f"{donation_source} | Processed {total_rows} rows, inserted {inserted_rows} "
+            f"in {elapsed:.1f}s ({total_rows / max(elapsed, 1e-6):.0f} rows/s)"
+        )
+
+    # Spawned workers do not inherit MongoDB client and its threads from the parent process
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+
+        def submit_next_chunk() -> None:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                in_flight.append((chunk[0], executor.submit(convert_chunk, *chunk)))
+
+        for _ in range(2 * max_workers):
+            submit_next_chunk()
+        while in_flight:
+            donation_source, future = in_flight.popleft()
+            documents, fingerprints = future.result()
+            submit_next_chunk()
+            # Stored occurrences are loaded before the first keys of the source are assigned
+            get_writer(donation_source)
+            keys = Manual.get_fingerprints_keys(fingerprints, occurrences[donation_source])
+            for document, key in zip(documents, keys):
+                document["transactionKey"] = key
+            batch = batches[donation_source]
+            batch.extend(documents)
+            while len(batch) >= batch_size:
+                write_batch(donation_source, batch[:batch_size])
+                del batch[:batch_size]
+
+    for donation_source, batch in batches.items():
+        if batch:
+            write_batch(donation_source, batch)
+    return inserted_rows
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
 
-    parser.add_argument("-d", "--donation_source", type=str, required=True)
-    parser.add_argument("-f", "--filepath", type=pathlib.Path, required=True)
+    parser.add_argument("-d", "--donation_source", type=str, help="Donation source of -f files")
+    parser.add_argument(
+        "-f",
+        "--filepath",
+        type=str,
+        nargs="+",
+        help=(
+            "CSV files, directories with CSV files or glob patterns. Rows identical "
+            "to stored donations of the source are skipped, unless --append is set"
+        ),
+    )
+    parser.add_argument(
+        "-m",
+        "--mapping",
+        type=pathlib.Path,
+        help="yaml file which maps donation sources to their files",
+    )
+    parser.add_argument(
+        "-c",
+        "--chunksize",
+        type=int,
+        default=DEFAULT_CHUNKSIZE,
+        help="How many rows of a file each process converts at once",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of processes that convert files. If not set, the number of CPUs is used",
+    )
+    parser.add_argument(
+        "-b",
+        "--batch_size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="How many documents to write at once",
+    )
+    parser.add_argument(
+        "--append",
+        action="store_true",
+        help=(
+            "Rows identical to stored donations of the source are skipped by default. "
+            "Use --append to import a new export, where they are repeated donations: "
+            "they are numbered after the stored ones and inserted. "
+            "Don't use it to re-import already stored files, their rows would be duplicated"
+        ),
+    )
     args = parser.parse_args()
-    Manual(args.donation_source, args.filepath).write_new_data()
+
+    if bool(args.donation_source) != bool(args.filepath):
+        parser.error("-d and -f must be used together")
+    mapping = load_mapping(args.mapping) if args.mapping else {}
+    if args.donation_source:
+        mapping.setdefault(args.donation_source, []).extend(args.filepath)
+    if not mapping:
+        parser.error("either -d with -f or -m is required")
+    files = [
+        (donation_source, filepath)
+        for donation_source, patterns in mapping.items()
+        for filepath in resolve_filepaths(patterns)
+    ]
+
+    update_uah_rate_index()
+    import_files(files, args.workers, args.batch_size, args.chunksize, args.append)
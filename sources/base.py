@@ -1,25 +1,58 @@
 """This module contains base class for donation source"""
-import json
+from __future__ import annotations
+
+import copy
 import re
-import time
 from abc import ABC
 from abc import abstractmethod
+from collections import deque
+from collections.abc import Callable
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AbstractContextManager
 from datetime import datetime
+from datetime import timedelta
 from functools import cache
-
-import pandas as pd
-import requests
-from currency_converter import ECB_URL
-from currency_converter import CurrencyConverter
+from operator import attrgetter
+from queue import Full
+from queue import Queue
+from threading import Event
+from typing import TYPE_CHECKING
+from typing import Any
+
+import numpy as np
 from pymongo import DESCENDING
 
+from common.archive import archive_response
+from common.archive import get_archive_bucket
+from common.checkpoints import get_checkpoints
+from common.checkpoints import save_checkpoint
+from common.config import get_archive_config
 from common.config import get_source
 from common.constants import DEFAULT_USD_UAH_CONVERTION_RATE
 from common.constants import DELTA_TIME_PERIOD
 from common.constants import MONOBANK_ENDPOINT_URL
 from common.constants import UAH_CODE
 from common.constants import USD_CODE
+from common.donation import Donation
+from common.http import get_json
+from common.metrics import inc_counter
+from common.metrics import span
 from common.mongo import get_collection
+from common.mongo import upsert_documents
+from common.rollups import update_pending_rollups
+from common.uah_rates import get_uah_rate_index
+
+if TYPE_CHECKING:
+    # pandas and currency_converter are slow to import and most runs don't need them:
+    # API sources parse Donation records, and ECB rates are only used for currencies
+    # other than USD and UAH. They are imported on the first use instead.
+    import pandas as pd
+    from currency_converter import CurrencyConverter
+
+EMAIL_PATTERN = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
+# How many fetched pages of each backfill window can wait to be written
+BACKFILL_QUEUE_SIZE = 2
 
 
 class SourceBase(ABC):
@@ -29,90 +62,115 @@ class SourceBase(ABC):
     ----------
     donation_source: str
         The donation source name
+    last_document_datetimes: None | dict[str, datetime], optional
+        The latest document datetimes of donation sources prefetched with
+        get_last_document_datetimes. If None, the datetime is looked up in the collection
+    checkpoints: None | dict[str, dict], optional
+        Sync checkpoints of donation sources prefetched with get_checkpoints.
+        If None, the checkpoint is looked up in the checkpoints collection
     """
 
-    def __init__(self, donation_source: str):
+    # The longest period which can be requested from the source API at once.
+    window_period: timedelta = DELTA_TIME_PERIOD
+    # How many windows can be fetched in parallel without hitting the API rate limit.
+    max_parallel_windows: int = 1
+    # How long it takes for transactions to appear in the source API.
+    # The checkpoint is kept this far behind the sync datetime, so late transactions are fetched.
+    checkpoint_lag: timedelta = timedelta(0)
+
+    def __init__(
+        self,
+        donation_source: str,
+        last_document_datetimes: None | dict[str, datetime] = None,
+        checkpoints: None | dict[str, dict] = None,
+    ):
         self.donation_source = donation_source
         self.source_config = get_source(donation_source)
         self.collection = get_collection()
         self.insertion_mode = "Auto"
+        self.last_transaction_key = None
+        self.cursor = None
+        self.skip_stored_boundary = False
+
+        checkpoint = self.get_checkpoint(checkpoints)
+        if checkpoint is not None:
+            self.start_datetime, self.is_source_creation_date = checkpoint["syncedUntil"], False
+            self.cursor = checkpoint.get("cursor")
+        else:
+            # Sources synced before checkpoints were introduced resume from the stored data
+            self.start_datetime, self.is_source_creation_date = self.get_last_document_datetime(
+                last_document_datetimes
+            )
+        self.sync_datetime = datetime.utcnow()
+        self.end_datetime = self.sync_datetime
 
-        self.start_datetime, self.is_source_creation_date = self.get_last_document_datetime()
-        self.end_datetime = datetime.utcnow()
-
-        if self.end_datetime - self.start_datetime > DELTA_TIME_PERIOD:
+        if self.end_datetime - self.start_datetime > self.window_period:
             # In the most cases APIs do not support retrieving
             # transaction data for more than 30 days.
             # If the difference between start and end dates
-            # is more than DELTA_TIME_PERIOD, the end date is set to start date + DELTA_TIME_PERIOD.
+            # is more than window_period, the end date is set to start date + window_period.
             # After multiple retrievals, we eventually would catch up to the current datetime.
-            self.end_datetime = self.start_datetime + DELTA_TIME_PERIOD
+            # Use backfill mode in write_new_data to catch up in a single run.
+            self.end_datetime = self.start_datetime + self.window_period
 
     @classmethod
     @property
     @cache
     def currency_converter(cls) -> CurrencyConverter:
-        """
+        """ECB rates are loaded lazily from the local cache on the first use,
+        i.e. only when there are transactions in currencies other than USD and UAH.
+
         Returns
         -------
         CurrencyConverter
             Cached instance of CurrencyConverter object
         """
-        return CurrencyConverter(
-            ECB_URL, fallback_on_missing_rate=True, fallback_on_wrong_date=True
-        )
-
-    @classmethod
-    def get_request_with_rate_limiting(cls, url: str, headers: dict[str | str]) -> dict:
-        """Get request which waits 60 seconds and retries in case of hitting rate limit.
+        # pylint: disable=import-outside-toplevel
+        from common.ecb_rates import get_currency_converter
 
-        Parameters
-        ----------
-        url : str
-            URL to request
-        headers : dict[str | str]
-            Headers dictonary for request
-
-        Returns
-        -------
-        dict
-            Raw API response
-        """
-        response = requests.get(url, headers=headers)
-        try:
-            assert response.status_code == requests.codes["ok"], response.text
-        except AssertionError:
-            if response.status_code == requests.codes["too_many"]:
-                time.sleep(60)
-                response = requests.get(url, headers=headers)
-            else:
-                raise
-        response = json.loads(response.text)
-        return response
+        return get_currency_converter()
 
     @classmethod
     @property
     @cache
     def usd_to_uah_current_rate(cls) -> float:
-        """currency_converter package does not support UAH,
-        so we query Monobank for USD / UAH rate.
-        Only real-time rate is supported, use with caution
-        when converting historic UAH transactions.
+        """currency_converter package does not support UAH, so USD / UAH rates
+        are taken from the historical rates index. This real-time Monobank rate
+        is only a fallback if the index is empty.
 
         Returns
         -------
         float
             Returns USD / UAH rate for the current datetime.
         """
-        url = f"{MONOBANK_ENDPOINT_URL}/bank/currency"
-        headers = {"Content-Type": "application/json"}
-        response = cls.get_request_with_rate_limiting(url, headers)
+        response = get_json(
+            f"{MONOBANK_ENDPOINT_URL}/bank/currency", headers={"Content-Type": "application/json"}
+        )
 
         for rate_info in response:
             if rate_info["currencyCodeA"] == USD_CODE and rate_info["currencyCodeB"] == UAH_CODE:
                 return rate_info["rateSell"]
         return DEFAULT_USD_UAH_CONVERTION_RATE
 
+    @classmethod
+    def get_usd_to_uah_rates(cls, dates: np.ndarray) -> np.ndarray:
+        """Looks up historical USD / UAH rates without requests to rates APIs.
+
+        Parameters
+        ----------
+        dates : np.ndarray
+            The transaction dates. The latest rate is used for missing dates
+
+        Returns
+        -------
+        np.ndarray
+            USD / UAH rates for each date
+        """
+        uah_rate_index = get_uah_rate_index()
+        if not len(uah_rate_index):
+            return np.full(len(dates), cls.usd_to_uah_current_rate)
+        return uah_rate_index.get_rates(dates)
+
     @classmethod
     def convert_currency(cls, value: float, currency: str, date: datetime) -> float:
         """Convert currency into USD
@@ -135,42 +193,256 @@ class SourceBase(ABC):
             if currency != "UAH":
                 converted_value = cls.currency_converter.convert(value, currency, "USD", date=date)
             else:
-                converted_value = value / cls.usd_to_uah_current_rate
+                rate_date = date.date() if isinstance(date, datetime) else date
+                rates = cls.get_usd_to_uah_rates(np.array([rate_date], dtype="datetime64[D]"))
+                converted_value = value / float(rates[0])
             return round(converted_value, 2)
         return value
 
-    def get_last_document_datetime(self) -> tuple[datetime, bool]:
+    @classmethod
+    def convert_currencies(
+        cls, values: pd.Series, currencies: pd.Series, datetimes: pd.Series
+    ) -> pd.Series:
+        """Convert currencies into USD for a batch of transactions. The result is the same
+        as calling convert_currency for each transaction, but each (currency, date) rate
+        is resolved only once and the conversion is vectorized.
+
+        Parameters
+        ----------
+        values : pd.Series
+            Transaction values
+        currencies : pd.Series
+            Currency 3-letter codes. For example, EUR
+        datetimes : pd.Series
+            The transaction datetimes
+
+        Returns
+        -------
+        pd.Series
+            Converted USD values
+        """
+        # pylint: disable=protected-access,import-outside-toplevel
+        import pandas as pd
+
+        values = values.astype(float)
+        converted = values.to_numpy(copy=True)
+        is_usd = (currencies == "USD").to_numpy()
+        is_uah = (currencies == "UAH").to_numpy()
+        is_other = ~is_usd & ~is_uah
+
+        if is_uah.any():
+            uah_datetimes = pd.Series(datetimes)[is_uah]
+            if uah_datetimes.dt.tz is not None:
+                # Keep the local date of the transaction, as datetime.date does
+                uah_datetimes = uah_datetimes.dt.tz_localize(None)
+            uah_dates = uah_datetimes.to_numpy(dtype="datetime64[D]")
+            converted[is_uah] /= cls.get_usd_to_uah_rates(uah_dates)
+
+        if is_other.any():
+            converter = cls.currency_converter
+            pairs = pd.MultiIndex.from_arrays(
+                [currencies[is_other], pd.Series(datetimes).dt.date[is_other]]
+            )
+            codes, unique_pairs = pd.factorize(pairs)
+            rates_from, rates_to = np.empty(len(unique_pairs)), np.empty(len(unique_pairs))
+            for i, (currency, date) in enumerate(unique_pairs):
+                # Same rate lookup as in CurrencyConverter.convert
+                if currency not in converter.currencies:
+                    raise ValueError(f"{currency} is not a supported currency")
+                if pd.isna(date):
+                    date = converter.bounds[currency].last_date
+                rates_from[i] = converter._get_rate(currency, date)
+                rates_to[i] = converter._get_rate("USD", date)
+            # Keep the operations order of CurrencyConverter.convert to get the same floats
+            converted[is_other] = converted[is_other] / rates_from[codes] * rates_to[codes]
+
+        # Python round is used on purpose, np.round may round halves differently
+        converted[~is_usd] = [round(value, 2) for value in converted[~is_usd].tolist()]
+        return pd.Series(converted, index=values.index)
+
+    def trace(self, stage: str) -> AbstractContextManager[dict]:
+        """Measures a stage of the sync run, for example fetch, parse or write.
+
+        Parameters
+        ----------
+        stage : str
+            Stage name
+
+        Returns
+        -------
+        AbstractContextManager[dict]
+            Span of the stage labeled with the donation source
+        """
+        return span(stage, source=self.donation_source)
+
+    def get_checkpoint(self, checkpoints: None | dict[str, dict] = None) -> None | dict:
+        """Returns sync checkpoint of the donation source.
+
+        Parameters
+        ----------
+        checkpoints : None | dict[str, dict], optional
+            Prefetched sync checkpoints of donation sources.
+            If None, the checkpoint is looked up in the checkpoints collection
+
+        Returns
+        -------
+        None | dict
+            The checkpoint. None if the source was never synced with checkpoints
+        """
+        if checkpoints is None:
+            checkpoints = get_checkpoints([self.donation_source])
+        return checkpoints.get(self.donation_source)
+
+    def get_synced_until(self) -> datetime:
+        """
+        Returns
+        -------
+        datetime
+            The datetime until which all transactions are stored
+            after the current window is written
+        """
+        return max(
+            self.start_datetime, min(self.end_datetime, self.sync_datetime - self.checkpoint_lag)
+        )
+
+    def save_checkpoint(self, window_done: bool = True) -> None:
+        """Saves sync checkpoint of the donation source, so the next run
+        resumes where this one stopped.
+
+        Parameters
+        ----------
+        window_done : bool, optional
+            Whether the current window is fully written, by default True.
+            Otherwise, the window is resumed from the current cursor
+        """
+        if self.start_datetime is None:
+            # Manual donations are not synced from APIs
+            return
+        save_checkpoint(
+            self.donation_source,
+            self.get_synced_until() if window_done else self.start_datetime,
+            self.last_transaction_key,
+            None if window_done else self.cursor,
+        )
+
+    def get_last_document_datetime(
+        self, last_document_datetimes: None | dict[str, datetime] = None
+    ) -> tuple[datetime, bool]:
         """Returns last document datetime found for a donation source.
         If no such document exist returns the specified donation source
         creation date from the config file
 
+        Parameters
+        ----------
+        last_document_datetimes : None | dict[str, datetime], optional
+            Prefetched latest document datetimes of donation sources.
+            If None, the datetime is looked up in the collection
+
         Returns
         -------
         tuple[datetime, bool]
             The last document datetime or donation source creation date.
             Also returns an indication if the returned datetime is source creation date
         """
-        last_document = self.collection.find_one(
-            {"donationSource": self.donation_source}, sort=[("datetime", DESCENDING)]
-        )
-        if last_document is None:
+        if last_document_datetimes is not None:
+            last_document_datetime = last_document_datetimes.get(self.donation_source)
+        else:
+            last_document = self.collection.find_one(
+                {"donationSource": self.donation_source}, sort=[("datetime", DESCENDING)]
+            )
+            last_document_datetime = last_document["datetime"] if last_document else None
+        if last_document_datetime is None:
             return self.source_config["creation_date"], True
 
-        return last_document["datetime"], False
+        # Documents stored before transaction keys were introduced can't be matched on write,
+        # so transactions up to the latest of them are skipped, as it was done before
+        self.skip_stored_boundary = (
+            self.collection.find_one(
+                {
+                    "donationSource": self.donation_source,
+                    "datetime": last_document_datetime,
+                    "transactionKey": {"$exists": False},
+                },
+                {"_id": True},
+            )
+            is not None
+        )
+        return last_document_datetime, False
+
+    def get_window(self) -> dict[str, datetime]:
+        """
+        Returns
+        -------
+        dict[str, datetime]
+            startDatetime, endDatetime and syncDatetime of the current window
+        """
+        return {
+            "startDatetime": self.start_datetime,
+            "endDatetime": self.end_datetime,
+            "syncDatetime": self.sync_datetime,
+        }
+
+    def set_window(self, window: dict[str, datetime]) -> None:
+        """Sets the current window, for example to parse archived transactions
+        the same way as they were parsed when fetched.
+
+        Parameters
+        ----------
+        window : dict[str, datetime]
+            startDatetime, endDatetime and syncDatetime of the window
+        """
+        self.start_datetime = window["startDatetime"]
+        self.end_datetime = window["endDatetime"]
+        self.sync_datetime = window["syncDatetime"]
+
+    def archive_transactions(self, transactions: list[dict]) -> None:
+        """Appends raw transactions of the current window to the archive,
+        if the archive is enabled in the config file. The archive is optional,
+        so a failed write is logged and the sync continues.
+
+        Parameters
+        ----------
+        transactions : list[dict]
+            Raw transactions data
+        """
+        if not get_archive_config()["enabled"]:
+            return
+        try:
+            archive_response(
+                get_archive_bucket(), self.donation_source, self.get_window(), transactions
+            )
+        except Exception as exception:  # pylint: disable=broad-except
+            inc_counter("archive_failures", source=self.donation_source)
+            print(f"{self.donation_source} | Failed to archive transactions | {exception!r}")
 
     @abstractmethod
-    def get_api_data(self) -> pd.DataFrame:
+    def get_api_data(self) -> pd.DataFrame | list[Donation]:
         """An abstract method to get API data for donation source
         Each source should overload this methods and return parsed transaction data
-        in a common form
+        in a common form: Donation records or a pd.DataFrame with the same fields.
+        Each transaction should have a stable transactionKey,
+        which is unique within the donation source.
 
         Returns
         -------
-        pd.DataFrame
-            Returns a pd.DataFrame with transaction data
+        pd.DataFrame | list[Donation]
+            Returns Donation records or a pd.DataFrame with transaction data
+        """
+
+    def iter_api_data(self) -> Iterator[pd.DataFrame | list[Donation]]:
+        """Yields API data for donation source in batches. By default, all API data
+        is a single batch. Sources with paginated APIs can overload this method
+        to stream pages, so they are written as they arrive.
+
+        Yields
+        ------
+        Iterator[pd.DataFrame | list[Donation]]
+            Donation records or pd.DataFrame with transaction data for each batch
         """
+        yield self.get_api_data()
 
-    def mask_name(self, name: None | str, chars_to_keep: int = 2) -> str:
+    @classmethod
+    def mask_name(cls, name: None | str, chars_to_keep: int = 2) -> str:
         """Censores sender name. For example, Test Person -> Te** Pe****
 
         Parameters
@@ -191,6 +463,55 @@ class SourceBase(ABC):
             )
         return ""
 
+    @classmethod
+    def apply_to_unique(
+        cls, values: pd.Series, func: Callable, missing_value: None | str = None
+    ) -> pd.Series:
+        """Applies function to a batch of values, calling it only once for each unique value.
+        Sender names repeat a lot, so this is much cheaper than applying
+        the function row by row.
+
+        Parameters
+        ----------
+        values : pd.Series
+            Values to apply the function to
+        func : Callable
+            Function to apply
+        missing_value : None | str, optional
+            Result for missing values, by default None
+
+        Returns
+        -------
+        pd.Series
+            Function results
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        codes, uniques = pd.factorize(values)
+        # Missing values have code -1, so they take the last element
+        results = np.array([func(value) for value in uniques] + [missing_value], dtype=object)
+        return pd.Series(results[codes], index=values.index, dtype=object)
+
+    @classmethod
+    def mask_names(cls, names: pd.Series, chars_to_keep: int = 2) -> pd.Series:
+        """Censores a batch of sender names, the same way as mask_name does.
+
+        Parameters
+        ----------
+        names : pd.Series
+            Names to censor. Can contain None
+        chars_to_keep : int, optional
+            How many first characters in each word to keep, by default 2
+
+        Returns
+        -------
+        pd.Series
+            Censored names.
+        """
+        return cls.apply_to_unique(
+            names, lambda name: cls.mask_name(name, chars_to_keep), cls.mask_name(None)
+        )
+
     @classmethod
     def parse_email_from_note(cls, sender_note: str) -> str | None:
         """Parses email from donation note using regex.
@@ -206,39 +527,301 @@ class SourceBase(ABC):
             Email str if the email is found.
             None if the email is not found.
         """
-        match = re.search(r"[\w\.-]+@[\w\.-]+\.\w+", sender_note)
+        match = EMAIL_PATTERN.search(sender_note)
         if match:
             return match.group(0)
         return None
 
-    def write_df_to_collection(self, df: pd.DataFrame) -> None:
-        """Writes pd.DataFrame with the API data to collection
+    @classmethod
+    def convert_donations_currencies(cls, donations: list[Donation]) -> list[float]:
+        """Convert currencies into USD for a batch of Donation records without pandas.
+        The result is the same as calling convert_currency for each donation,
+        but USD / UAH rates are looked up at once.
+
+        Parameters
+        ----------
+        donations : list[Donation]
+            Donation records
+
+        Returns
+        -------
+        list[float]
+            Converted USD values
+        """
+        amounts = [donation.amount_original for donation in donations]
+        uah_indices = [i for i, donation in enumerate(donations) if donation.currency == "UAH"]
+        if uah_indices:
+            dates = np.array(
+                [donations[i].datetime.date() for i in uah_indices], dtype="datetime64[D]"
+            )
+            for i, rate in zip(uah_indices, cls.get_usd_to_uah_rates(dates)):
+                amounts[i] = round(amounts[i] / float(rate), 2)
+        for i, donation in enumerate(donations):
+            if donation.currency not in ("USD", "UAH"):
+                amounts[i] = cls.convert_currency(
+                    donation.amount_original, donation.currency, donation.datetime
+                )
+        return amounts
+
+    def get_records_documents(self, donations: list[Donation]) -> list[dict]:
+        """Converts Donation records into documents for the collection:
+        adds donation source, converts currencies and censors sender names.
+
+        Parameters
+        ----------
+        donations : list[Donation]
+            Donation records
+
+        Returns
+        -------
+        list[dict]
+            Documents to write
+        """
+        if not donations:
+            return []
+        self.last_transaction_key = max(donations, key=attrgetter("datetime")).transaction_key
+        with self.trace("convert"):
+            amounts_usd = self.convert_donations_currencies(donations)
+        with self.trace("mask"):
+            names_censored = {
+                name: self.mask_name(name)
+                for name in {donation.sender_name for donation in donations}
+            }
+        documents = []
+        for donation, amount_usd in zip(donations, amounts_usd):
+            document = donation.to_document()
+            document["donationSource"] = self.donation_source
+            document["insertionMode"] = self.insertion_mode
+            document["amountUSD"] = amount_usd
+            document["senderNameCensored"] = names_censored[donation.sender_name]
+            documents.append(document)
+        return documents
+
+    def skip_stored_donations(self, donations: list[Donation]) -> list[Donation]:
+        """Skips donations up to the start datetime, which are already stored
+        without transaction keys.
+
+        Parameters
+        ----------
+        donations : list[Donation]
+            Donation records
+
+        Returns
+        -------
+        list[Donation]
+            Donation records after the start datetime
+        """
+        return [
+            donation
+            for donation in donations
+            if donation.datetime.replace(tzinfo=None) > self.start_datetime
+        ]
+
+    def get_documents(self, data: pd.DataFrame | list[Donation]) -> list[dict]:
+        """Converts API data into documents for the collection.
+
+        Parameters
+        ----------
+        data : pd.DataFrame | list[Donation]
+            Donation records or pd.DataFrame with the API data
+
+        Returns
+        -------
+        list[dict]
+            Documents to write
+        """
+        inc_counter("rows_in", len(data), source=self.donation_source)
+        if isinstance(data, list):
+            if self.skip_stored_boundary:
+                data = self.skip_stored_donations(data)
+            return self.get_records_documents(data)
+        return self.get_df_documents(data)
+
+    def get_df_documents(self, df: pd.DataFrame) -> list[dict]:
+        """Converts pd.DataFrame with the API data into documents for the collection:
+        adds donation source, converts currencies and censors sender names.
 
         Parameters
         ----------
         df : pd.DataFrame
             pd.DataFrame with the API data
+
+        Returns
+        -------
+        list[dict]
+            Documents to write
+        """
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        if df.empty:
+            return []
+        self.last_transaction_key = df["transactionKey"][df["datetime"].idxmax()]
+        df["donationSource"] = self.donation_source
+        df["insertionMode"] = self.insertion_mode
+        with self.trace("convert"):
+            df["amountUSD"] = self.convert_currencies(
+                df["amountOriginal"], df["currency"], df["datetime"]
+            )
+        df["datetime"] = pd.Series(df["datetime"].dt.to_pydatetime(), dtype=object)
+        with self.trace("mask"):
+            df["senderNameCensored"] = self.mask_names(df["senderName"])
+        return df.to_dict("records")
+
+    def write_documents(self, documents: list[dict]) -> int:
+        """Writes documents to collection. Transactions are upserted
+        by donation source and transaction key, so writes are idempotent
+        and already stored transactions are skipped.
+        Inserted transactions, and the ones of a previously failed rollup update,
+        are added to daily and monthly rollups.
+
+        Parameters
+        ----------
+        documents : list[dict]
+            Documents to write
+
+        Returns
+        -------
+        int
+            How many documents were inserted
         """
         start_datetime = self.start_datetime
         end_datetime = self.end_datetime.replace(microsecond=0) if self.end_datetime else None
         base_str = f"{start_datetime} - {end_datetime} | {self.donation_source} |"
-        if not df.empty:
-            df["donationSource"] = self.donation_source
-            df["insertionMode"] = self.insertion_mode
-            df["datetime"] = pd.Series(df["datetime"].dt.to_pydatetime(), dtype=object)
-            df["senderNameCensored"] = df["senderName"].apply(self.mask_name)
-            df["amountUSD"] = df.apply(
-                lambda row: self.convert_currency(
-                    row["amountOriginal"], row["currency"], row["datetime"]
-                ),
-                axis=1,
-            )
-            self.collection.insert_many(df.to_dict("records"))
-            print(f"{base_str} Wrote {len(df)} rows")
-        else:
+        if not documents:
             print(f"{base_str} No data")
+            return 0
+
+        with self.trace("write") as attributes:
+            result = upsert_documents(self.collection, documents)
+            attributes.update(rows=len(documents), inserted=result.upserted_count)
+        with self.trace("rollup"):
+            update_pending_rollups(self.collection, self.donation_source)
+        inc_counter("rows_out", result.upserted_count, source=self.donation_source)
+        inc_counter("rows_skipped", result.matched_count, source=self.donation_source)
+        skipped_str = f" ({result.matched_count} already stored)" if result.matched_count else ""
+        print(f"{base_str} Wrote {result.upserted_count} rows{skipped_str}")
+        return result.upserted_count
+
+    def write_df_to_collection(self, df: pd.DataFrame) -> None:
+        """Writes pd.DataFrame with the API data to collection
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            pd.DataFrame with the API data
+        """
+        self.write_documents(self.get_documents(df))
+
+    def get_backfill_windows(self) -> list["SourceBase"]:
+        """Splits the period between start datetime and the sync datetime into windows
+        no longer than window_period. Each window is a shallow copy of the source
+        with its own start and end datetime, so windows can be fetched independently.
 
-    def write_new_data(self) -> None:
-        """Fetches and writes new API data to the collection"""
-        df = self.get_api_data()
-        self.write_df_to_collection(df)
+        Returns
+        -------
+        list[SourceBase]
+            Donation source windows in chronological order
+        """
+        windows = []
+        start_datetime = self.start_datetime
+        while True:
+            window = copy.copy(self)
+            window.start_datetime = start_datetime
+            # Only the first window can be resumed from the saved cursor
+            # and only it starts at the latest stored document
+            window.cursor = self.cursor if not windows else None
+            window.skip_stored_boundary = self.skip_stored_boundary and not windows
+            window.end_datetime = min(start_datetime + self.window_period, self.sync_datetime)
+            windows.append(window)
+            if window.end_datetime >= self.sync_datetime:
+                return windows
+            # Transactions on the windows boundary are skipped on write by transaction key
+            start_datetime = window.end_datetime
+
+    def write_window_data(self) -> None:
+        """Fetches and writes API data for the current window batch by batch.
+        The checkpoint is saved after each batch with the provider cursor,
+        and after the window is done with the end of the window.
+        """
+        for data in self.iter_api_data():
+            self.write_documents(self.get_documents(data))
+            if self.cursor is not None:
+                self.save_checkpoint(window_done=False)
+        self.save_checkpoint()
+
+    def write_backfill_data(self) -> None:
+        """Fetches and writes API data for all windows between start datetime and
+        the sync datetime in a single run. Up to max_parallel_windows windows are fetched
+        in parallel and written in chronological order. Pages are streamed into the write
+        path as they arrive, and the next window is started only when a window is written,
+        so memory usage doesn't depend on the backfill period.
+        The checkpoint is saved after each batch with the provider cursor of the batch,
+        and after each window, so an interrupted backfill is resumed from the last written batch.
+        """
+        windows = iter(self.get_backfill_windows())
+        in_flight: deque[tuple[SourceBase, Queue]] = deque()
+        stop = Event()
+
+        def put(batches: Queue, item: Any) -> bool:
+            # The writer may stop on error, so producers don't block on a full queue forever
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=1)
+                    return True
+                except Full:
+                    continue
+            return False
+
+        def fetch(window: SourceBase, batches: Queue) -> None:
+            try:
+                for data in window.iter_api_data():
+                    # The window cursor moves on when the next page is fetched,
+                    # so the cursor is passed along with the batch it follows
+                    if not put(batches, (data, window.cursor)):
+                        return
+            except Exception as error:  # pylint: disable=broad-except
+                put(batches, error)
+                return
+            put(batches, None)
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel_windows) as executor:
+
+            def submit_next_window() -> None:
+                window = next(windows, None)
+                if window is not None:
+                    batches = Queue(maxsize=BACKFILL_QUEUE_SIZE)
+                    executor.submit(fetch, window, batches)
+                    in_flight.append((window, batches))
+
+            for _ in range(self.max_parallel_windows):
+                submit_next_window()
+            try:
+                while in_flight:
+                    window, batches = in_flight.popleft()
+                    while (batch := batches.get()) is not None:
+                        if isinstance(batch, Exception):
+                            raise batch
+                        data, cursor = batch
+                        window.write_documents(window.get_documents(data))
+                        if cursor is not None:
+                            window.cursor = cursor
+                            window.save_checkpoint(window_done=False)
+                    window.save_checkpoint()
+                    submit_next_window()
+            finally:
+                stop.set()
+
+    def write_new_data(self, backfill: bool = False) -> None:
+        """Fetches and writes new API data to the collection
+
+        Parameters
+        ----------
+        backfill : bool, optional
+            Catch up from the start datetime to the current datetime in a single run
+            instead of fetching one window, by default False
+        """
+        with self.trace("sync"):
+            if backfill and self.start_datetime is not None:
+                self.write_backfill_data()
+            else:
+                self.write_window_data()
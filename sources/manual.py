@@ -1,9 +1,25 @@
 """This module contains class for Manual donation source"""
+import hashlib
+import time
+from collections import Counter
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
+from pymongo.collection import Collection
 
 from sources.base import SourceBase
 
+FINGERPRINT_FIELDS = [
+    "datetime",
+    "amountOriginal",
+    "currency",
+    "senderName",
+    "senderEmail",
+    "senderNote",
+]
+
 
 class Manual(SourceBase):
     """A class that allows inserting the data manually from the csv.
@@ -15,17 +31,255 @@ class Manual(SourceBase):
         The donation source name
     filepath : str
         The csv data path to write
+    chunksize : None | int, optional
+        How many rows to read, convert and write at once. If None the whole file
+        is a single batch, by default None
+    occurrences : None | Counter, optional
+        Occurrences of rows in the previous files of the donation source.
+        Updated in place, so identical rows are numbered across files, by default None
     """
 
-    def __init__(self, donation_source: str, filepath: str):
-        super().__init__(donation_source)
+    def __init__(
+        self,
+        donation_source: str,
+        filepath: str,
+        chunksize: None | int = None,
+        occurrences: None | Counter = None,
+    ):
+        # Manual sources are not synced from APIs, so there is nothing to look up
+        super().__init__(donation_source, last_document_datetimes={}, checkpoints={})
         self.insertion_mode = "Manual"
         self.start_datetime = None
         self.end_datetime = None
         self.filepath = filepath
+        self.chunksize = chunksize
+        self.occurrences = occurrences
 
-    def get_api_data(self) -> pd.DataFrame:
-        df = pd.read_csv(self.filepath, parse_dates=["datetime"])
+    @classmethod
+    def normalize_fields(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """Casts transaction data read from the CSV file to the same types,
+        whatever dtypes are inferred for the batch: amounts are floats and datetimes are in UTC.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Transaction data from the CSV file
+
+        Returns
+        -------
+        pd.DataFrame
+            Returns a pd.DataFrame with transaction data
+        """
+        # Each chunk infers its own dtypes, so fields are cast to the same types in all of them
+        df["amountOriginal"] = df["amountOriginal"].astype(float)
+        df["datetime"] = pd.to_datetime(df["datetime"], utc=True)
         df["senderNote"] = df["senderNote"].fillna("")
-        df = df.replace({np.nan: None})
+        return df.replace({np.nan: None})
+
+    def normalize(self, df: pd.DataFrame, occurrences: None | Counter = None) -> pd.DataFrame:
+        """Normalizes transaction data read from the CSV file and adds transaction keys.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Transaction data from the CSV file
+        occurrences : None | Counter, optional
+            Occurrences of rows in the previous chunks and files, by default None
+
+        Returns
+        -------
+        pd.DataFrame
+            Returns a pd.DataFrame with transaction data
+        """
+        df = self.normalize_fields(df)
+        df["transactionKey"] = self.get_transaction_keys(df, occurrences)
         return df
+
+    def iter_csv_data(self) -> Iterator[pd.DataFrame]:
+        """Reads the CSV file without conversions.
+
+        Yields
+        ------
+        Iterator[pd.DataFrame]
+            Chunks of chunksize rows, or the whole file if chunksize is None
+        """
+        if self.chunksize is None:
+            yield pd.read_csv(self.filepath)
+            return
+
+        with pd.read_csv(self.filepath, chunksize=self.chunksize) as chunks:
+            yield from chunks
+
+    def get_api_data(self) -> pd.DataFrame:
+        return self.normalize(pd.read_csv(self.filepath), self.occurrences)
+
+    def iter_api_data(self) -> Iterator[pd.DataFrame]:
+        occurrences = self.occurrences if self.occurrences is not None else Counter()
+        for df in self.iter_csv_data():
+            yield self.normalize(df, occurrences)
+
+    def write_new_data(self, backfill: bool = False) -> None:
+        """Reads the CSV file and writes it to the collection batch by batch.
+        The next batch is read and converted in the background while
+        the current one is being written, so only two batches are kept in memory.
+
+        Parameters
+        ----------
+        backfill : bool, optional
+            Not used for Manual source, by default False
+        """
+        _ = backfill
+        started_at = time.perf_counter()
+        total_rows, inserted_rows = 0, 0
+        batches = iter(self.iter_api_data())
+
+        def get_next_documents() -> None | list[dict]:
+            df = next(batches, None)
+            return self.get_documents(df) if df is not None else None
+
+        with self.trace("sync"), ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(get_next_documents)
+            while (documents := future.result()) is not None:
+                future = executor.submit(get_next_documents)
+                inserted_rows += self.write_documents(documents)
+                total_rows += len(documents)
+                if self.chunksize is not None:
+                    elapsed = time.perf_counter() - started_at
+                    print(
+                        f"{self.donation_source} | Processed {total_rows} rows, "
+                        f"inserted {inserted_rows} in {elapsed:.1f}s "
+                        f"({total_rows / max(elapsed, 1e-6):.0f} rows/s)"
+                    )
+
+    @classmethod
+    def get_fingerprints(cls, df: pd.DataFrame) -> list[str]:
+        """Builds a fingerprint of each row from normalized fields, so it doesn't depend
+        on dtypes inferred for the batch: amounts are floats, datetimes are in UTC
+        and missing values are empty strings. Stored documents have the same fields,
+        so their fingerprints are equal to the ones of the CSV rows.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Transaction data from the CSV file or stored documents
+
+        Returns
+        -------
+        list[str]
+            Fingerprint of each row
+        """
+        if df.empty:
+            return []
+        datetimes = pd.to_datetime(df["datetime"], utc=True).dt.tz_localize(None)
+        columns = [
+            [value.isoformat() if not pd.isna(value) else "" for value in datetimes],
+            [str(float(value)) if not pd.isna(value) else "" for value in df["amountOriginal"]],
+        ]
+        for column in ["currency", "senderName", "senderEmail", "senderNote"]:
+            columns.append([str(value) if not pd.isna(value) else "" for value in df[column]])
+        return ["|".join(row) for row in zip(*columns)]
+
+    @classmethod
+    def get_transaction_keys(
+        cls, df: pd.DataFrame, occurrences: None | Counter = None
+    ) -> list[str]:
+        """CSV rows have no ids, so the transaction key is a hash of the row.
+        Identical rows (for example, two equal cash donations) are numbered,
+        so each of them gets its own key.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Transaction data from the CSV file
+        occurrences : None | Counter, optional
+            Occurrences of rows in the previous chunks of the file.
+            Updated in place, so identical rows are numbered across chunks, by default None
+
+        Returns
+        -------
+        list[str]
+            Transaction key for each row
+        """
+        return cls.get_fingerprints_keys(cls.get_fingerprints(df), occurrences)
+
+    @classmethod
+    def get_fingerprints_keys(
+        cls, fingerprints: list[str], occurrences: None | Counter = None
+    ) -> list[str]:
+        """Numbers identical fingerprints and hashes them into transaction keys.
+
+        Parameters
+        ----------
+        fingerprints : list[str]
+            Fingerprints of rows in file order
+        occurrences : None | Counter, optional
+            Occurrences of fingerprints in the previous rows.
+            Updated in place, so identical rows are numbered across chunks, by default None
+
+        Returns
+        -------
+        list[str]
+            Transaction key for each row
+        """
+        occurrences = occurrences if occurrences is not None else Counter()
+        keys = []
+        for fingerprint in fingerprints:
+            keys.append(
+                hashlib.sha256(f"{fingerprint}|{occurrences[fingerprint]}".encode()).hexdigest()
+            )
+            occurrences[fingerprint] += 1
+        return keys
+
+
+def convert_chunk(
+    donation_source: str, filepath: str, df: pd.DataFrame
+) -> tuple[list[dict], list[str]]:
+    """Converts a chunk of a CSV file into documents without transaction keys.
+    Used by the parallel import: chunks are converted in worker processes,
+    and keys are assigned from the fingerprints in file order by the parent process.
+
+    Parameters
+    ----------
+    donation_source : str
+        The donation source name
+    filepath : str
+        The csv data path of the chunk
+    df : pd.DataFrame
+        Transaction data of the chunk
+
+    Returns
+    -------
+    tuple[list[dict], list[str]]
+        Documents and fingerprints of the chunk rows
+    """
+    manual = Manual(donation_source, filepath)
+    df = manual.normalize_fields(df)
+    fingerprints = manual.get_fingerprints(df)
+    df["transactionKey"] = None
+    return manual.get_documents(df), fingerprints
+
+
+def get_stored_occurrences(collection: Collection, donation_source: str) -> Counter:
+    """Counts fingerprints of manual donations already stored for the donation source.
+    Used to continue numbering of identical rows, so a repeated donation in a new export
+    gets the next key instead of the key of the stored one.
+
+    Parameters
+    ----------
+    collection : Collection
+        Donations collection
+    donation_source : str
+        The donation source name
+
+    Returns
+    -------
+    Counter
+        Occurrences of each fingerprint
+    """
+    documents = list(
+        collection.find(
+            {"donationSource": donation_source, "insertionMode": "Manual"},
+            {field: True for field in FINGERPRINT_FIELDS},
+        )
+    )
+    return Counter(Manual.get_fingerprints(pd.DataFrame.from_dict(documents)))
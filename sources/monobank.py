@@ -2,9 +2,9 @@
 from datetime import datetime
 from datetime import timezone
 
-import pandas as pd
-
 from common.constants import MONOBANK_ENDPOINT_URL
+from common.donation import Donation
+from common.http import get_json
 from sources.base import SourceBase
 
 
@@ -20,7 +20,16 @@ class Monobank(SourceBase):
         The donation source name
     """
 
-    def get_api_data(self) -> pd.DataFrame:
+    def get_api_data_raw(self) -> list[dict]:
+        """Fetch raw statement from Monobank API.
+        The window may include transactions which are already stored,
+        they are skipped on write by transaction key.
+
+        Returns
+        -------
+        list[dict]
+            Raw transactions data, the latest transaction first
+        """
         account_id = self.source_config["account_id"]
         start_datetime = int(self.start_datetime.replace(tzinfo=timezone.utc).timestamp())
         end_datetime = int(self.end_datetime.replace(tzinfo=timezone.utc).timestamp())
@@ -32,17 +41,25 @@ class Monobank(SourceBase):
             "Content-Type": "application/json",
             "X-Token": self.source_config["x_token"],
         }
-        response = self.get_request_with_rate_limiting(url, headers)
+        return get_json(url, rate_limit_key=self.source_config["x_token"], headers=headers)
 
-        rows = []
+    def parse_transactions(self, transactions: list[dict]) -> list[Donation]:
+        """Parses raw Monobank transactions into a common form
 
-        transactions = response[::-1]  # Reverse list
-        for transaction in transactions:
-            if not self.is_source_creation_date and transaction["time"] == start_datetime:
-                # Skip transaction with the same time as start_datetime,
-                # because it is already stored in the database.
-                continue
+        Parameters
+        ----------
+        transactions : list[dict]
+            Raw transactions data, the latest transaction first
 
+        Returns
+        -------
+        list[Donation]
+            Returns Donation records
+        """
+        donations = []
+
+        transactions = transactions[::-1]  # Reverse list
+        for transaction in transactions:
             # Transaction amount is encoded as int with decimals
             amount = transaction["amount"] / 100
             if amount > 0:
@@ -52,17 +69,23 @@ class Monobank(SourceBase):
                     name = "🐈"
 
                 sender_note = transaction.get("comment", "")
-                rows.append(
-                    {
-                        "senderName": name if name != "🐈" else None,
-                        "senderEmail": self.parse_email_from_note(sender_note),
-                        "amountOriginal": amount,
-                        "currency": self.source_config["currency"],
-                        "datetime": datetime.fromtimestamp(transaction["time"], tz=timezone.utc),
-                        "senderNote": sender_note,
-                        "countryCode": None,
-                    }
+                donations.append(
+                    Donation(
+                        sender_name=name if name != "🐈" else None,
+                        amount_original=amount,
+                        currency=self.source_config["currency"],
+                        datetime=datetime.fromtimestamp(transaction["time"], tz=timezone.utc),
+                        sender_note=sender_note,
+                        country_code=None,
+                        transaction_key=transaction["id"],
+                        sender_email=self.parse_email_from_note(sender_note),
+                    )
                 )
+        return donations
 
-        df = pd.DataFrame.from_dict(rows)
-        return df
+    def get_api_data(self) -> list[Donation]:
+        with self.trace("fetch"):
+            transactions = self.get_api_data_raw()
+        self.archive_transactions(transactions)
+        with self.trace("parse"):
+            return self.parse_transactions(transactions)
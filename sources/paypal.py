@@ -1,14 +1,18 @@
 """This module contains class for PayPal donation source"""
-import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-
-import pandas as pd
-import requests
+from datetime import timedelta
+from functools import partial
 
 from common.config import get_sources
 from common.constants import ALLOWED_PAYPAL_TRANSACTIONS_TYPES
+from common.constants import MAX_PAYPAL_CONCURRENT_PAGES
 from common.constants import MAX_PAYPAL_TRANSACTIONS
 from common.constants import PAYPAL_ENDPOINT_URL
+from common.donation import Donation
+from common.http import get_json
+from common.http import post_json
+from common.token_cache import get_access_token_cache
 from sources.base import SourceBase
 
 
@@ -25,8 +29,13 @@ class PayPal(SourceBase):
         The donation source name
     """
 
+    max_parallel_windows = 3
+    # It takes up to three hours for transactions to appear in the transaction search API
+    checkpoint_lag = timedelta(hours=3)
+
     def get_access_token(self) -> str:
-        """Fetches a temp access token for PayPal API.
+        """Returns a temp access token for PayPal API. The token is cached
+        per client id until shortly before it expires.
         More info: https://developer.paypal.com/api/rest/authentication/
         Two secret environment variables are required: CLIENT_ID and SECRET_ID
 
@@ -35,29 +44,46 @@ class PayPal(SourceBase):
         str
             Access token
         """
-        response = requests.post(
-            f"{PAYPAL_ENDPOINT_URL}/oauth2/token",
-            auth=(
-                self.source_config["client_id"],
-                self.source_config["secret_id"],
-            ),
-            headers={"Accept": "application/json", "Accept-Language": "en_US"},
-            data={"grant_type": "client_credentials"},
-        ).json()
-
-        return response["access_token"]
-
-    def get_api_data_raw(self) -> dict:
-        """Fetch raw data from PayPal transactions API. More info:
+        return get_access_token_cache().get(
+            self.source_config["client_id"], self.fetch_access_token
+        )
+
+    def fetch_access_token(self) -> dict:
+        """Fetches a new temp access token for PayPal API.
+
+        Returns
+        -------
+        dict
+            Raw API response with access_token and expires_in fields
+        """
+        with self.trace("oauth"):
+            return post_json(
+                f"{PAYPAL_ENDPOINT_URL}/oauth2/token",
+                auth=(
+                    self.source_config["client_id"],
+                    self.source_config["secret_id"],
+                ),
+                headers={"Accept": "application/json", "Accept-Language": "en_US"},
+                data={"grant_type": "client_credentials"},
+            )
+
+    def get_transactions_page(self, access_token: str, page: int) -> dict:
+        """Fetch a single page from PayPal transactions API. More info:
         https://developer.paypal.com/docs/api/transaction-search/v1/
 
+        Parameters
+        ----------
+        access_token : str
+            Access token
+        page : int
+            Page number, starting from 1
+
         Returns
         -------
         dict
-            Raw transactions data
+            Raw API response with transactions and pagination info
         """
-        access_token = self.get_access_token()
-        response = requests.get(
+        return get_json(
             f"{PAYPAL_ENDPOINT_URL}/reporting/transactions",
             headers={
                 "Content-Type": "application/json",
@@ -68,22 +94,57 @@ class PayPal(SourceBase):
                 "start_date": self.start_datetime.strftime("%Y-%m-%dT%H:%M:%SZ"),
                 "end_date": self.end_datetime.strftime("%Y-%m-%dT%H:%M:%SZ"),
                 "page_size": MAX_PAYPAL_TRANSACTIONS,
+                "page": page,
                 "transaction_status": "S",
                 "fields": ",".join(["transaction_info", "payer_info"]),
             },
         )
-        assert response.status_code == requests.codes["ok"], response.text
-        response = json.loads(response.text)
 
-        if self.is_source_creation_date:
-            return response["transaction_details"]
+    def get_api_data_raw(self) -> list[dict]:
+        """Fetch raw data from PayPal transactions API. The first page is fetched
+        to find out the total number of pages, the rest of them are fetched concurrently.
+        Transactions from all pages are deduplicated and ordered by datetime.
+        The window may include transactions which are already stored,
+        they are skipped on write by transaction key.
 
-        # Skip first transaction returned, because it is already stored in the database.
-        return response["transaction_details"][1:]
+        Returns
+        -------
+        list[dict]
+            Raw transactions data
+        """
+        access_token = self.get_access_token()
+        first_page = self.get_transactions_page(access_token, 1)
+        pages = [first_page]
+        if first_page["total_pages"] > 1:
+            with ThreadPoolExecutor(max_workers=MAX_PAYPAL_CONCURRENT_PAGES) as executor:
+                pages += executor.map(
+                    partial(self.get_transactions_page, access_token),
+                    range(2, first_page["total_pages"] + 1),
+                )
+
+        transactions = {}
+        for page in pages:
+            for transaction in page["transaction_details"]:
+                transactions[transaction["transaction_info"]["transaction_id"]] = transaction
+        return sorted(
+            transactions.values(),
+            key=lambda transaction: transaction["transaction_info"]["transaction_updated_date"],
+        )
 
-    def get_api_data(self) -> pd.DataFrame:
-        transactions = self.get_api_data_raw()
-        rows = []
+    def parse_transactions(self, transactions: list[dict]) -> list[Donation]:
+        """Parses raw PayPal transactions into a common form
+
+        Parameters
+        ----------
+        transactions : list[dict]
+            Raw transactions data
+
+        Returns
+        -------
+        list[Donation]
+            Returns Donation records
+        """
+        donations = []
 
         account_emails = [source["email"] for source in get_sources("PayPal")]
 
@@ -100,16 +161,23 @@ class PayPal(SourceBase):
                 transaction_dt = datetime.fromisoformat(
                     transaction_info["transaction_updated_date"].split("+")[0]
                 )
-                rows.append(
-                    {
-                        "senderName": payer_info["payer_name"]["alternate_full_name"],
-                        "senderEmail": payer_info["email_address"],
-                        "amountOriginal": net,
-                        "currency": currency,
-                        "datetime": transaction_dt,
-                        "senderNote": transaction_info.get("transaction_note", ""),
-                        "countryCode": payer_info.get("country_code", None),
-                    }
+                donations.append(
+                    Donation(
+                        sender_name=payer_info["payer_name"]["alternate_full_name"],
+                        sender_email=payer_info["email_address"],
+                        amount_original=net,
+                        currency=currency,
+                        datetime=transaction_dt,
+                        sender_note=transaction_info.get("transaction_note", ""),
+                        country_code=payer_info.get("country_code", None),
+                        transaction_key=transaction_info["transaction_id"],
+                    )
                 )
-        df = pd.DataFrame.from_dict(rows)
-        return df
+        return donations
+
+    def get_api_data(self) -> list[Donation]:
+        with self.trace("fetch"):
+            transactions = self.get_api_data_raw()
+        self.archive_transactions(transactions)
+        with self.trace("parse"):
+            return self.parse_transactions(transactions)
@@ -1,12 +1,11 @@
 """This module contains class for Privatbank donation source"""
-import json
+from collections.abc import Iterator
 from datetime import datetime
 
-import pandas as pd
-import requests
-
 from common.constants import MAX_PRIVATBANK_TRANSACTIONS
 from common.constants import PRIVATBANK_ENDPOINT_URL
+from common.donation import Donation
+from common.http import get_json
 from sources.base import SourceBase
 
 
@@ -21,31 +20,73 @@ class Privatbank(SourceBase):
         The donation source name
     """
 
-    def get_api_data(self) -> pd.DataFrame:
-        response = requests.get(
-            f"{PRIVATBANK_ENDPOINT_URL}/statements/transactions",
-            headers={
-                "Content-Type": "application/json",
-                "token": self.source_config["token"],
-            },
-            params={
-                "startDate": self.start_datetime.strftime("%d-%m-%Y"),
-                "limit": MAX_PRIVATBANK_TRANSACTIONS,
-            },
-        )
-        assert response.status_code == requests.codes["ok"], response.text
-        response = json.loads(response.text)
-        transactions = response["transactions"]
-        rows = []
+    max_parallel_windows = 2
+
+    def iter_api_data_raw(self) -> Iterator[list[dict]]:
+        """Fetch raw data from Privatbank statements API page by page.
+        The next page cursor is followed until there are no more pages.
+        The window may include transactions which are already stored,
+        they are skipped on write by transaction key. If the previous run
+        was interrupted within the same window, it is resumed from the saved cursor.
+
+        Yields
+        ------
+        Iterator[list[dict]]
+            Raw transactions data for each page
+        """
+        params = {
+            "startDate": self.start_datetime.strftime("%d-%m-%Y"),
+            "limit": MAX_PRIVATBANK_TRANSACTIONS,
+        }
+        if self.end_datetime < self.sync_datetime:
+            params["endDate"] = self.end_datetime.strftime("%d-%m-%Y")
+        follow_id = None
+        if self.cursor is not None and self.cursor["params"] == params:
+            follow_id = self.cursor["followId"]
+
+        while True:
+            with self.trace("fetch"):
+                response = get_json(
+                    f"{PRIVATBANK_ENDPOINT_URL}/statements/transactions",
+                    headers={
+                        "Content-Type": "application/json",
+                        "token": self.source_config["token"],
+                    },
+                    params=params if follow_id is None else {**params, "followId": follow_id},
+                )
+            follow_id = response["next_page_id"] if response.get("exist_next_page") else None
+            self.cursor = {"params": params, "followId": follow_id} if follow_id else None
+            yield response["transactions"]
+
+            if follow_id is None:
+                return
+
+    def parse_transactions(self, transactions: list[dict]) -> list[Donation]:
+        """Parses raw Privatbank transactions into a common form
+
+        Parameters
+        ----------
+        transactions : list[dict]
+            Raw transactions data
+
+        Returns
+        -------
+        list[Donation]
+            Returns Donation records
+        """
+        donations = []
         for transaction in transactions:
             sender_note = transaction["OSND"]
             if transaction["TRANTYPE"] == "C" and "Гривнi вiд продажу" not in sender_note:
                 trasaction_datetime = datetime.strptime(
                     transaction["DATE_TIME_DAT_OD_TIM_P"], "%d.%m.%Y %H:%M:%S"
                 )
-                if not self.is_source_creation_date and trasaction_datetime <= self.start_datetime:
-                    # Skip transaction with the same time as start_datetime,
-                    # because it is already stored in the database.
+                if trasaction_datetime < self.start_datetime or (
+                    self.end_datetime < self.sync_datetime
+                    and trasaction_datetime > self.end_datetime
+                ):
+                    # API filters transactions by date only, skip the ones outside the window.
+                    # The latest window is left open, because transactions have local time.
                     continue
                 currency = transaction["CCY"]
                 if currency == "UAH":
@@ -59,16 +100,26 @@ class Privatbank(SourceBase):
                         continue
                     name = " ".join(sender_note.split()[1:3]).replace("1/", "")
                     country_code = None
-                rows.append(
-                    {
-                        "senderName": name,
-                        "senderEmail": self.parse_email_from_note(sender_note),
-                        "amountOriginal": float(transaction["SUM"]),
-                        "currency": currency,
-                        "datetime": trasaction_datetime,
-                        "senderNote": sender_note,
-                        "countryCode": country_code,
-                    }
+                donations.append(
+                    Donation(
+                        sender_name=name,
+                        amount_original=float(transaction["SUM"]),
+                        currency=currency,
+                        datetime=trasaction_datetime,
+                        sender_note=sender_note,
+                        country_code=country_code,
+                        transaction_key=transaction["ID"],
+                        sender_email=self.parse_email_from_note(sender_note),
+                    )
                 )
-        df = pd.DataFrame.from_dict(rows)
-        return df
+        return donations
+
+    def iter_api_data(self) -> Iterator[list[Donation]]:
+        for transactions in self.iter_api_data_raw():
+            self.archive_transactions(transactions)
+            with self.trace("parse"):
+                donations = self.parse_transactions(transactions)
+            yield donations
+
+    def get_api_data(self) -> list[Donation]:
+        return [donation for donations in self.iter_api_data() for donation in donations]
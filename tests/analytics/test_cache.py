@@ -0,0 +1,33 @@
+"""This module contains tests for analytics result cache"""
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from analytics.cache import ResultCache
+
+
+@patch("analytics.cache.time.monotonic")
+def test_result_cache(monotonic_mock: Mock) -> None:
+    """Tests that results are invalidated by watermark, time to live and LRU eviction
+
+    Parameters
+    ----------
+    monotonic_mock : Mock
+        A mock to fake monotonic clock.
+    """
+    monotonic_mock.return_value = 0
+    result_cache = ResultCache(maxsize=2, ttl=60)
+    compute = Mock(side_effect=range(100))
+
+    assert result_cache.get("a", 1, compute) == 0
+    assert result_cache.get("a", 1, compute) == 0
+    assert result_cache.get("a", 2, compute) == 1
+
+    monotonic_mock.return_value = 61
+    assert result_cache.get("a", 2, compute) == 2
+
+    assert result_cache.get("b", 2, compute) == 3
+    assert result_cache.get("a", 2, compute) == 2
+    assert result_cache.get("c", 2, compute) == 4
+    assert result_cache.get("a", 2, compute) == 2
+    assert result_cache.get("b", 2, compute) == 5
+    assert result_cache.get_metrics() == {"size": 2, "hits": 3, "misses": 6}
@@ -0,0 +1,93 @@
+"""This module contains tests for analytics reports"""
+from datetime import datetime
+
+from bson import ObjectId
+
+from analytics.cache import get_result_cache
+from analytics.reports import DonorTotal
+from analytics.reports import MonthlyTotal
+from analytics.reports import SourceTotal
+from analytics.reports import get_monthly_totals
+from analytics.reports import get_repeat_donors
+from analytics.reports import get_source_totals
+from analytics.reports import get_top_donors
+from common.mongo import ensure_indexes
+from common.mongo import get_database
+
+
+def test_reports() -> None:
+    """Tests reports and that cached results are invalidated by written donations"""
+    db = get_database()
+    collection = db.get_collection(f"test_donations_{ObjectId()}")
+    ensure_indexes(collection)
+    collection.insert_many(
+        [
+            {
+                "donationSource": "A",
+                "senderName": "Anna",
+                "amountUSD": 10.0,
+                "datetime": datetime(2022, 7, 30),
+            },
+            {
+                "donationSource": "A",
+                "senderName": "Anna",
+                "amountUSD": 5.5,
+                "datetime": datetime(2022, 8, 2),
+            },
+            {
+                "donationSource": "A",
+                "senderName": None,
+                "amountUSD": 100.0,
+                "datetime": datetime(2022, 8, 3),
+            },
+            {
+                "donationSource": "B",
+                "senderName": "Taras",
+                "amountUSD": 20.0,
+                "datetime": datetime(2022, 8, 4),
+            },
+            {
+                "donationSource": "C",
+                "senderName": "Other",
+                "amountUSD": 99.0,
+                "datetime": datetime(2022, 8, 4),
+            },
+        ]
+    )
+    sources = ["A", "B"]
+
+    assert get_source_totals(datetime(2022, 8, 1), None, sources, collection) == (
+        SourceTotal("A", 2, 105.5),
+        SourceTotal("B", 1, 20.0),
+    )
+    assert get_monthly_totals(donation_sources=sources, collection=collection) == (
+        MonthlyTotal(datetime(2022, 7, 1), 1, 10.0),
+        MonthlyTotal(datetime(2022, 8, 1), 3, 125.5),
+    )
+    anna = DonorTotal("Anna", 2, 15.5, datetime(2022, 7, 30), datetime(2022, 8, 2))
+    assert get_repeat_donors(collection=collection, donation_sources=sources) == (anna,)
+    assert get_top_donors(limit=2, collection=collection, donation_sources=sources) == (
+        DonorTotal("Taras", 1, 20.0, datetime(2022, 8, 4), datetime(2022, 8, 4)),
+        anna,
+    )
+
+    hits = get_result_cache().get_metrics()["hits"]
+    assert get_source_totals(datetime(2022, 8, 1), None, sources, collection)[0].donations == 2
+    assert get_result_cache().get_metrics()["hits"] == hits + 1
+    collection.insert_one(
+        {
+            "donationSource": "A",
+            "senderName": "Anna",
+            "amountUSD": 1.0,
+            "datetime": datetime(2022, 8, 5),
+        }
+    )
+    assert get_source_totals(datetime(2022, 8, 1), None, sources, collection)[0].donations == 3
+
+    # Replaced donations don't change the count and the latest _id
+    collection.update_one(
+        {"donationSource": "A", "amountUSD": 100.0},
+        {"$set": {"amountUSD": 200.0, "updatedAt": datetime.utcnow()}},
+    )
+    assert get_source_totals(datetime(2022, 8, 1), None, sources, collection)[0].amount_usd == 206.5
+    db.drop_collection(collection.name)
@@ -0,0 +1 @@
+"""This module contains tests for benchmarks"""
@@ -0,0 +1,34 @@
+"""This module contains tests for benchmark suite"""
+from benchmarks.compare import compare_results
+from benchmarks.run import run_benchmarks
+
+
+def test_run_benchmarks() -> None:
+    """Tests that benchmarks run on synthetic data without config and database"""
+    results = run_benchmarks([10], repeat=1)
+
+    assert set(results.keys()) == {
+        "parse/paypal/10",
+        "parse/monobank/10",
+        "parse/privatbank/10",
+        "transform/records/10",
+        "transform/dataframe/10",
+        "insert/memory/10",
+    }
+    assert all(result["seconds"] > 0 for result in results.values())
+
+
+def test_compare_results() -> None:
+    """Tests that only benchmarks slower than the threshold are regressions"""
+    baseline = {
+        "parse/paypal/10": {"seconds": 1.0},
+        "insert/memory/10": {"seconds": 1.0},
+        "transform/records/10": {"seconds": 1.0},
+    }
+    current = {
+        "parse/paypal/10": {"seconds": 1.1},
+        "insert/memory/10": {"seconds": 1.5},
+        "transform/dataframe/10": {"seconds": 5.0},
+    }
+
+    assert compare_results(baseline, current, threshold=0.2) == ["insert/memory/10"]
@@ -0,0 +1,42 @@
+"""This module contains tests for the archive of raw API responses"""
+from datetime import datetime
+
+from bson import ObjectId
+
+from common.archive import archive_response
+from common.archive import get_archive_bucket
+from common.archive import get_archive_donation_source
+from common.archive import get_archive_filenames
+from common.archive import iter_archive
+from common.mongo import get_database
+
+
+def test_archive_response() -> None:
+    """Tests that responses of a window are stored in one file and read back in order"""
+    bucket_name = f"test_archive_{ObjectId()}"
+    bucket = get_archive_bucket(bucket_name)
+    windows = [
+        {
+            "startDatetime": datetime(2022, 9, day),
+            "endDatetime": datetime(2022, 9, day + 1),
+            "syncDatetime": datetime(2022, 9, 10),
+        }
+        for day in [2, 1]
+    ]
+    filename = archive_response(bucket, "Dzyga's Paw/Jar", windows[0], [{"id": "A"}])
+    assert archive_response(bucket, "Dzyga's Paw/Jar", windows[0], [{"id": "B"}]) == filename
+    archive_response(bucket, "Dzyga's Paw/Jar", windows[1], [{"id": "C"}])
+    archive_response(bucket, "Other", windows[1], [])
+
+    filenames = get_archive_filenames(bucket, "Dzyga's Paw/Jar")
+    assert filenames[1] == filename and len(filenames) == 2
+    assert len(get_archive_filenames(bucket)) == 3
+    assert get_archive_donation_source(filename) == "Dzyga's Paw/Jar"
+
+    records = list(iter_archive(bucket, filename))
+    assert [record["transactions"] for record in records] == [[{"id": "A"}], [{"id": "B"}]]
+    assert {key: records[0][key] for key in windows[0]} == windows[0]
+
+    db = get_database()
+    db.drop_collection(f"{bucket_name}.files")
+    db.drop_collection(f"{bucket_name}.chunks")
@@ -0,0 +1,32 @@
+"""This module contains tests for sync checkpoints"""
+from datetime import datetime
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from bson import ObjectId
+
+from common.checkpoints import get_checkpoints
+from common.checkpoints import save_checkpoint
+from common.mongo import get_database
+
+
+@patch("common.checkpoints.get_checkpoints_collection_name")
+def test_save_checkpoint(get_checkpoints_collection_name_mock: Mock) -> None:
+    """Tests that checkpoints never move back and keep the last transaction key
+
+    Parameters
+    ----------
+    get_checkpoints_collection_name_mock : Mock
+        A mock to swap checkpoints collection name from config names to the test one.
+    """
+    get_checkpoints_collection_name_mock.return_value = f"test_checkpoints_{ObjectId()}"
+    save_checkpoint("A", datetime(2022, 8, 2), "key", {"followId": "2"})
+    save_checkpoint("A", datetime(2022, 8, 1))
+    save_checkpoint("B", datetime(2022, 8, 3), "other key")
+
+    checkpoints = get_checkpoints(["A", "C"])
+    assert list(checkpoints) == ["A"]
+    assert checkpoints["A"]["syncedUntil"] == datetime(2022, 8, 2)
+    assert checkpoints["A"]["lastTransactionKey"] == "key"
+    assert checkpoints["A"]["cursor"] is None
+    get_database().drop_collection(get_checkpoints_collection_name_mock.return_value)
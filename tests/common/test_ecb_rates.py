@@ -0,0 +1,90 @@
+"""This module contains tests for local cache of ECB reference rates"""
+import os
+from datetime import date
+from pathlib import Path
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from currency_converter import CURRENCY_FILE
+from currency_converter import CurrencyConverter
+
+from common.ecb_rates import get_currency_converter
+
+
+@patch("common.ecb_rates.Thread")
+@patch("common.ecb_rates.download_currency_converter")
+@patch("common.ecb_rates.get_cache_config")
+def test_get_currency_converter(
+    get_cache_config_mock: Mock,
+    download_currency_converter_mock: Mock,
+    thread_mock: Mock,
+    tmp_path: Path,
+) -> None:
+    """Tests that ECB rates are downloaded once, cached and refreshed in the background
+    when the cache is older than TTL.
+
+    Parameters
+    ----------
+    get_cache_config_mock : Mock
+        A mock to use temporary cache directory.
+    download_currency_converter_mock : Mock
+        A mock to use ECB rates bundled with currency_converter package.
+    thread_mock : Mock
+        A mock to check background refresh.
+    tmp_path : Path
+        Temporary cache directory.
+    """
+    get_cache_config_mock.return_value = {"dir": str(tmp_path), "ecb_ttl_hours": 24}
+    download_currency_converter_mock.return_value = CurrencyConverter(
+        CURRENCY_FILE, fallback_on_missing_rate=True, fallback_on_wrong_date=True
+    )
+
+    currency_converter = get_currency_converter()
+    cached_currency_converter = get_currency_converter()
+    assert download_currency_converter_mock.call_count == 1
+    thread_mock.assert_not_called()
+    assert cached_currency_converter.convert(
+        10, "EUR", "USD", date(2022, 8, 20)
+    ) == currency_converter.convert(10, "EUR", "USD", date(2022, 8, 20))
+
+    cache_filepath = next(tmp_path.iterdir())
+    os.utime(cache_filepath, (0, 0))
+    get_currency_converter()
+    assert download_currency_converter_mock.call_count == 1
+    thread_mock.return_value.start.assert_called_once()
+
+
+@patch("common.ecb_rates.download_currency_converter")
+@patch("common.ecb_rates.get_cache_config")
+def test_get_currency_converter_fallback(
+    get_cache_config_mock: Mock,
+    download_currency_converter_mock: Mock,
+    tmp_path: Path,
+) -> None:
+    """Tests that bundled rates are not cached when ECB is not reachable,
+    and that an incompatible cache is downloaded again.
+
+    Parameters
+    ----------
+    get_cache_config_mock : Mock
+        A mock to use temporary cache directory.
+    download_currency_converter_mock : Mock
+        A mock to fake ECB download failure.
+    tmp_path : Path
+        Temporary cache directory.
+    """
+    get_cache_config_mock.return_value = {"dir": str(tmp_path), "ecb_ttl_hours": 24}
+    download_currency_converter_mock.side_effect = OSError("ECB is down")
+
+    currency_converter = get_currency_converter()
+    assert currency_converter.convert(10, "EUR", "USD", date(2022, 8, 20)) > 0
+    get_currency_converter()
+    assert download_currency_converter_mock.call_count == 2
+    assert not list(tmp_path.iterdir())
+
+    download_currency_converter_mock.side_effect = None
+    download_currency_converter_mock.return_value = currency_converter
+    with patch("common.ecb_rates.pickle.load", side_effect=AttributeError("No attribute")):
+        (tmp_path / "ecb_rates.pickle").write_bytes(b"incompatible")
+        get_currency_converter()
+    assert download_currency_converter_mock.call_count == 3
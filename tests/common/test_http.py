@@ -0,0 +1,119 @@
+"""This module contains tests for shared HTTP transport"""
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from common.config import get_http_config
+from common.http import get_json
+from common.http import get_retry_delay
+from common.http import get_session
+
+
+def fake_response(status_code: int, text: str = "{}", headers: None | dict = None) -> Mock:
+    """Creates a fake response
+
+    Parameters
+    ----------
+    status_code : int
+        Response status code
+    text : str, optional
+        Response body, by default "{}"
+    headers : None | dict, optional
+        Response headers, by default None
+
+    Returns
+    -------
+    Mock
+        Fake response
+    """
+    return Mock(status_code=status_code, text=text, headers=headers or {})
+
+
+def test_get_session_is_shared_per_host() -> None:
+    """Tests that requests to the same host share one session"""
+    session = get_session("https://api.monobank.ua/bank/currency")
+    assert get_session("https://api.monobank.ua/personal/statement") is session
+    assert get_session("https://api-m.paypal.com/v1") is not session
+
+
+def test_get_retry_delay() -> None:
+    """Tests that Retry-After header is respected and backoff is capped"""
+    assert get_retry_delay(fake_response(429, headers={"Retry-After": "7"}), 0) == 7
+    http_config = get_http_config()
+    for attempt in range(10):
+        delay = get_retry_delay(None, attempt)
+        assert delay <= http_config["backoff_max"]
+        assert (
+            delay >= min(http_config["backoff_max"], http_config["backoff_base"] * 2**attempt) / 2
+        )
+
+
+@patch("common.http.time.sleep")
+def test_get_json_retries(sleep_mock: Mock) -> None:
+    """Tests that rate limited and failed requests are retried
+
+    Parameters
+    ----------
+    sleep_mock : Mock
+        A mock to skip waiting between retries.
+    """
+    session = get_session("https://example.com")
+    responses = [
+        fake_response(429, headers={"Retry-After": "1"}),
+        fake_response(503),
+        fake_response(200, '{"ok": true}'),
+    ]
+    with patch.object(session, "request", side_effect=responses) as request_mock:
+        assert get_json("https://example.com/data") == {"ok": True}
+        assert request_mock.call_count == 3
+        assert request_mock.call_args.kwargs["timeout"] == get_http_config()["timeout"]
+    assert sleep_mock.call_args_list[0].args == (1,)
+
+
+@patch("common.http.time.sleep")
+def test_get_json_retry_budget(sleep_mock: Mock) -> None:
+    """Tests that the request fails when the retry budget is exhausted
+
+    Parameters
+    ----------
+    sleep_mock : Mock
+        A mock to skip waiting between retries.
+    """
+    session = get_session("https://example.com")
+    with patch.object(session, "request", return_value=fake_response(500, "Error")):
+        with pytest.raises(AssertionError, match="Error"):
+            get_json("https://example.com/data")
+    assert sleep_mock.call_count == get_http_config()["retries_5xx"]
+
+    with patch.object(session, "request", side_effect=requests.ConnectionError):
+        with pytest.raises(requests.ConnectionError):
+            get_json("https://example.com/data")
+
+
+@patch("common.http.time.sleep")
+@patch("common.http.get_rate_limiter")
+def test_get_json_429_retry_skips_rate_limiter(
+    get_rate_limiter_mock: Mock, sleep_mock: Mock
+) -> None:
+    """Tests that the retry after 429 response doesn't wait for the rate limiter again
+
+    Parameters
+    ----------
+    get_rate_limiter_mock : Mock
+        A mock to check waits for the rate limiter.
+    sleep_mock : Mock
+        A mock to skip waiting between retries.
+    """
+    get_rate_limiter_mock.return_value.acquire.return_value = 0
+    session = get_session("https://example.com")
+    responses = [
+        fake_response(429, headers={"Retry-After": "60"}),
+        fake_response(503),
+        fake_response(200, '{"ok": true}'),
+    ]
+    with patch.object(session, "request", side_effect=responses):
+        assert get_json("https://example.com/data") == {"ok": True}
+    assert get_rate_limiter_mock.return_value.acquire.call_count == 2
+    assert sleep_mock.call_args_list[0].args == (60,)
@@ -0,0 +1,79 @@
+"""This module contains tests for sync run instrumentation"""
+import json
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+from pytest import CaptureFixture
+
+from common.metrics import MetricsRegistry
+from common.metrics import get_registry
+from common.metrics import push_metrics
+from common.metrics import span
+
+
+def test_span_is_logged_and_recorded(capsys: CaptureFixture) -> None:
+    """Tests that finished and failed spans are logged as JSON and aggregated
+
+    Parameters
+    ----------
+    capsys : CaptureFixture
+        Pytest fixture to capture the output.
+    """
+    registry = get_registry()
+    registry.reset()
+    with span("write", source="Jar") as attributes:
+        attributes["rows"] = 3
+    with pytest.raises(ValueError):
+        with span("write", source="Jar"):
+            raise ValueError("Failed")
+
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(record["span"], record["status"]) for record in records] == [
+        ("write", "ok"),
+        ("write", "error"),
+    ]
+    assert records[0]["source"] == "Jar" and records[0]["rows"] == 3
+    span_metrics = registry.spans[("write", (("source", "Jar"),))]
+    assert span_metrics["count"] == 2
+    assert span_metrics["sum"] >= span_metrics["max"] > 0
+
+
+def test_to_prometheus() -> None:
+    """Tests that spans and counters are rendered in Prometheus text format"""
+    registry = MetricsRegistry()
+    registry.observe("write", 0.5, source='Dzyga\'s "Jar"')
+    registry.observe("write", 0.25, source='Dzyga\'s "Jar"')
+    registry.inc("rows_out", 10, source="PayPal")
+    registry.inc("rows_out", 5, source="PayPal")
+
+    assert registry.to_prometheus() == (
+        "# TYPE dzyga_span_duration_seconds summary\n"
+        'dzyga_span_duration_seconds_sum{span="write",source="Dzyga\'s \\"Jar\\""} 0.750000\n'
+        'dzyga_span_duration_seconds_count{span="write",source="Dzyga\'s \\"Jar\\""} 2\n'
+        "# TYPE dzyga_rows_out_total counter\n"
+        'dzyga_rows_out_total{source="PayPal"} 15\n'
+    )
+    registry.reset()
+    assert registry.to_prometheus() == ""
+
+
+@patch("common.http.request")
+def test_push_metrics(request_mock: Mock) -> None:
+    """Tests that metrics are pushed to the job group of Pushgateway
+
+    Parameters
+    ----------
+    request_mock : Mock
+        A mock to check the pushed metrics.
+    """
+    get_registry().reset()
+    get_registry().inc("sync_runs", source="PayPal", status="ok")
+    push_metrics("http://localhost:9091/", "dzyga_analytics")
+
+    request_mock.assert_called_once()
+    method, url = request_mock.call_args.args
+    assert (method, url) == ("PUT", "http://localhost:9091/metrics/job/dzyga_analytics")
+    assert b'dzyga_sync_runs_total{source="PayPal",status="ok"} 1' in (
+        request_mock.call_args.kwargs["data"]
+    )
@@ -0,0 +1,49 @@
+"""This module contains tests for MongoDB utilities"""
+from datetime import datetime
+
+from bson import ObjectId
+
+from common.config import get_mongo_client_options
+from common.mongo import close_clients
+from common.mongo import ensure_indexes
+from common.mongo import get_client
+from common.mongo import get_collection
+from common.mongo import get_database
+from common.mongo import get_last_document_datetimes
+
+
+def test_get_client_is_shared() -> None:
+    """Tests that all databases and collections share one pooled client"""
+    client = get_client()
+    assert get_client() is client
+    assert get_database().client is client
+    assert get_collection().database.client is client
+    assert client.options.pool_options.max_pool_size == get_mongo_client_options()["maxPoolSize"]
+
+
+def test_close_clients() -> None:
+    """Tests that a new client is created after closing the shared ones"""
+    client = get_client()
+    close_clients()
+    assert get_client() is not client
+
+
+def test_get_last_document_datetimes() -> None:
+    """Tests that the latest datetime of every donation source is found in one query"""
+    db = get_database()
+    collection = db.get_collection(f"test_donations_{ObjectId()}")
+    ensure_indexes(collection)
+    collection.insert_many(
+        [
+            {"donationSource": "A", "datetime": datetime(2022, 8, 1)},
+            {"donationSource": "A", "datetime": datetime(2022, 8, 3)},
+            {"donationSource": "B", "datetime": datetime(2022, 8, 2)},
+            {"donationSource": "C", "datetime": datetime(2022, 8, 4)},
+        ]
+    )
+    assert get_last_document_datetimes(["A", "B", "D"], collection) == {
+        "A": datetime(2022, 8, 3),
+        "B": datetime(2022, 8, 2),
+    }
+    assert "donationSource_datetime" in collection.index_information()
+    db.drop_collection(collection.name)
@@ -0,0 +1,53 @@
+"""This module contains tests for rate limiting of donation source APIs"""
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from common.rate_limiter import TokenBucket
+from common.rate_limiter import get_rate_limiter
+from common.rate_limiter import get_rate_limiters_metrics
+from common.rate_limiter import reset_rate_limiters_metrics
+
+
+@patch("common.rate_limiter.time.sleep")
+@patch("common.rate_limiter.time.monotonic")
+def test_token_bucket_schedules_requests(monotonic_mock: Mock, sleep_mock: Mock) -> None:
+    """Tests that requests above the burst are spaced according to the rate
+
+    Parameters
+    ----------
+    monotonic_mock : Mock
+        A mock to fake monotonic clock.
+    sleep_mock : Mock
+        A mock to skip waiting.
+    """
+    monotonic_mock.return_value = 0
+    rate_limiter = TokenBucket(rate=1 / 60, capacity=1)
+    assert rate_limiter.acquire() == 0
+    assert rate_limiter.acquire() == 60
+    assert rate_limiter.acquire() == 120
+
+    monotonic_mock.return_value = 150
+    assert rate_limiter.acquire() == 30
+    assert [call.args[0] for call in sleep_mock.call_args_list] == [60, 120, 30]
+    assert rate_limiter.get_metrics() == {"requests": 4, "waits": 3, "wait_seconds": 210}
+
+
+def test_get_rate_limiter() -> None:
+    """Tests that rate limiters are configured per host and shared per key"""
+    assert get_rate_limiter("api-m.paypal.com") is None
+    rate_limiter = get_rate_limiter("api.monobank.ua", "token")
+    assert get_rate_limiter("api.monobank.ua", "token") is rate_limiter
+    assert get_rate_limiter("api.monobank.ua", "other token") is not rate_limiter
+    assert all("token" not in name for name in get_rate_limiters_metrics())
+
+
+@patch("common.rate_limiter.time.sleep", Mock())
+@patch("common.rate_limiter.time.monotonic", Mock(return_value=0))
+def test_reset_rate_limiters_metrics() -> None:
+    """Tests that metrics are reset between runs, but the rate limit still holds"""
+    rate_limiter = get_rate_limiter("api.monobank.ua", "reset token")
+    rate_limiter.acquire()
+    reset_rate_limiters_metrics()
+    assert rate_limiter.get_metrics() == {"requests": 0, "waits": 0, "wait_seconds": 0}
+    assert rate_limiter.acquire() > 0
+    assert rate_limiter.get_metrics()["waits"] == 1
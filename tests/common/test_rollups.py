@@ -0,0 +1,118 @@
+"""This module contains tests for daily and monthly rollups of donations"""
+from datetime import datetime
+from datetime import timezone
+from unittest.mock import patch
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from common.mongo import get_database
+from common.mongo import upsert_documents
+from common.rollups import ROLLUP_PERIODS
+from common.rollups import aggregate_rollups
+from common.rollups import ensure_rollup_indexes
+from common.rollups import get_rollup_collection
+from common.rollups import get_rollup_increments
+from common.rollups import rebuild_rollups
+from common.rollups import update_pending_rollups
+
+DOCUMENTS = [
+    {
+        "donationSource": "A",
+        "transactionKey": "1",
+        "datetime": datetime(2022, 8, 1, 23, 30),
+        "currency": "UAH",
+        "countryCode": "UA",
+        "amountUSD": 1.5,
+        "amountOriginal": 55.0,
+    },
+    {
+        "donationSource": "A",
+        "transactionKey": "2",
+        "datetime": datetime(2022, 8, 2, 1, 0, tzinfo=timezone.utc),
+        "currency": "UAH",
+        "countryCode": "UA",
+        "amountUSD": 2.0,
+        "amountOriginal": 70.0,
+    },
+    {
+        "donationSource": "B",
+        "transactionKey": "3",
+        "datetime": datetime(2022, 8, 1, 5, 0),
+        "currency": "USD",
+        "countryCode": None,
+        "amountUSD": 10.0,
+        "amountOriginal": 10.0,
+    },
+]
+
+
+def test_get_rollup_increments() -> None:
+    """Tests that donations are summed by UTC day or month, source, currency and country"""
+    assert get_rollup_increments(DOCUMENTS, "monthly") == {
+        (datetime(2022, 8, 1), "A", "UAH", "UA"): {
+            "count": 2,
+            "amountUSD": 3.5,
+            "amountOriginal": 125.0,
+        },
+        (datetime(2022, 8, 1), "B", "USD", None): {
+            "count": 1,
+            "amountUSD": 10.0,
+            "amountOriginal": 10.0,
+        },
+    }
+    assert list(get_rollup_increments(DOCUMENTS, "daily")) == [
+        (datetime(2022, 8, 1), "A", "UAH", "UA"),
+        (datetime(2022, 8, 2), "A", "UAH", "UA"),
+        (datetime(2022, 8, 1), "B", "USD", None),
+    ]
+
+
+def test_update_and_rebuild_rollups() -> None:
+    """Tests that rollups count each inserted donation once, even after a failed update,
+    and match the rebuilt ones"""
+    db = get_database()
+    collection = db.get_collection(f"test_donations_{ObjectId()}")
+    ensure_rollup_indexes(collection)
+    upsert_documents(collection, [dict(document) for document in DOCUMENTS[:2]])
+    with patch("common.rollups.update_rollups", side_effect=OperationFailure("Rollup failed")):
+        with pytest.raises(OperationFailure):
+            update_pending_rollups(collection)
+    # Donations of the failed update are added with the next write
+    upsert_documents(collection, [dict(document) for document in DOCUMENTS])
+    assert update_pending_rollups(collection, "A") == 2
+    assert update_pending_rollups(collection) == 1
+    assert update_pending_rollups(collection) == 0
+    assert collection.count_documents({"rolledUp": {"$exists": True}}) == 0
+
+    def get_rollups(period: str) -> list[dict]:
+        return sorted(
+            get_rollup_collection(collection, period).find({}, {"_id": False}),
+            key=lambda rollup: (rollup["date"], rollup["donationSource"]),
+        )
+
+    updated_rollups = {period: get_rollups(period) for period in ROLLUP_PERIODS}
+    assert [rollup["count"] for rollup in updated_rollups["daily"]] == [1, 1, 1]
+    assert [rollup["amountUSD"] for rollup in updated_rollups["monthly"]] == [3.5, 10.0]
+
+    assert rebuild_rollups(collection, max_workers=2) == {"daily": 3, "monthly": 2}
+    for period in ROLLUP_PERIODS:
+        assert get_rollups(period) == updated_rollups[period]
+
+    # Pending donations stored before the rebuild are included in the rebuilt rollups,
+    # and the ones inserted during the rebuild are left to update_pending_rollups
+    upsert_documents(collection, [{**DOCUMENTS[0], "transactionKey": "stored"}])
+
+    def insert_and_aggregate_rollups(*args, **kwargs) -> list[dict]:
+        upsert_documents(collection, [{**DOCUMENTS[0], "transactionKey": "inserted"}])
+        return aggregate_rollups(*args, **kwargs)
+
+    with patch("common.rollups.aggregate_rollups", insert_and_aggregate_rollups):
+        rebuild_rollups(collection, max_workers=1)
+    assert sum(rollup["count"] for rollup in get_rollups("daily")) == 4
+    assert update_pending_rollups(collection) == 1
+    assert sum(rollup["count"] for rollup in get_rollups("daily")) == 5
+    for period in ROLLUP_PERIODS:
+        db.drop_collection(f"{collection.name}_{period}")
+    db.drop_collection(collection.name)
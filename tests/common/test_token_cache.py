@@ -0,0 +1,51 @@
+"""This module contains tests for OAuth access token cache"""
+from pathlib import Path
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from common.token_cache import TOKEN_REFRESH_MARGIN_SECONDS
+from common.token_cache import AccessTokenCache
+
+
+def test_get_reuses_token_until_expiry() -> None:
+    """Tests that the token is fetched once and refreshed shortly before expiry"""
+    token_cache = AccessTokenCache()
+    fetch_token = Mock(
+        side_effect=[
+            {"access_token": "first", "expires_in": 3600},
+            {"access_token": "second", "expires_in": 3600},
+        ]
+    )
+    with patch("common.token_cache.time.time", return_value=0):
+        assert token_cache.get("client", fetch_token) == "first"
+        assert token_cache.get("client", fetch_token) == "first"
+    assert fetch_token.call_count == 1
+
+    with patch(
+        "common.token_cache.time.time", return_value=3600 - TOKEN_REFRESH_MARGIN_SECONDS + 1
+    ):
+        assert token_cache.get("client", fetch_token) == "second"
+    assert fetch_token.call_count == 2
+
+
+def test_get_is_keyed_by_client() -> None:
+    """Tests that tokens of different clients are cached separately"""
+    token_cache = AccessTokenCache()
+    assert token_cache.get("a", lambda: {"access_token": "a", "expires_in": 3600}) == "a"
+    assert token_cache.get("b", lambda: {"access_token": "b", "expires_in": 3600}) == "b"
+    assert token_cache.get("a", Mock()) == "a"
+
+
+def test_persisted_tokens_are_reused(tmp_path: Path) -> None:
+    """Tests that tokens persisted by one cache are reused by another one
+
+    Parameters
+    ----------
+    tmp_path : Path
+        Temporary directory for the tokens file.
+    """
+    filepath = str(tmp_path / "tokens.json")
+    AccessTokenCache(filepath).get("client", lambda: {"access_token": "a", "expires_in": 3600})
+    fetch_token = Mock()
+    assert AccessTokenCache(filepath).get("client", fetch_token) == "a"
+    fetch_token.assert_not_called()
@@ -0,0 +1,98 @@
+"""This module contains tests for historical USD / UAH rates index"""
+from datetime import date
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import numpy as np
+
+from common.uah_rates import UahRateIndex
+from common.uah_rates import update_uah_rate_index
+
+
+def test_uah_rate_index() -> None:
+    """Tests rates lookup, merge and persistence of the index"""
+    uah_rate_index = UahRateIndex(
+        np.array(["2022-08-01", "2022-08-03"], dtype="datetime64[D]"), np.array([36.0, 37.0])
+    )
+    assert uah_rate_index.get_rate(datetime(2022, 7, 1)) == 36.0
+    assert uah_rate_index.get_rate(date(2022, 8, 2)) == 36.0
+    assert uah_rate_index.get_rate(datetime(2022, 8, 3, 23, 59)) == 37.0
+    assert uah_rate_index.get_rate(None) == 37.0
+    assert uah_rate_index.last_date == date(2022, 8, 3)
+
+    merged = uah_rate_index.merge(
+        np.array(["2022-08-03", "2022-08-02"], dtype="datetime64[D]"), np.array([38.0, 39.0])
+    )
+    assert merged.rates.tolist() == [36.0, 39.0, 38.0]
+    assert len(uah_rate_index) == 2
+
+
+def test_uah_rate_index_save_load(tmp_path: Path) -> None:
+    """Tests that the index is the same after saving and loading
+
+    Parameters
+    ----------
+    tmp_path : Path
+        Temporary directory for the index file.
+    """
+    filepath = str(tmp_path / "uah_rates.npz")
+    uah_rate_index = UahRateIndex(
+        np.array(["2022-08-01", "2022-08-03"], dtype="datetime64[D]"), np.array([36.0, 37.0])
+    )
+    uah_rate_index.save(filepath)
+    loaded = UahRateIndex.load(filepath)
+    assert (loaded.dates == uah_rate_index.dates).all()
+    assert (loaded.rates == uah_rate_index.rates).all()
+
+
+@patch("common.uah_rates.datetime")
+@patch("common.uah_rates.get_collection")
+@patch("common.uah_rates.fetch_uah_rates")
+@patch("common.uah_rates.get_cache_config")
+def test_update_uah_rate_index(
+    get_cache_config_mock: Mock,
+    fetch_uah_rates_mock: Mock,
+    get_collection_mock: Mock,
+    datetime_mock: Mock,
+    tmp_path: Path,
+) -> None:
+    """Tests that only missing rates are fetched and stored
+
+    Parameters
+    ----------
+    get_cache_config_mock : Mock
+        A mock to use temporary cache directory.
+    fetch_uah_rates_mock : Mock
+        A mock to fake National Bank of Ukraine API.
+    get_collection_mock : Mock
+        A mock to fake MongoDB collection.
+    datetime_mock : Mock
+        A mock to fake current datetime.
+    tmp_path : Path
+        Temporary cache directory.
+    """
+    get_cache_config_mock.return_value = {"dir": str(tmp_path)}
+    datetime_mock.utcnow = Mock(return_value=datetime(2022, 8, 5))
+    datetime_mock.combine = datetime.combine
+    datetime_mock.min = datetime.min
+    UahRateIndex(np.array(["2022-08-01"], dtype="datetime64[D]"), np.array([36.0])).save(
+        str(tmp_path / "uah_rates.npz")
+    )
+    fetch_uah_rates_mock.return_value = (
+        np.array(["2022-08-02", "2022-08-05"], dtype="datetime64[D]"),
+        np.array([36.5, 37.0]),
+    )
+
+    with patch("common.uah_rates._uah_rate_index", None):
+        uah_rate_index = update_uah_rate_index()
+
+    fetch_uah_rates_mock.assert_called_once_with(date(2022, 8, 2), date(2022, 8, 5))
+    operations = get_collection_mock.return_value.bulk_write.call_args.args[0]
+    assert [operation._filter["_id"] for operation in operations] == [
+        datetime(2022, 8, 2),
+        datetime(2022, 8, 5),
+    ]
+    assert uah_rate_index.rates.tolist() == [36.0, 36.5, 37.0]
+    assert UahRateIndex.load(str(tmp_path / "uah_rates.npz")).rates.tolist() == [36.0, 36.5, 37.0]
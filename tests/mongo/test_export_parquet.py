@@ -0,0 +1,89 @@
+"""This module contains tests for Parquet export of donations"""
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow.dataset as ds
+from bson import ObjectId
+
+from common.mongo import get_database
+from common.mongo import replace_documents
+from mongo.export_parquet import export_parquet
+
+
+def get_document(donation_source: str, transaction_datetime: datetime, amount: float) -> dict:
+    """Builds a donation document inserted long ago, at the transaction datetime.
+
+    Parameters
+    ----------
+    donation_source : str
+        The donation source name
+    transaction_datetime : datetime
+        The transaction datetime
+    amount : float
+        Donation amount in USD
+
+    Returns
+    -------
+    dict
+        Donation document
+    """
+    return {
+        "_id": ObjectId.from_datetime(transaction_datetime),
+        "donationSource": donation_source,
+        "datetime": transaction_datetime,
+        "senderName": "Test Person",
+        "senderNameCensored": "Te** Pe****",
+        "senderEmail": None,
+        "senderNote": "",
+        "countryCode": None,
+        "currency": "USD",
+        "amountOriginal": amount,
+        "amountUSD": amount,
+        "insertionMode": "Auto",
+        "transactionKey": str(ObjectId()),
+    }
+
+
+def test_export_parquet(tmp_path: Path) -> None:
+    """Tests that partitions are written by source and month and only the ones
+    with inserted or replaced donations are rewritten by the incremental export
+
+    Parameters
+    ----------
+    tmp_path : Path
+        Temporary export directory.
+    """
+    db = get_database()
+    collection = db.get_collection(f"test_donations_{ObjectId()}")
+    collection.insert_many(
+        [
+            get_document("Dzyga's Paw Jar", datetime(2022, 7, 31, 23), 1.0),
+            get_document("Dzyga's Paw Jar", datetime(2022, 8, 1), 2.0),
+            get_document("Other", datetime(2022, 8, 2), 4.0),
+        ]
+    )
+
+    assert export_parquet(collection, str(tmp_path), batch_size=1) == {"partitions": 3, "rows": 3}
+    dataset = ds.dataset(tmp_path, format="parquet", partitioning="hive")
+    table = dataset.to_table().sort_by("datetime")
+    assert table.column("donationSource").to_pylist() == ["Dzyga's Paw Jar"] * 2 + ["Other"]
+    assert table.column("month").to_pylist() == ["2022-07", "2022-08", "2022-08"]
+    assert table.column("amountUSD").to_pylist() == [1.0, 2.0, 4.0]
+
+    document = get_document("Other", datetime(2022, 8, 3), 8.0)
+    del document["_id"]
+    collection.insert_one(document)
+    assert export_parquet(collection, str(tmp_path)) == {"partitions": 1, "rows": 2}
+    dataset = ds.dataset(tmp_path, format="parquet", partitioning="hive")
+    assert sum(dataset.to_table().column("amountUSD").to_pylist()) == 15.0
+
+    # Replaced donations keep their old _id, so they are found by updatedAt
+    document = get_document("Dzyga's Paw Jar", datetime(2022, 7, 31, 23), 16.0)
+    document["transactionKey"] = collection.find_one({"amountUSD": 1.0})["transactionKey"]
+    del document["_id"]
+    replace_documents(collection, [document])
+    # The previous insert is within the watermark margin, so its partition is exported again
+    assert export_parquet(collection, str(tmp_path)) == {"partitions": 2, "rows": 3}
+    dataset = ds.dataset(tmp_path, format="parquet", partitioning="hive")
+    assert sum(dataset.to_table().column("amountUSD").to_pylist()) == 30.0
+    db.drop_collection(collection.name)
@@ -0,0 +1,196 @@
+"""This module contains tests for manual update entry point"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pandas as pd
+
+from mongo.update_manual import import_files
+from mongo.update_manual import load_mapping
+from mongo.update_manual import resolve_filepaths
+from sources.manual import Manual
+from sources.manual import convert_chunk
+
+
+def test_resolve_filepaths(tmp_path: Path) -> None:
+    """Tests that directories and glob patterns are expanded into CSV files
+
+    Parameters
+    ----------
+    tmp_path : Path
+        Temporary directory for CSV files.
+    """
+    (tmp_path / "2022").mkdir()
+    for filename in ["2022/01.csv", "2022/02.csv", "2022/notes.txt", "cash.csv"]:
+        (tmp_path / filename).touch()
+
+    assert resolve_filepaths([str(tmp_path / "2022")]) == [
+        str(tmp_path / "2022" / "01.csv"),
+        str(tmp_path / "2022" / "02.csv"),
+    ]
+    assert resolve_filepaths([str(tmp_path / "**" / "*.csv"), str(tmp_path / "cash.csv")]) == [
+        str(tmp_path / "2022" / "01.csv"),
+        str(tmp_path / "2022" / "02.csv"),
+        str(tmp_path / "cash.csv"),
+    ]
+
+
+def test_load_mapping(tmp_path: Path) -> None:
+    """Tests that a single pattern in the mapping file is treated as a list
+
+    Parameters
+    ----------
+    tmp_path : Path
+        Temporary directory for the mapping file.
+    """
+    mapping_filepath = tmp_path / "mapping.yml"
+    mapping_filepath.write_text("Cash: exports/cash\nOther:\n  - a.csv\n  - b/*.csv\n")
+    assert load_mapping(str(mapping_filepath)) == {
+        "Cash": ["exports/cash"],
+        "Other": ["a.csv", "b/*.csv"],
+    }
+
+
+def test_import_files(tmp_path: Path) -> None:
+    """Tests that files of a donation source are written in batches and identical rows
+    in different files get their own keys
+
+    Parameters
+    ----------
+    tmp_path : Path
+        Temporary directory for CSV files.
+    """
+    header = "senderName,currency,senderNote,datetime,senderEmail,amountOriginal,countryCode\n"
+    row = "Cash,USD,,2022-08-01 11:00:00+03:00,,100,\n"
+    (tmp_path / "01.csv").write_text(header + row + "Cash,USD,,2022-08-02 11:00:00,,12.5,\n")
+    (tmp_path / "02.csv").write_text(header + row)
+    (tmp_path / "other.csv").write_text(header + row)
+    files = [
+        ("Cash", str(tmp_path / "01.csv")),
+        ("Cash", str(tmp_path / "02.csv")),
+        ("Other", str(tmp_path / "other.csv")),
+    ]
+    batches = []
+
+    def write_documents(manual, documents: list[dict]) -> int:
+        batches.append((manual.donation_source, documents))
+        return len(documents)
+
+    with (
+        patch(
+            "mongo.update_manual.ProcessPoolExecutor",
+            lambda max_workers, mp_context: ThreadPoolExecutor(max_workers),
+        ),
+        patch("sources.base.get_source", return_value={"creation_date": datetime(2022, 4, 1)}),
+        patch("sources.base.get_collection"),
+        patch("sources.manual.Manual.write_documents", write_documents),
+    ):
+        assert import_files(files, max_workers=2, batch_size=2, chunksize=1) == 4
+
+    cash_batches = [documents for source, documents in batches if source == "Cash"]
+    assert [len(documents) for documents in cash_batches] == [2, 1]
+    cash_keys = [document["transactionKey"] for documents in cash_batches for document in documents]
+    assert len(set(cash_keys)) == 3
+    # Occurrences are counted per donation source, so the same row of another source
+    # gets the same key as the first occurrence
+    other_keys = [
+        document["transactionKey"]
+        for source, documents in batches
+        if source == "Other"
+        for document in documents
+    ]
+    assert other_keys == cash_keys[:1]
+
+
+def test_import_files_single_file(tmp_path: Path) -> None:
+    """Tests that chunks of a single file are converted separately and get the same keys
+    as the whole file
+
+    Parameters
+    ----------
+    tmp_path : Path
+        Temporary directory for CSV files.
+    """
+    filepath = tmp_path / "cash.csv"
+    filepath.write_text(
+        "senderName,currency,senderNote,datetime,senderEmail,amountOriginal,countryCode\n"
+        "Cash,USD,,2022-08-01 11:00:00+03:00,,100,\n"
+        "Cash,USD,Note,2022-08-02 12:00:00+02:00,,12.5,\n"
+        "Cash,USD,,2022-08-01 11:00:00+03:00,,100,\n"
+    )
+    converted_chunks = []
+    keys = []
+
+    def convert(donation_source: str, filepath: str, df: pd.DataFrame):
+        converted_chunks.append(len(df))
+        return convert_chunk(donation_source, filepath, df)
+
+    def write_documents(manual, documents: list[dict]) -> int:
+        keys.extend(document["transactionKey"] for document in documents)
+        return len(documents)
+
+    with (
+        patch(
+            "mongo.update_manual.ProcessPoolExecutor",
+            lambda max_workers, mp_context: ThreadPoolExecutor(max_workers),
+        ),
+        patch("mongo.update_manual.convert_chunk", convert),
+        patch("sources.base.get_source", return_value={"creation_date": datetime(2022, 4, 1)}),
+        patch("sources.base.get_collection"),
+        patch("sources.manual.Manual.write_documents", write_documents),
+    ):
+        assert import_files([("Cash", str(filepath))], max_workers=2, chunksize=1) == 3
+
+    assert converted_chunks == [1, 1, 1]
+    df = Manual.normalize_fields(pd.read_csv(filepath))
+    assert keys == Manual.get_transaction_keys(df)
+
+
+def test_import_files_append(tmp_path: Path) -> None:
+    """Tests that rows identical to stored donations get their keys by default
+    and are numbered after the stored ones with append
+
+    Parameters
+    ----------
+    tmp_path : Path
+        Temporary directory for CSV files.
+    """
+    filepath = tmp_path / "cash.csv"
+    filepath.write_text(
+        "senderName,currency,senderNote,datetime,senderEmail,amountOriginal,countryCode\n"
+        "Cash,USD,,2022-08-01 11:00:00+03:00,,100,\n"
+    )
+    stored_document = {
+        "senderName": "Cash",
+        "currency": "USD",
+        "senderNote": "",
+        "datetime": datetime(2022, 8, 1, 8),
+        "senderEmail": None,
+        "amountOriginal": 100.0,
+    }
+    stored_keys = Manual.get_transaction_keys(
+        pd.DataFrame.from_dict([stored_document, stored_document])
+    )
+    collection = Mock()
+    collection.find.return_value = [stored_document]
+    keys = []
+
+    def write_documents(manual, documents: list[dict]) -> int:
+        keys.extend(document["transactionKey"] for document in documents)
+        return len(documents)
+
+    with (
+        patch(
+            "mongo.update_manual.ProcessPoolExecutor",
+            lambda max_workers, mp_context: ThreadPoolExecutor(max_workers),
+        ),
+        patch("sources.base.get_source", return_value={"creation_date": datetime(2022, 4, 1)}),
+        patch("sources.base.get_collection", return_value=collection),
+        patch("sources.manual.Manual.write_documents", write_documents),
+    ):
+        import_files([("Cash", str(filepath))], max_workers=1)
+        import_files([("Cash", str(filepath))], max_workers=1, append=True)
+
+    assert keys == stored_keys
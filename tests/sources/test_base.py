@@ -1,20 +1,341 @@
 """This module contains tests for base source class"""
-
 from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from unittest.mock import Mock
+from unittest.mock import call
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+from pytest import CaptureFixture
 
+from common.donation import Donation
+from common.uah_rates import UahRateIndex
 from sources.base import SourceBase
+from sources.monobank import Monobank
 
 
 def test_convert_currency() -> None:
     """Tests currency_converter package"""
     assert SourceBase.convert_currency(10, "EUR", datetime(2022, 8, 20)) == 10.04
     assert SourceBase.convert_currency(10, "USD", datetime(2022, 8, 20)) == 10
-    usd_to_uah_rate = SourceBase.usd_to_uah_current_rate
-    assert SourceBase.convert_currency(1000, "UAH", None) == round(1000 / usd_to_uah_rate, 2)
-    assert SourceBase.convert_currency(100, "UAH", None) == round(100 / usd_to_uah_rate, 2)
+    uah_rate_index = UahRateIndex(
+        np.array(["2022-08-01", "2022-08-21"], dtype="datetime64[D]"), np.array([36.5686, 36.9])
+    )
+    with patch("sources.base.get_uah_rate_index", return_value=uah_rate_index):
+        assert SourceBase.convert_currency(1000, "UAH", datetime(2022, 8, 20)) == round(
+            1000 / 36.5686, 2
+        )
+        assert SourceBase.convert_currency(1000, "UAH", None) == round(1000 / 36.9, 2)
+        assert SourceBase.convert_currency(100, "UAH", None) == round(100 / 36.9, 2)
+
+
+def test_convert_currencies() -> None:
+    """Tests that batch conversion matches convert_currency for each transaction"""
+    df = pd.DataFrame(
+        {
+            "amountOriginal": [10.0, 10.0, 1000.0, 16.12, 100.0, 20.12, 55.55],
+            "currency": ["EUR", "USD", "UAH", "EUR", "GBP", "USD", "EUR"],
+            "datetime": [
+                datetime(2022, 8, 20),
+                datetime(2022, 8, 20),
+                datetime(2022, 8, 21),
+                datetime(2022, 5, 12, 12, 35),
+                datetime(2022, 4, 2, 13, 51),
+                datetime(2022, 4, 2, 17, 40),
+                datetime(2022, 8, 20, 23, 59),
+            ],
+        }
+    )
+    uah_rate_index = UahRateIndex(
+        np.array(["2022-08-01", "2022-08-21"], dtype="datetime64[D]"), np.array([36.5686, 36.9])
+    )
+    with patch("sources.base.get_uah_rate_index", return_value=uah_rate_index):
+        expected = [
+            SourceBase.convert_currency(value, currency, date)
+            for value, currency, date in zip(df["amountOriginal"], df["currency"], df["datetime"])
+        ]
+        converted = SourceBase.convert_currencies(
+            df["amountOriginal"], df["currency"], df["datetime"]
+        )
+    assert converted.to_list() == expected
+    assert converted[0] == 10.04
+
+
+def test_get_records_documents() -> None:
+    """Tests that Donation records are converted to the same documents as pd.DataFrame"""
+    donations = [
+        Donation("Test Person", 10.0, "EUR", datetime(2022, 8, 20), "", "DE", "A"),
+        Donation(None, 1000.0, "UAH", datetime(2022, 8, 21, 10), "a@b.com", "UA", "B", "a@b.com"),
+        Donation("Test Person", 20.12, "USD", datetime(2022, 4, 2, 17, 40), "Hi", None, "C"),
+    ]
+    uah_rate_index = UahRateIndex(
+        np.array(["2022-08-01", "2022-08-21"], dtype="datetime64[D]"), np.array([36.5686, 36.9])
+    )
+    with (
+        patch("sources.base.get_uah_rate_index", return_value=uah_rate_index),
+        patch("sources.base.get_source", return_value={"creation_date": datetime(2022, 8, 1)}),
+        patch("sources.base.get_collection"),
+    ):
+        monobank = Monobank("Dzyga's Paw Jar", last_document_datetimes={}, checkpoints={})
+        documents = monobank.get_documents(donations)
+        df = pd.DataFrame.from_dict([donation.to_document() for donation in donations])
+        df_documents = monobank.get_documents(df)
+
+    for field in ["amountUSD", "senderNameCensored", "datetime", "transactionKey"]:
+        assert [document[field] for document in documents] == [
+            document[field] for document in df_documents
+        ]
+    assert [document["amountUSD"] for document in documents] == [10.04, 27.1, 20.12]
+    assert documents[0]["senderNameCensored"] == "Te** Pe****"
+    assert documents[1]["senderNameCensored"] == ""
+    assert monobank.last_transaction_key == "B"
+
+
+@patch("sources.base.datetime")
+@patch("sources.base.get_collection")
+def test_skip_stored_boundary(get_collection_mock: Mock, datetime_mock: Mock) -> None:
+    """Tests that donations up to the latest stored document are skipped
+    only if it was stored without transaction key
+
+    Parameters
+    ----------
+    get_collection_mock : Mock
+        A mock to fake stored documents.
+    datetime_mock : Mock
+        A mock to fake current datetime.
+    """
+    datetime_mock.utcnow = Mock(return_value=datetime(2022, 9, 1))
+    last_document_datetimes = {"Dzyga's Paw Jar": datetime(2022, 8, 1, 10)}
+    donations = [
+        Donation("A", 1.0, "USD", datetime(2022, 8, 1, 10, tzinfo=timezone.utc), "", None, "A"),
+        Donation("B", 2.0, "USD", datetime(2022, 8, 1, 11, tzinfo=timezone.utc), "", None, "B"),
+    ]
+
+    get_collection_mock.return_value.find_one.return_value = {"_id": 1}
+    monobank = Monobank("Dzyga's Paw Jar", last_document_datetimes, checkpoints={})
+    assert monobank.skip_stored_boundary
+    assert [document["transactionKey"] for document in monobank.get_documents(donations)] == ["B"]
+    windows = monobank.get_backfill_windows()
+    assert [window.skip_stored_boundary for window in windows] == [True, False]
+
+    get_collection_mock.return_value.find_one.return_value = None
+    monobank = Monobank("Dzyga's Paw Jar", last_document_datetimes, checkpoints={})
+    assert not monobank.skip_stored_boundary
+    assert len(monobank.get_documents(donations)) == 2
 
 
 def test_parse_email_from_note() -> None:
     """Tests parse_email_from_note method"""
     assert SourceBase.parse_email_from_note("From: example@mail.com") == "example@mail.com"
     assert SourceBase.parse_email_from_note("Hello World!") is None
+
+
+@patch("sources.base.datetime")
+@patch("sources.base.SourceBase.get_checkpoint", Mock(return_value=None))
+@patch("sources.base.SourceBase.get_last_document_datetime")
+def test_get_backfill_windows(get_last_document_datetime_mock: Mock, datetime_mock: Mock) -> None:
+    """Tests that backfill windows cover the whole period without gaps
+
+    Parameters
+    ----------
+    get_last_document_datetime_mock : Mock
+        A mock to fake the last stored document datetime.
+    datetime_mock : Mock
+        A mock to fake current datetime.
+    """
+    datetime_mock.utcnow = Mock(return_value=datetime(2022, 9, 1))
+    get_last_document_datetime_mock.return_value = (datetime(2022, 7, 1), False)
+    monobank = Monobank("Dzyga's Paw Jar")
+    assert monobank.end_datetime == datetime(2022, 7, 1) + Monobank.window_period
+
+    windows = monobank.get_backfill_windows()
+    assert len(windows) == 3
+    assert windows[0].start_datetime == datetime(2022, 7, 1)
+    assert windows[-1].end_datetime == datetime(2022, 9, 1)
+    for window, next_window in zip(windows, windows[1:]):
+        assert window.end_datetime - window.start_datetime == Monobank.window_period
+        assert next_window.start_datetime == window.end_datetime
+
+
+@patch("sources.base.datetime")
+@patch("sources.base.save_checkpoint")
+@patch("sources.base.SourceBase.get_checkpoint")
+@patch("sources.base.SourceBase.write_documents")
+def test_write_window_data_saves_checkpoints(
+    write_documents_mock: Mock,
+    get_checkpoint_mock: Mock,
+    save_checkpoint_mock: Mock,
+    datetime_mock: Mock,
+) -> None:
+    """Tests that the checkpoint keeps the cursor of a partially written window
+    and moves to the end of the window once it is written
+
+    Parameters
+    ----------
+    write_documents_mock : Mock
+        A mock to skip writing to the collection.
+    get_checkpoint_mock : Mock
+        A mock to fake the saved sync checkpoint.
+    save_checkpoint_mock : Mock
+        A mock to check the saved sync checkpoints.
+    datetime_mock : Mock
+        A mock to fake current datetime.
+    """
+    datetime_mock.utcnow = Mock(return_value=datetime(2022, 7, 10))
+    get_checkpoint_mock.return_value = {"syncedUntil": datetime(2022, 7, 1), "cursor": None}
+    monobank = Monobank("Dzyga's Paw Jar")
+    assert monobank.start_datetime == datetime(2022, 7, 1)
+    assert not monobank.is_source_creation_date
+
+    def iter_api_data():
+        monobank.cursor = {"page": 2}
+        yield []
+        monobank.cursor = None
+        yield []
+
+    with patch.object(monobank, "iter_api_data", iter_api_data):
+        monobank.write_window_data()
+
+    assert write_documents_mock.call_count == 2
+    assert save_checkpoint_mock.call_args_list == [
+        call("Dzyga's Paw Jar", datetime(2022, 7, 1), None, {"page": 2}),
+        call("Dzyga's Paw Jar", datetime(2022, 7, 10), None, None),
+    ]
+
+    monobank.checkpoint_lag = timedelta(days=30)
+    assert monobank.get_synced_until() == datetime(2022, 7, 1)
+
+
+@patch("sources.base.datetime")
+@patch("sources.base.save_checkpoint")
+@patch("sources.base.SourceBase.get_checkpoint", Mock(return_value=None))
+@patch("sources.base.SourceBase.get_last_document_datetime")
+def test_write_backfill_data_streams_windows(
+    get_last_document_datetime_mock: Mock, save_checkpoint_mock: Mock, datetime_mock: Mock
+) -> None:
+    """Tests that backfill windows are written in order, page by page,
+    and no more than max_parallel_windows windows are fetched at once
+
+    Parameters
+    ----------
+    get_last_document_datetime_mock : Mock
+        A mock to fake the last stored document datetime.
+    save_checkpoint_mock : Mock
+        A mock to check the saved sync checkpoints.
+    datetime_mock : Mock
+        A mock to fake current datetime.
+    """
+    datetime_mock.utcnow = Mock(return_value=datetime(2022, 10, 1))
+    get_last_document_datetime_mock.return_value = (datetime(2022, 7, 1), False)
+    monobank = Monobank("Dzyga's Paw Jar")
+    monobank.max_parallel_windows = 2
+    events = []
+
+    def iter_api_data(window: Monobank):
+        events.append(("fetch", window.start_datetime))
+        for page in range(3):
+            yield [window.start_datetime, page]
+
+    def write_documents(window: Monobank, documents: list) -> int:
+        events.append(("write", *documents))
+        return len(documents)
+
+    def on_save_checkpoint(donation_source, synced_until, *_) -> None:
+        events.append(("checkpoint", synced_until))
+
+    save_checkpoint_mock.side_effect = on_save_checkpoint
+    with patch.object(Monobank, "iter_api_data", iter_api_data), patch.object(
+        Monobank, "write_documents", write_documents
+    ), patch.object(Monobank, "get_documents", lambda window, data: data):
+        monobank.write_backfill_data()
+
+    windows = monobank.get_backfill_windows()
+    assert len(windows) == 4
+    writes = [event[1:] for event in events if event[0] == "write"]
+    assert writes == [(window.start_datetime, page) for window in windows for page in range(3)]
+    checkpoints = [event[1] for event in events if event[0] == "checkpoint"]
+    assert checkpoints == [window.end_datetime for window in windows]
+    # The third window is fetched only after the first one is written
+    assert events.index(("fetch", windows[2].start_datetime)) > events.index(
+        ("checkpoint", windows[0].end_datetime)
+    )
+
+    def failing_iter_api_data(window: Monobank):
+        yield []
+        raise RuntimeError("API is down")
+
+    with patch.object(Monobank, "iter_api_data", failing_iter_api_data), patch.object(
+        Monobank, "write_documents", Mock(return_value=0)
+    ), patch.object(Monobank, "get_documents", lambda window, data: data):
+        with pytest.raises(RuntimeError, match="API is down"):
+            monobank.write_backfill_data()
+
+
+@patch("sources.base.datetime")
+@patch("sources.base.save_checkpoint")
+@patch("sources.base.SourceBase.get_checkpoint", Mock(return_value=None))
+@patch("sources.base.SourceBase.get_last_document_datetime")
+def test_write_backfill_data_saves_cursors(
+    get_last_document_datetime_mock: Mock, save_checkpoint_mock: Mock, datetime_mock: Mock
+) -> None:
+    """Tests that backfill saves the provider cursor of each written page,
+    even if later pages of the window are already fetched
+
+    Parameters
+    ----------
+    get_last_document_datetime_mock : Mock
+        A mock to fake the last stored document datetime.
+    save_checkpoint_mock : Mock
+        A mock to check the saved sync checkpoints.
+    datetime_mock : Mock
+        A mock to fake current datetime.
+    """
+    datetime_mock.utcnow = Mock(return_value=datetime(2022, 8, 15))
+    get_last_document_datetime_mock.return_value = (datetime(2022, 8, 1), False)
+    monobank = Monobank("Dzyga's Paw Jar")
+
+    def iter_api_data(window: Monobank):
+        for page in range(3):
+            window.cursor = {"followId": page + 1} if page < 2 else None
+            yield [page]
+
+    with patch.object(Monobank, "iter_api_data", iter_api_data), patch.object(
+        Monobank, "write_documents", Mock(return_value=0)
+    ), patch.object(Monobank, "get_documents", lambda window, data: data):
+        monobank.write_backfill_data()
+
+    assert [call.args[1:] for call in save_checkpoint_mock.call_args_list] == [
+        (datetime(2022, 8, 1), None, {"followId": 1}),
+        (datetime(2022, 8, 1), None, {"followId": 2}),
+        (monobank.get_backfill_windows()[0].get_synced_until(), None, None),
+    ]
+
+
+@patch("sources.base.get_archive_config", Mock(return_value={"enabled": True, "bucket": "archive"}))
+@patch("sources.base.archive_response", Mock(side_effect=OSError("Connection refused")))
+def test_archive_transactions_failure(capsys: CaptureFixture) -> None:
+    """Tests that a failed archive write doesn't fail the sync
+
+    Parameters
+    ----------
+    capsys : CaptureFixture
+        Used to check what we print to logs.
+    """
+    with (
+        patch("sources.base.get_source", return_value={"creation_date": datetime(2022, 8, 1)}),
+        patch("sources.base.get_collection"),
+    ):
+        monobank = Monobank("Dzyga's Paw Jar", last_document_datetimes={}, checkpoints={})
+        monobank.archive_transactions([{"id": "A"}])
+    assert "Dzyga's Paw Jar | Failed to archive transactions" in capsys.readouterr().out
+
+
+def test_mask_names() -> None:
+    """Tests that batch masking matches mask_name for each name"""
+    names = pd.Series(["Test Person", None, "  Fake   Corp Inc. ", "Test Person", "", "Я"])
+    masked_names = SourceBase.mask_names(names)
+    assert masked_names.to_list() == [SourceBase.mask_name(name) for name in names]
+    assert masked_names.to_list() == ["Te** Pe****", "", "Fa** Co** In**", "Te** Pe****", "", "Я"]
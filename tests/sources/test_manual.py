@@ -1,9 +1,12 @@
 """This module contains tests for Manual donation source"""
+from collections import Counter
 from datetime import datetime
+from pathlib import Path
 from unittest.mock import Mock
 from unittest.mock import PropertyMock
 from unittest.mock import patch
 
+import pandas as pd
 import pytest
 from bson import ObjectId
 from pymongo.errors import BulkWriteError
@@ -12,7 +15,9 @@ from pytest import CaptureFixture
 from common.config import get_sources_names_list
 from common.constants import DEFAULT_USD_UAH_CONVERTION_RATE
 from common.mongo import get_database
+from common.rollups import ROLLUP_PERIODS
 from mongo.enforce_schema import enforce_schema
+from mongo.rekey_manual import rekey_manual_documents
 from sources.manual import Manual
 
 
@@ -21,12 +26,19 @@ from sources.manual import Manual
     "sources.base.SourceBase.usd_to_uah_current_rate",
     PropertyMock(return_value=DEFAULT_USD_UAH_CONVERTION_RATE),
 )
-def test_write_new_data(get_collection_name_mock: Mock, capsys: CaptureFixture) -> None:
+@patch("common.checkpoints.get_checkpoints_collection_name")
+def test_write_new_data(
+    get_checkpoints_collection_name_mock: Mock,
+    get_collection_name_mock: Mock,
+    capsys: CaptureFixture,
+) -> None:
     """This is an E2E test for Manual source. We test if we can write the data
     from a csv file to the collection.
 
     Parameters
     ----------
+    get_checkpoints_collection_name_mock : Mock
+        A mock to swap checkpoints collection name from config names to the test one.
     get_collection_name_mock : Mock
         A mock to swap collection name from config names to the test one.
     capsys : CaptureFixture
@@ -35,6 +47,7 @@ def test_write_new_data(get_collection_name_mock: Mock, capsys: CaptureFixture)
     db = get_database()
     test_collection_name = f"test_donations_{ObjectId()}"
     get_collection_name_mock.return_value = test_collection_name
+    get_checkpoints_collection_name_mock.return_value = f"test_checkpoints_{ObjectId()}"
     db.create_collection(test_collection_name)
     enforce_schema(test_collection_name)
 
@@ -44,6 +57,15 @@ def test_write_new_data(get_collection_name_mock: Mock, capsys: CaptureFixture)
     manual.write_new_data()
     assert "None - None | Other | Wrote 6 rows" in capsys.readouterr().out
 
+    manual.write_new_data()
+    assert "None - None | Other | Wrote 0 rows (6 already stored)" in capsys.readouterr().out
+
+    manual = Manual("Other", "tests/test_data/sample.csv", chunksize=4)
+    manual.write_new_data()
+    out = capsys.readouterr().out
+    assert "None - None | Other | Wrote 0 rows (4 already stored)" in out
+    assert "Other | Processed 6 rows, inserted 0" in out
+
     manual = Manual("Other", "tests/test_data/empty.csv")
     manual.write_new_data()
     assert "None - None | Other | No data" in capsys.readouterr().out
@@ -57,3 +79,107 @@ def test_write_new_data(get_collection_name_mock: Mock, capsys: CaptureFixture)
         manual.write_new_data()
 
     db.drop_collection(test_collection_name)
+    db.drop_collection(get_checkpoints_collection_name_mock.return_value)
+    for period in ROLLUP_PERIODS:
+        db.drop_collection(f"{test_collection_name}_{period}")
+
+
+def test_get_transaction_keys() -> None:
+    """Tests that transaction keys are stable and identical rows get different keys"""
+    df = pd.read_csv("tests/test_data/sample.csv", parse_dates=["datetime"])
+    df = pd.concat([df, df.iloc[[0]]], ignore_index=True)
+    keys = Manual.get_transaction_keys(df)
+    assert len(set(keys)) == len(df)
+    assert keys == Manual.get_transaction_keys(df)
+    assert Manual.get_transaction_keys(df.iloc[:0]) == []
+
+    occurrences = Counter()
+    chunked_keys = Manual.get_transaction_keys(df.iloc[:4], occurrences)
+    chunked_keys += Manual.get_transaction_keys(df.iloc[4:], occurrences)
+    assert chunked_keys == keys
+
+
+def test_get_transaction_keys_do_not_depend_on_batch() -> None:
+    """Tests that keys of rows don't change when a row with a decimal amount
+    is added to the file, and that stored documents get the same keys"""
+    df = pd.DataFrame(
+        {
+            "senderName": ["Test Person", None],
+            "currency": ["USD", "UAH"],
+            "senderNote": ["", "Note"],
+            "datetime": pd.to_datetime(["2022-08-01 11:48:56+03:00", "2022-08-02 10:15:50+03:00"]),
+            "senderEmail": [None, "mail@mail.com"],
+            "amountOriginal": [100, 1000],
+        }
+    )
+    keys = Manual.get_transaction_keys(df)
+    decimal_row = df.iloc[[0]].assign(amountOriginal=12.5)
+    assert Manual.get_transaction_keys(pd.concat([df, decimal_row]))[:2] == keys
+
+    documents = pd.DataFrame.from_dict(
+        [
+            {
+                "senderName": "Test Person",
+                "currency": "USD",
+                "senderNote": "",
+                "datetime": datetime(2022, 8, 1, 8, 48, 56),
+                "senderEmail": None,
+                "amountOriginal": 100.0,
+            }
+        ]
+    )
+    assert Manual.get_transaction_keys(documents) == keys[:1]
+
+
+def test_rekey_manual_documents() -> None:
+    """Tests that stored keys are replaced with the keys of normalized rows"""
+    document = {
+        "_id": ObjectId(),
+        "senderName": "Test Person",
+        "currency": "USD",
+        "senderNote": "",
+        "datetime": datetime(2022, 8, 1, 8, 48, 56),
+        "senderEmail": None,
+        "amountOriginal": 100.0,
+    }
+    stored = [{**document, "transactionKey": "old"}, {**document, "_id": ObjectId()}]
+    keys = Manual.get_transaction_keys(pd.DataFrame.from_dict([document, document]))
+    stored[1]["transactionKey"] = keys[1]
+    collection = Mock()
+    collection.distinct.return_value = ["Other"]
+    collection.find.return_value.sort.return_value = stored
+    collection.bulk_write.return_value.modified_count = 1
+
+    assert rekey_manual_documents(collection) == 1
+    (requests,), _ = collection.bulk_write.call_args
+    assert [request._doc["$set"]["transactionKey"] for request in requests] == [keys[0]]
+
+
+def test_iter_api_data_chunks(tmp_path: Path) -> None:
+    """Tests that chunks of a file with integer and decimal amounts get the same keys
+    and dtypes as the whole file
+
+    Parameters
+    ----------
+    tmp_path : Path
+        Temporary directory for the CSV file.
+    """
+    filepath = tmp_path / "mixed.csv"
+    filepath.write_text(
+        "senderName,currency,senderNote,datetime,senderEmail,amountOriginal,countryCode\n"
+        "Cash,UAH,,2022-08-01 11:00:00+03:00,,100,\n"
+        "Cash,UAH,,2022-08-01 11:00:00+03:00,,100,\n"
+        "Cash,USD,Note,2022-08-02 12:00:00+02:00,,12.5,\n"
+        "Cash,UAH,,2022-08-01 11:00:00+03:00,,100,\n"
+    )
+    with patch("sources.base.get_collection"):
+        df = next(Manual("Other", str(filepath)).iter_api_data())
+        chunks = list(Manual("Other", str(filepath), chunksize=2).iter_api_data())
+
+    assert len(set(df["transactionKey"])) == len(df)
+    assert [key for chunk in chunks for key in chunk["transactionKey"]] == df[
+        "transactionKey"
+    ].to_list()
+    for chunk in chunks:
+        assert all(isinstance(amount, float) for amount in chunk["amountOriginal"])
+        assert chunk["datetime"].dt.tz is not None
@@ -9,6 +9,7 @@ from bson import ObjectId
 
 from common.constants import DEFAULT_USD_UAH_CONVERTION_RATE
 from common.mongo import get_database
+from common.rollups import ROLLUP_PERIODS
 from sources.monobank import Monobank
 
 
@@ -18,13 +19,18 @@ from sources.monobank import Monobank
     "sources.base.SourceBase.usd_to_uah_current_rate",
     PropertyMock(return_value=DEFAULT_USD_UAH_CONVERTION_RATE),
 )
-def test_write_new_data(get_collection_name_mock: Mock, datetime_mock: Mock) -> None:
+@patch("common.checkpoints.get_checkpoints_collection_name")
+def test_write_new_data(
+    get_checkpoints_collection_name_mock: Mock, get_collection_name_mock: Mock, datetime_mock: Mock
+) -> None:
     """This is an E2E test for Monobank source. The test creates fake collection
     in the database, and mocks start and end date to write PayPal transactions
     from real account between 2022-07-01 to 2022-08-01.
 
     Parameters
     ----------
+    get_checkpoints_collection_name_mock : Mock
+        A mock to swap checkpoints collection name from config names to the test one.
     get_collection_name_mock : Mock
         A mock to swap collection name from config names to the test one.
     datetime_mock : Mock
@@ -34,6 +40,7 @@ def test_write_new_data(get_collection_name_mock: Mock, datetime_mock: Mock) ->
     datetime_mock.fromisoformat = datetime.fromisoformat
     test_collection_name = f"test_donations_{ObjectId()}"
     get_collection_name_mock.return_value = test_collection_name
+    get_checkpoints_collection_name_mock.return_value = f"test_checkpoints_{ObjectId()}"
     db = get_database()
     db.create_collection(test_collection_name)
     monobank = Monobank("Dzyga's Paw Jar")
@@ -42,4 +49,10 @@ def test_write_new_data(get_collection_name_mock: Mock, datetime_mock: Mock) ->
     df = pd.DataFrame.from_dict(entries)
     assert len(df) == 3
     assert df["amountOriginal"].sum() == 7500
+    rollups = list(db.get_collection(f"{test_collection_name}_monthly").find({}))
+    assert sum(rollup["count"] for rollup in rollups) == 3
+    assert sum(rollup["amountOriginal"] for rollup in rollups) == 7500
     db.drop_collection(test_collection_name)
+    db.drop_collection(get_checkpoints_collection_name_mock.return_value)
+    for period in ROLLUP_PERIODS:
+        db.drop_collection(f"{test_collection_name}_{period}")
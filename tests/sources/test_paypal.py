@@ -9,6 +9,7 @@ from bson import ObjectId
 
 from common.config import get_source
 from common.mongo import get_database
+from common.rollups import ROLLUP_PERIODS
 from mongo.enforce_schema import enforce_schema
 from sources.paypal import PayPal
 
@@ -25,16 +26,20 @@ def test_get_api_data_does_not_include_payments_between_accounts() -> None:
     paypal = PayPal("Roman's PayPal")
     paypal.start_datetime = datetime(2022, 8, 22)
     paypal.end_datetime = datetime(2022, 8, 28)
-    df = paypal.get_api_data()
-    assert len(df) == 1
-    assert df["amountOriginal"][0] == 50.0
+    donations = paypal.get_api_data()
+    assert len(donations) == 1
+    assert donations[0].amount_original == 50.0
 
 
 @patch("sources.base.datetime")
 @patch("sources.base.get_source")
 @patch("common.mongo.get_collection_name")
+@patch("common.checkpoints.get_checkpoints_collection_name")
 def test_write_new_data(
-    get_collection_name_mock: Mock, get_source_mock: Mock, datetime_mock: Mock
+    get_checkpoints_collection_name_mock: Mock,
+    get_collection_name_mock: Mock,
+    get_source_mock: Mock,
+    datetime_mock: Mock,
 ) -> None:
     """This is an E2E test for PayPal source. The test creates fake collection
     in the database, and mocks start and end date to write PayPal transactions
@@ -42,6 +47,8 @@ def test_write_new_data(
 
     Parameters
     ----------
+    get_checkpoints_collection_name_mock : Mock
+        A mock to swap checkpoints collection name from config names to the test one.
     get_collection_name_mock : Mock
         A mock to swap collection name from config names to the test one.
     get_source_mock : Mock
@@ -56,13 +63,17 @@ def test_write_new_data(
     get_source_mock.return_value = source
     test_collection_name = f"test_donations_{ObjectId()}"
     get_collection_name_mock.return_value = test_collection_name
+    get_checkpoints_collection_name_mock.return_value = f"test_checkpoints_{ObjectId()}"
     db = get_database()
     db.create_collection(test_collection_name)
     enforce_schema(test_collection_name)
     paypal = PayPal(source["name"])
-    paypal.is_source_creation_date = False
+    # The first transaction is already stored, so it should be skipped
+    paypal.write_documents(
+        paypal.get_documents(paypal.parse_transactions(paypal.get_api_data_raw()[:1]))
+    )
     paypal.write_new_data()
-    entries = list(db.get_collection(test_collection_name).find({}))
+    entries = list(db.get_collection(test_collection_name).find({}))[1:]
     df = pd.DataFrame.from_dict(entries)
     assert len(df) == 4
     assert df["senderNameCensored"][0] == "St**** JP"
@@ -71,3 +82,52 @@ def test_write_new_data(
     assert df["donationSource"].unique()[0] == source["name"]
     assert df["insertionMode"].unique()[0] == "Auto"
     db.drop_collection(test_collection_name)
+    db.drop_collection(get_checkpoints_collection_name_mock.return_value)
+    for period in ROLLUP_PERIODS:
+        db.drop_collection(f"{test_collection_name}_{period}")
+
+
+@patch("sources.paypal.PayPal.get_access_token", Mock(return_value="token"))
+@patch("sources.base.SourceBase.get_checkpoint", Mock(return_value=None))
+@patch("sources.base.SourceBase.get_last_document_datetime")
+@patch("sources.paypal.get_json")
+def test_get_api_data_raw_pagination(
+    get_json_mock: Mock, get_last_document_datetime_mock: Mock
+) -> None:
+    """Tests that all pages are fetched, deduplicated and ordered by datetime.
+    Transactions at the start datetime are not skipped, they are deduplicated on write.
+
+    Parameters
+    ----------
+    get_json_mock : Mock
+        A mock to fake PayPal transactions API responses.
+    get_last_document_datetime_mock : Mock
+        A mock to fake the last stored document datetime.
+    """
+
+    def transaction(transaction_id: str, day: int) -> dict:
+        return {
+            "transaction_info": {
+                "transaction_id": transaction_id,
+                "transaction_updated_date": f"2022-08-{day:02}T10:00:00+0000",
+            }
+        }
+
+    pages = {
+        1: [transaction("A", 1), transaction("C", 5)],
+        2: [transaction("C", 5), transaction("B", 3)],
+        3: [transaction("D", 7)],
+    }
+
+    def get_page(*args, **kwargs) -> dict:
+        _ = args
+        page = kwargs["params"]["page"]
+        return {"transaction_details": pages[page], "total_pages": len(pages), "page": page}
+
+    get_json_mock.side_effect = get_page
+    get_last_document_datetime_mock.return_value = (datetime(2022, 8, 1, 10), False)
+    paypal = PayPal("Dimko's PayPal")
+
+    transactions = paypal.get_api_data_raw()
+    assert get_json_mock.call_count == len(pages)
+    assert [t["transaction_info"]["transaction_id"] for t in transactions] == ["A", "B", "C", "D"]
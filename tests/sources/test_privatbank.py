@@ -3,17 +3,25 @@ from datetime import datetime
 from unittest.mock import Mock
 from unittest.mock import patch
 
+import numpy as np
 import pandas as pd
 from bson import ObjectId
 
+from common.archive import get_archive_bucket
+from common.archive import get_archive_filenames
 from common.config import get_source
+from common.constants import MAX_PRIVATBANK_TRANSACTIONS
 from common.mongo import get_database
+from common.rollups import ROLLUP_PERIODS
+from mongo.reprocess_archive import reprocess_file
 from sources.privatbank import Privatbank
 
 
 @patch("sources.base.get_source")
 @patch("common.mongo.get_collection_name")
+@patch("common.checkpoints.get_checkpoints_collection_name")
 def test_write_new_data(
+    get_checkpoints_collection_name_mock: Mock,
     get_collection_name_mock: Mock,
     get_source_mock: Mock,
 ) -> None:
@@ -23,6 +31,8 @@ def test_write_new_data(
 
     Parameters
     ----------
+    get_checkpoints_collection_name_mock : Mock
+        A mock to swap checkpoints collection name from config names to the test one.
     get_collection_name_mock : Mock
         A mock to swap collection name from config names to the test one.
     get_source_mock : Mock
@@ -35,8 +45,8 @@ def test_write_new_data(
     db = get_database()
     db.create_collection(test_collection_name)
     get_collection_name_mock.return_value = test_collection_name
+    get_checkpoints_collection_name_mock.return_value = f"test_checkpoints_{ObjectId()}"
     privatbank = Privatbank(source["name"])
-    privatbank.is_source_creation_date = False
     privatbank.write_new_data()
     entries = list(db.get_collection(test_collection_name).find({}))
     df = pd.DataFrame.from_dict(entries)
@@ -46,3 +56,169 @@ def test_write_new_data(
     assert df["donationSource"].unique()[0] == source["name"]
     assert df["insertionMode"].unique()[0] == "Auto"
     db.drop_collection(test_collection_name)
+    db.drop_collection(get_checkpoints_collection_name_mock.return_value)
+    for period in ROLLUP_PERIODS:
+        db.drop_collection(f"{test_collection_name}_{period}")
+
+
+@patch("sources.base.datetime")
+@patch("sources.base.SourceBase.get_checkpoint", Mock(return_value=None))
+@patch("sources.base.SourceBase.get_last_document_datetime")
+@patch("sources.privatbank.get_json")
+def test_iter_api_data_follows_next_page(
+    get_json_mock: Mock, get_last_document_datetime_mock: Mock, datetime_mock: Mock
+) -> None:
+    """Tests that statements are fetched page by page until there is no next page
+
+    Parameters
+    ----------
+    get_json_mock : Mock
+        A mock to fake Privatbank statements API responses.
+    get_last_document_datetime_mock : Mock
+        A mock to fake the last stored document datetime.
+    datetime_mock : Mock
+        A mock to fake current datetime.
+    """
+
+    def transaction(name: str, day: int) -> dict:
+        return {
+            "ID": name,
+            "OSND": "Donation",
+            "TRANTYPE": "C",
+            "DATE_TIME_DAT_OD_TIM_P": f"{day:02}.09.2022 10:00:00",
+            "CCY": "UAH",
+            "AUT_CNTR_NAM": name,
+            "SUM": "100.00",
+        }
+
+    responses = [
+        {"exist_next_page": True, "next_page_id": "2", "transactions": [transaction("A", 2)]},
+        {"exist_next_page": False, "transactions": [transaction("B", 3), transaction("C", 4)]},
+    ]
+    get_json_mock.side_effect = responses
+    datetime_mock.utcnow = Mock(return_value=datetime(2022, 9, 10))
+    get_last_document_datetime_mock.return_value = (datetime(2022, 9, 1), True)
+    privatbank = Privatbank("Dzyga's Paw Charity Accounts")
+
+    batches = list(privatbank.iter_api_data())
+    assert [[donation.sender_name for donation in batch] for batch in batches] == [
+        ["A"],
+        ["B", "C"],
+    ]
+    assert [[donation.transaction_key for donation in batch] for batch in batches] == [
+        ["A"],
+        ["B", "C"],
+    ]
+    assert "followId" not in get_json_mock.call_args_list[0].kwargs["params"]
+    assert get_json_mock.call_args_list[1].kwargs["params"]["followId"] == "2"
+
+
+@patch("sources.base.datetime")
+@patch("sources.base.SourceBase.get_checkpoint")
+@patch("sources.privatbank.get_json")
+def test_iter_api_data_resumes_from_cursor(
+    get_json_mock: Mock, get_checkpoint_mock: Mock, datetime_mock: Mock
+) -> None:
+    """Tests that an interrupted window is resumed from the saved cursor
+
+    Parameters
+    ----------
+    get_json_mock : Mock
+        A mock to fake Privatbank statements API responses.
+    get_checkpoint_mock : Mock
+        A mock to fake the saved sync checkpoint.
+    datetime_mock : Mock
+        A mock to fake current datetime.
+    """
+    datetime_mock.utcnow = Mock(return_value=datetime(2022, 9, 10))
+    params = {"startDate": "01-09-2022", "limit": MAX_PRIVATBANK_TRANSACTIONS}
+    get_checkpoint_mock.return_value = {
+        "syncedUntil": datetime(2022, 9, 1),
+        "cursor": {"params": params, "followId": "2"},
+    }
+    get_json_mock.return_value = {"exist_next_page": False, "transactions": []}
+    privatbank = Privatbank("Dzyga's Paw Charity Accounts")
+
+    list(privatbank.iter_api_data_raw())
+    assert get_json_mock.call_args.kwargs["params"] == {**params, "followId": "2"}
+    assert privatbank.cursor is None
+
+    privatbank.start_datetime = datetime(2022, 9, 2)
+    list(privatbank.iter_api_data_raw())
+    assert "followId" not in get_json_mock.call_args.kwargs["params"]
+
+
+@patch("sources.base.datetime")
+@patch("sources.base.SourceBase.get_checkpoint", Mock(return_value=None))
+@patch("sources.base.SourceBase.get_last_document_datetime")
+@patch("sources.base.SourceBase.get_usd_to_uah_rates")
+@patch("sources.base.get_archive_config", Mock(return_value={"enabled": True}))
+@patch("sources.base.get_archive_bucket")
+@patch("sources.privatbank.get_json")
+def test_reprocess_archived_transactions(
+    get_json_mock: Mock,
+    get_archive_bucket_mock: Mock,
+    get_usd_to_uah_rates_mock: Mock,
+    get_last_document_datetime_mock: Mock,
+    datetime_mock: Mock,
+) -> None:
+    """Tests that archived pages are parsed into the same documents without API requests
+
+    Parameters
+    ----------
+    get_json_mock : Mock
+        A mock to fake Privatbank statements API responses.
+    get_archive_bucket_mock : Mock
+        A mock to store the archive in a test bucket.
+    get_usd_to_uah_rates_mock : Mock
+        A mock to fake USD / UAH rates.
+    get_last_document_datetime_mock : Mock
+        A mock to fake the last stored document datetime.
+    datetime_mock : Mock
+        A mock to fake current datetime.
+    """
+    transactions = [
+        {
+            "ID": "A",
+            "OSND": "Donation",
+            "TRANTYPE": "C",
+            "DATE_TIME_DAT_OD_TIM_P": "02.09.2022 10:00:00",
+            "CCY": "UAH",
+            "AUT_CNTR_NAM": "Test Person",
+            "SUM": "400.00",
+        },
+        {
+            "ID": "B",
+            "OSND": "From Test Person 1/Donation",
+            "TRANTYPE": "C",
+            "DATE_TIME_DAT_OD_TIM_P": "03.09.2022 10:00:00",
+            "CCY": "EUR",
+            "AUT_CNTR_NAM": "Bank",
+            "SUM": "10.00",
+        },
+    ]
+    get_json_mock.side_effect = [
+        {"exist_next_page": True, "next_page_id": "2", "transactions": transactions[:1]},
+        {"exist_next_page": False, "transactions": transactions[1:]},
+    ]
+    bucket_name = f"test_archive_{ObjectId()}"
+    get_archive_bucket_mock.return_value = get_archive_bucket(bucket_name)
+    get_usd_to_uah_rates_mock.side_effect = lambda dates: np.full(len(dates), 40.0)
+    datetime_mock.utcnow = Mock(return_value=datetime(2022, 9, 10))
+    get_last_document_datetime_mock.return_value = (datetime(2022, 9, 1), True)
+    privatbank = Privatbank("Dzyga's Paw Charity Accounts")
+    documents = [
+        document
+        for donations in privatbank.iter_api_data()
+        for document in privatbank.get_documents(donations)
+    ]
+
+    filenames = get_archive_filenames(
+        get_archive_bucket_mock.return_value, "Dzyga's Paw Charity Accounts"
+    )
+    assert len(filenames) == 1
+    assert reprocess_file(filenames[0], bucket_name) == documents
+    assert get_json_mock.call_count == 2
+    db = get_database()
+    db.drop_collection(f"{bucket_name}.files")
+    db.drop_collection(f"{bucket_name}.chunks")
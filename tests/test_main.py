@@ -1,8 +1,14 @@
 """This module contains tests for GCP Cloud Function entrypoint"""
+import subprocess
+import sys
+from pathlib import Path
 from unittest.mock import PropertyMock
 from unittest.mock import call
 from unittest.mock import patch
 
+import pytest
+from pytest import CaptureFixture
+
 from common.config import get_sources
 from common.constants import DEFAULT_USD_UAH_CONVERTION_RATE
 from main import update_dashboard
@@ -10,6 +16,21 @@ from sources.monobank import Monobank
 from sources.paypal import PayPal
 from sources.privatbank import Privatbank
 
+# Importing the entry point is a part of every GCP Cloud Function cold start
+IMPORT_TIME_BUDGET_SECONDS = 0.25
+HEAVY_MODULES = ["pandas", "numpy", "pymongo", "requests", "currency_converter"]
+# The first invocation also imports the modules of update_dashboard and the donation sources
+FIRST_INVOCATION_IMPORT_TIME_BUDGET_SECONDS = 0.75
+# Only needed to import manual CSV files and to convert non UAH currencies
+LAZY_MODULES = ["pandas", "currency_converter"]
+FIRST_INVOCATION_MODULES = [
+    "common.checkpoints",
+    "common.metrics",
+    "common.mongo",
+    "common.rate_limiter",
+    "common.uah_rates",
+]
+
 
 def test_update_dashboard() -> None:
     """Tests update_dashboard entrypoint"""
@@ -18,9 +39,13 @@ def test_update_dashboard() -> None:
             "sources.base.SourceBase.usd_to_uah_current_rate",
             PropertyMock(return_value=DEFAULT_USD_UAH_CONVERTION_RATE),
         ),
-        patch("main.Monobank", spec=Monobank) as write_new_data_monobank_mock,
-        patch("main.PayPal", spec=PayPal) as write_new_data_paypal_mock,
-        patch("main.Privatbank", spec=Privatbank) as write_new_data_privatbank_mock,
+        patch("common.uah_rates.update_uah_rate_index"),
+        patch("common.mongo.get_collection"),
+        patch("common.checkpoints.get_checkpoints", return_value={}),
+        patch("common.mongo.get_last_document_datetimes", return_value={}),
+        patch("sources.monobank.Monobank", spec=Monobank) as write_new_data_monobank_mock,
+        patch("sources.paypal.PayPal", spec=PayPal) as write_new_data_paypal_mock,
+        patch("sources.privatbank.Privatbank", spec=Privatbank) as write_new_data_privatbank_mock,
     ):
         update_dashboard()
 
@@ -29,7 +54,7 @@ def test_update_dashboard() -> None:
         privatbank_calls = []
 
         for source in get_sources():
-            call_signature = call(source["name"])
+            call_signature = call(source["name"], last_document_datetimes={}, checkpoints={})
             match source["type"]:
                 case "PayPal":
                     paypal_calls.append(call_signature)
@@ -47,6 +72,82 @@ def test_update_dashboard() -> None:
         assert write_new_data_privatbank_mock.return_value.write_new_data.call_count == len(
             privatbank_calls
         )
-        assert write_new_data_paypal_mock.call_args_list == paypal_calls
-        assert write_new_data_monobank_mock.call_args_list == monobank_calls
-        assert write_new_data_privatbank_mock.call_args_list == privatbank_calls
+        # Sources are synced concurrently, so the order of calls is not guaranteed
+        write_new_data_paypal_mock.assert_has_calls(paypal_calls, any_order=True)
+        write_new_data_monobank_mock.assert_has_calls(monobank_calls, any_order=True)
+        write_new_data_privatbank_mock.assert_has_calls(privatbank_calls, any_order=True)
+
+
+def test_update_dashboard_isolates_failed_source(capsys: CaptureFixture) -> None:
+    """Tests that a failing donation source does not prevent other sources from syncing
+
+    Parameters
+    ----------
+    capsys : CaptureFixture
+        Used to check what we print to logs.
+    """
+    with (
+        patch(
+            "sources.base.SourceBase.usd_to_uah_current_rate",
+            PropertyMock(return_value=DEFAULT_USD_UAH_CONVERTION_RATE),
+        ),
+        patch("common.uah_rates.update_uah_rate_index"),
+        patch("common.mongo.get_collection"),
+        patch("common.checkpoints.get_checkpoints", return_value={}),
+        patch("common.mongo.get_last_document_datetimes", return_value={}),
+        patch("sources.monobank.Monobank", spec=Monobank) as write_new_data_monobank_mock,
+        patch("sources.paypal.PayPal", spec=PayPal) as write_new_data_paypal_mock,
+        patch("sources.privatbank.Privatbank", spec=Privatbank) as write_new_data_privatbank_mock,
+    ):
+        write_new_data_monobank_mock.return_value.write_new_data.side_effect = ValueError(
+            "Monobank is down"
+        )
+        with pytest.raises(RuntimeError, match="Dzyga's Paw Jar"):
+            update_dashboard()
+
+        assert write_new_data_paypal_mock.return_value.write_new_data.call_count == len(
+            get_sources("PayPal")
+        )
+        assert write_new_data_privatbank_mock.return_value.write_new_data.call_count == len(
+            get_sources("Privatbank")
+        )
+        out = capsys.readouterr().out
+        assert "Dzyga's Paw Jar | FAILED | ValueError('Monobank is down')" in out
+        assert "Dzyga's Paw Charity Accounts | OK" in out
+
+
+def test_import_time_budget() -> None:
+    """Tests that importing the entry point does not import heavy modules, and that
+    the imports of the first invocation do not import pandas and currency_converter.
+    Both stay within their import time budgets. The best of several runs in a fresh
+    interpreter is taken to reduce noise."""
+    code = (
+        "import importlib, sys, time; started_at = time.perf_counter(); import main; "
+        "print(time.perf_counter() - started_at); "
+        f"print(','.join(sorted(set({HEAVY_MODULES}) & set(sys.modules)))); "
+        f"[importlib.import_module(module) for module in {FIRST_INVOCATION_MODULES}]; "
+        "[main.get_source_class(source_type) for source_type in main.AUTO_SOURCE_TYPES]; "
+        "print(time.perf_counter() - started_at); "
+        f"print(','.join(sorted(set({LAZY_MODULES}) & set(sys.modules))))"
+    )
+    import_times, first_invocation_import_times = [], []
+    for _ in range(3):
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parents[1],
+        )
+        (
+            import_time,
+            imported_heavy_modules,
+            first_invocation_import_time,
+            imported_lazy_modules,
+        ) = result.stdout.splitlines()
+        assert imported_heavy_modules == ""
+        assert imported_lazy_modules == ""
+        import_times.append(float(import_time))
+        first_invocation_import_times.append(float(first_invocation_import_time))
+    assert min(import_times) < IMPORT_TIME_BUDGET_SECONDS
+    assert min(first_invocation_import_times) < FIRST_INVOCATION_IMPORT_TIME_BUDGET_SECONDS